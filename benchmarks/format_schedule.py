@@ -0,0 +1,108 @@
+"""
+Micro-benchmark of `format_schedule` rendering, as done by `/list`.
+
+Renders a list of schedules for one user with the cached formatting helpers and,
+for comparison, with plain Babel calls that parse the locale on every call. No
+database is needed.
+
+Usage:
+    python benchmarks/format_schedule.py --schedules 20 --rounds 500 --locale ru
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime
+from datetime import time as dtime
+from datetime import timedelta, timezone
+from pathlib import Path
+from unittest.mock import patch
+
+import babel.dates
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.bot.handlers.schedules import formatters  # noqa: E402
+from src.i18n import i18n  # noqa: E402
+from src.models import Schedule, User  # noqa: E402
+from src.services.schedule_service import ScheduleService  # noqa: E402
+
+
+def make_schedules(user: User, count: int) -> list[Schedule]:
+    now = datetime.now(timezone.utc)
+    return [
+        Schedule(
+            id=i,
+            user_id=user.id,
+            drug_name=f"Drug {i}",
+            dose="500mg",
+            doses_per_day=1 + i % 4,
+            duration=None if i % 3 == 0 else 10,
+            comment="After meals" if i % 2 else None,
+            start_datetime=now - timedelta(days=i % 5),
+            end_datetime=None if i % 3 == 0 else now + timedelta(days=10 - i % 5),
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+async def render(user: User, schedules: list[Schedule], rounds: int) -> float:
+    service = ScheduleService(session=None)  # type: ignore
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for schedule in schedules:
+            await formatters.format_schedule(user, schedule, service)
+    return (time.perf_counter() - started) / rounds
+
+
+def plain_babel(func):
+    def wrapper(dt, format=None, locale=None):
+        locale = locale or i18n.current_locale
+        if format:
+            return func(dt, format, locale=locale)
+        return func(dt, locale=locale)
+
+    return wrapper
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--schedules", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=500)
+    parser.add_argument("--locale", default="ru")
+    args = parser.parse_args()
+
+    user = User(
+        id=1,
+        timezone="Europe/Moscow",
+        day_start=dtime(8, 0),
+        day_end=dtime(22, 0),
+    )
+    schedules = make_schedules(user, args.schedules)
+
+    with i18n.context(), i18n.use_locale(args.locale):
+        with (
+            patch.object(
+                formatters, "format_date", plain_babel(babel.dates.format_date)
+            ),
+            patch.object(
+                formatters, "format_time", plain_babel(babel.dates.format_time)
+            ),
+        ):
+            await render(user, schedules, 10)  # Warm up
+            baseline = await render(user, schedules, args.rounds)
+
+        await render(user, schedules, 10)
+        cached = await render(user, schedules, args.rounds)
+
+    print(f"Schedules per render: {args.schedules} ({args.locale})")
+    print(f"Plain Babel:          {baseline * 1000:.3f} ms/render")
+    print(
+        f"Cached formatting:    {cached * 1000:.3f} ms/render "
+        f"({(1 - cached / baseline) * 100:.0f}% faster)"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,80 @@
+"""
+Import-time report for the bot and worker entry points.
+
+Imports every module in a fresh interpreter with `-X importtime` and prints the
+total import time, peak resident memory and the slowest imports, both by module
+and by top-level package.
+
+Usage:
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py src.bot.handlers.commands --top 30
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_MODULES = ["src.bot.__main__", "src.tasks", "src.tasks.notifications"]
+
+# Prints peak RSS in KiB after the import, importtime goes to stderr
+SNIPPET = "import resource, {module}; print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+
+
+def profile(module: str) -> tuple[list[tuple[int, int, str]], int]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", SNIPPET.format(module=module)],
+        capture_output=True,
+        text=True,
+        cwd=ROOT,
+        env={**os.environ, "PYTHONPATH": str(ROOT)},
+    )
+    if result.returncode:
+        raise RuntimeError(f"Failed to import {module}:\n{result.stderr[-2000:]}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        rows.append((int(self_us), int(cumulative_us), name.strip()))
+    return rows, int(result.stdout.split()[-1])
+
+
+def report(module: str, top: int):
+    rows, max_rss_kib = profile(module)
+    total_us = sum(self_us for self_us, _, _ in rows)
+
+    packages: dict[str, int] = defaultdict(int)
+    for self_us, _, name in rows:
+        packages[name.split(".")[0]] += self_us
+
+    print(f"== {module}")
+    print(f"Total import time: {total_us / 1000:.0f} ms ({len(rows)} modules)")
+    print(f"Peak RSS:          {max_rss_kib / 1024:.1f} MiB")
+
+    print("\nSlowest packages (self time):")
+    for name, self_us in sorted(packages.items(), key=lambda i: -i[1])[:top]:
+        print(f"  {self_us / 1000:8.1f} ms  {name}")
+
+    print("\nSlowest modules (cumulative time):")
+    for _, cumulative_us, name in sorted(rows, key=lambda r: -r[1])[:top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    for module in args.modules:
+        report(module, args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Time-to-result of prescription parsing with and without streaming.
+
+Runs the local LLM stub, scripted to answer with a JSON object followed by an
+explanation, like chatty models do, sending one token every `--token-delay`
+seconds. Non-streamed requests wait for the whole answer, streamed ones return
+as soon as the JSON object is complete.
+
+Usage:
+    python benchmarks/llm_streaming.py --token-delay 0.02 --trailing-tokens 60
+"""
+
+import argparse
+import asyncio
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from llm_stub import TOKEN_RE, LLMStub, ScriptEntry  # noqa: E402
+
+from src.services.llm_service import LLMService  # noqa: E402
+from src.utils.parsers import parse_prescription  # noqa: E402
+
+ANSWER = (
+    '{"drug_name": "Enalapril", "dose": "10 mg", "doses_per_day": 2, '
+    '"comment": "morning and evening"}'
+)
+TRAILER = " This JSON describes the medication schedule you asked for." * 10
+# Not handled by the local rules, so the LLM is always called
+LINE = "Enalapril 10 mg in the morning and in the evening"
+
+
+async def measure(base_url: str, stream: bool, rounds: int) -> list[float]:
+    timings = []
+    async with LLMService("key", base_url=base_url, stream=stream) as service:
+        for _ in range(rounds):
+            started = time.perf_counter()
+            parsed = await parse_prescription(service, LINE)
+            timings.append(time.perf_counter() - started)
+            assert parsed and parsed.drug_name == "Enalapril", parsed
+    return timings
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    parser.add_argument("--trailing-tokens", type=int, default=60)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8082)
+    args = parser.parse_args()
+
+    json_tokens = len(TOKEN_RE.findall(ANSWER))
+    trailer = "".join(TOKEN_RE.findall(TRAILER)[: args.trailing_tokens])
+    stub = LLMStub(
+        token_delay=args.token_delay,
+        script=[ScriptEntry(match=re.compile(""), content=ANSWER + trailer)],
+    )
+    runner = await stub.start("127.0.0.1", args.port)
+    base_url = f"http://127.0.0.1:{args.port}/v1/"
+    try:
+        print(
+            f"Answer: {json_tokens} JSON tokens + "
+            f"{len(TOKEN_RE.findall(trailer))} trailing tokens, "
+            f"{args.token_delay * 1000:.0f} ms/token"
+        )
+        for stream in (False, True):
+            timings = await measure(base_url, stream, args.rounds)
+            print(
+                f"{'Streamed' if stream else 'Full response':<14} "
+                f"median={statistics.median(timings) * 1000:.0f} ms "
+                f"max={max(timings) * 1000:.0f} ms"
+            )
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,248 @@
+"""
+Local OpenAI-compatible `/chat/completions` stub for LLM performance testing.
+
+Answers streamed and non-streamed completions after a latency drawn from a
+configurable distribution, injects rate limits, server errors and malformed
+answers at given rates, and replies with scripted responses for matching
+prompts. Other prompts get a prescription JSON built from the input line.
+
+Latency specs (seconds): `fixed:0.5`, `uniform:0.2,1.5`, `normal:0.8,0.2`,
+`lognormal:0.8,0.5` (median, sigma) and `exp:0.8` (mean). It is the time to the
+first token; every token then takes `--token-delay` more.
+
+A script is a JSON Lines file, the first entry whose `match` regex is found in
+the prompt is used. Entries have either `content` (raw answer text) or `json`
+(an object to answer with), and optionally `status` and `latency`:
+    {"match": "Enalapril", "json": {"drug_name": "Enalapril", "dose": "10 mg", "doses_per_day": 2}}
+    {"match": "timeout", "content": "...", "latency": "fixed:30"}
+    {"match": "broken", "status": 500}
+
+Usage:
+    python benchmarks/llm_stub.py --latency lognormal:0.8,0.5 --rate-limit 0.05 \\
+        --server-error 0.02 --malformed 0.01 --script my_script.jsonl
+
+    # Point the bot at it
+    LLM__URL=http://127.0.0.1:8082/v1/ LLM__API_KEY=stub python -m src.bot
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+from aiohttp import web
+
+INPUT_RE = re.compile(r'Input: "(.*)"', re.DOTALL)
+TOKEN_RE = re.compile(r"\s*\S+")
+
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """Sampler of a latency spec like `lognormal:0.8,0.5`"""
+    kind, _, params = spec.partition(":")
+    args = [float(value) for value in params.split(",") if value]
+    samplers: dict[str, Callable[..., float]] = {
+        "fixed": lambda value: value,
+        "uniform": random.uniform,
+        "normal": random.gauss,
+        "lognormal": lambda median, sigma: median * random.lognormvariate(0, sigma),
+        "exp": lambda mean: random.expovariate(1 / mean),
+    }
+    if kind not in samplers:
+        raise ValueError(f"Unknown latency distribution: {spec}")
+
+    sampler = samplers[kind]
+    sampler(*args)  # Fail on bad parameters now rather than on the first request
+    return lambda: max(0.0, sampler(*args))
+
+
+def default_answer(prompt: str) -> str:
+    """Plausible prescription JSON for the input line of the prompt"""
+    match = INPUT_RE.search(prompt)
+    words = (match.group(1) if match else prompt).split()
+    return json.dumps(
+        {
+            "drug_name": words[0] if words else "Aspirin",
+            "dose": "1 tablet",
+            "doses_per_day": 2,
+            "duration": 7,
+        },
+        ensure_ascii=False,
+    )
+
+
+@dataclass
+class ScriptEntry:
+    match: re.Pattern
+    content: str = ""
+    status: int = 200
+    latency: Callable[[], float] | None = None
+
+
+def load_script(path: Path) -> list[ScriptEntry]:
+    entries = []
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            content = item.get("content", "")
+            if "json" in item:
+                content = json.dumps(item["json"], ensure_ascii=False)
+            entries.append(
+                ScriptEntry(
+                    match=re.compile(item["match"]),
+                    content=content,
+                    status=item.get("status", 200),
+                    latency=(
+                        parse_latency(item["latency"]) if "latency" in item else None
+                    ),
+                )
+            )
+    return entries
+
+
+@dataclass
+class LLMStub:
+    """OpenAI-compatible completions server with scripted latency and failures"""
+
+    latency: Callable[[], float] = lambda: 0.0
+    token_delay: float = 0.0
+    rate_limit: float = 0.0
+    server_error: float = 0.0
+    malformed: float = 0.0
+    script: list[ScriptEntry] = field(default_factory=list)
+    default: Callable[[str], str] = default_answer
+    # Requests by outcome: ok, rate_limited, server_error, malformed, scripted status
+    counts: Counter = field(default_factory=Counter)
+
+    def _script_entry(self, prompt: str) -> ScriptEntry | None:
+        return next((e for e in self.script if e.match.search(prompt)), None)
+
+    def _outcome(self) -> str:
+        roll = random.random()
+        for outcome, rate in (
+            ("rate_limited", self.rate_limit),
+            ("server_error", self.server_error),
+            ("malformed", self.malformed),
+        ):
+            if roll < rate:
+                return outcome
+            roll -= rate
+        return "ok"
+
+    async def completions(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        prompt = "\n".join(m.get("content", "") for m in body.get("messages", []))
+        entry = self._script_entry(prompt)
+        outcome = self._outcome()
+
+        await asyncio.sleep(
+            (entry.latency if entry and entry.latency else self.latency)()
+        )
+
+        if outcome == "rate_limited":
+            self.counts[outcome] += 1
+            return web.json_response(
+                {"error": {"message": "Rate limit exceeded", "code": 429}},
+                status=429,
+                headers={"Retry-After": "1"},
+            )
+        if outcome == "server_error" or (entry and entry.status >= 400):
+            status = entry.status if entry and entry.status >= 400 else 500
+            self.counts[outcome if outcome != "ok" else f"status_{status}"] += 1
+            return web.json_response(
+                {"error": {"message": "Internal server error", "code": status}},
+                status=status,
+            )
+
+        self.counts[outcome] += 1
+        content = entry.content if entry else self.default(prompt)
+        if outcome == "malformed":
+            # Cut the answer in the middle of the JSON object
+            content = content[: max(1, len(content) // 2)]
+        tokens = TOKEN_RE.findall(content) or [content]
+
+        if not body.get("stream"):
+            await asyncio.sleep(self.token_delay * len(tokens))
+            if outcome == "malformed":
+                return web.Response(
+                    text='{"choices": [{"message": ', content_type="application/json"
+                )
+            message = {"role": "assistant", "content": content}
+            return web.json_response(
+                {"object": "chat.completion", "choices": [{"message": message}]}
+            )
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        try:
+            for token in tokens:
+                await asyncio.sleep(self.token_delay)
+                chunk = {"choices": [{"delta": {"content": token}}]}
+                await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            if outcome == "malformed":
+                await response.write(b"data: {not json\n\n")
+            await response.write(b"data: [DONE]\n\n")
+        except ConnectionResetError:
+            pass  # The client has what it needs
+        return response
+
+    async def start(self, host: str, port: int) -> web.AppRunner:
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self.completions)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        return runner
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser):
+    group = parser.add_argument_group("LLM stub")
+    group.add_argument("--latency", default="fixed:0", help="Time to first token")
+    group.add_argument("--token-delay", type=float, default=0.0)
+    group.add_argument("--rate-limit", type=float, default=0.0, help="429 rate")
+    group.add_argument("--server-error", type=float, default=0.0, help="500 rate")
+    group.add_argument("--malformed", type=float, default=0.0, help="Broken JSON rate")
+    group.add_argument("--script", type=Path, default=None)
+    group.add_argument("--seed", type=int, default=None)
+
+
+def stub_from_arguments(args: argparse.Namespace) -> LLMStub:
+    random.seed(args.seed)
+    return LLMStub(
+        latency=parse_latency(args.latency),
+        token_delay=args.token_delay,
+        rate_limit=args.rate_limit,
+        server_error=args.server_error,
+        malformed=args.malformed,
+        script=load_script(args.script) if args.script else [],
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8082)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    stub = stub_from_arguments(args)
+    runner = await stub.start(args.host, args.port)
+    print(f"LLM stub is listening on http://{args.host}:{args.port}/v1/")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        print(f"Requests: {dict(stub.counts)}")
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,82 @@
+"""
+Accuracy and latency of the rule-based prescription parser.
+
+Runs `parse_prescription_rules` over a JSON Lines corpus. Each line has the
+input `text` and the `expected` fields, or `null` when the line should be left
+to the LLM. Lines parsed with a confidence at or above the threshold count as
+handled locally, and a handled line is correct when every field matches.
+
+Usage:
+    python benchmarks/prescription_parser.py
+    python benchmarks/prescription_parser.py --corpus my_lines.jsonl --verbose
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.utils.parsers import (  # noqa: E402
+    RULES_CONFIDENCE_THRESHOLD,
+    parse_prescription_rules,
+)
+
+DEFAULT_CORPUS = Path(__file__).with_name("prescriptions.jsonl")
+
+
+def load_corpus(path: Path) -> list[dict]:
+    with path.open(encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS)
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    handled = correct = false_confident = 0
+    latencies: list[float] = []
+
+    for sample in corpus:
+        started = time.perf_counter()
+        for _ in range(args.rounds):
+            parsed, confidence = parse_prescription_rules(sample["text"])
+        latencies.append((time.perf_counter() - started) / args.rounds)
+
+        is_handled = parsed is not None and confidence >= RULES_CONFIDENCE_THRESHOLD
+        expected = sample["expected"]
+        is_correct = is_handled and expected == parsed.model_dump()  # type: ignore
+        handled += is_handled
+        correct += is_correct
+        false_confident += is_handled and expected is None
+
+        if args.verbose or (is_handled and not is_correct):
+            mark = "ok " if is_correct else ("LLM" if not is_handled else "BAD")
+            print(f"[{mark}] {confidence:.2f} {sample['text']!r}")
+            if is_handled and not is_correct:
+                print(f"       got      {parsed.model_dump()}")  # type: ignore
+                print(f"       expected {expected}")
+
+    latencies.sort()
+    total = len(corpus)
+    print(f"Lines:              {total}")
+    print(f"Handled locally:    {handled} ({handled / total:.0%})")
+    print(f"Correct if handled: {correct}/{handled} ({correct / max(handled, 1):.0%})")
+    print(f"Should go to LLM:   {false_confident} handled locally by mistake")
+    print(
+        "Latency per line:   "
+        f"p50={statistics.median(latencies) * 1e6:.0f} us "
+        f"p95={latencies[int(len(latencies) * 0.95) - 1] * 1e6:.0f} us "
+        f"max={latencies[-1] * 1e6:.0f} us"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+End-to-end `/schedule` latency and throughput against the local LLM stub.
+
+Feeds `/schedule <prescription line>` updates to a dispatcher with the schedule
+handlers, the real `LLMService` talking HTTP to the LLM stub and a bot talking to
+the fake Bot API server, with up to `--concurrency` updates in flight. Users and
+FSM state are kept in memory, so neither MariaDB nor Redis is needed. Lines come
+from the prescription corpus; by default only those the local rules leave to
+the LLM. Identical concurrent lines share one LLM call unless `--unique` is set.
+
+Usage:
+    python benchmarks/schedule_latency.py --updates 500 --concurrency 50 --unique \\
+        --latency lognormal:0.8,0.5 --rate-limit 0.05 --malformed 0.02
+    python benchmarks/schedule_latency.py --all-lines --cache --llm-concurrency 8
+"""
+
+import argparse
+import asyncio
+import itertools
+import statistics
+import sys
+import time
+from collections import Counter
+from datetime import time as dtime
+from pathlib import Path
+from typing import Any
+
+from aiogram import BaseMiddleware, Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import Update
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from llm_stub import add_stub_arguments, stub_from_arguments  # noqa: E402
+from prescription_parser import DEFAULT_CORPUS, load_corpus  # noqa: E402
+from webhook_updates import FakeBotAPI  # noqa: E402
+
+from src.bot.handlers import schedules  # noqa: E402
+from src.bot.handlers.schedules.create import ScheduleStates  # noqa: E402
+from src.bot.middleware.i18n import I18nMiddleware  # noqa: E402
+from src.i18n import i18n  # noqa: E402
+from src.models import User  # noqa: E402
+from src.services.llm_service import LLMService  # noqa: E402
+from src.utils.metrics import metrics  # noqa: E402
+from src.utils.parsers import PrescriptionCache  # noqa: E402
+
+
+class InMemoryUserMiddleware(BaseMiddleware):
+    """Registered users without the database"""
+
+    async def __call__(self, handler, event, data: dict[str, Any]) -> Any:
+        tg_user = data["event_from_user"]
+        data["user"] = User(
+            id=tg_user.id,
+            first_name=tg_user.first_name,
+            language_code=tg_user.language_code,
+            timezone="Europe/Moscow",
+            day_start=dtime(8, 0),
+            day_end=dtime(22, 0),
+            privacy_accepted=True,
+        )
+        return await handler(event, data)
+
+
+def make_update(update_id: int, chat_id: int, line: str) -> Update:
+    user = {"id": chat_id, "is_bot": False, "first_name": "User", "language_code": "en"}
+    return Update.model_validate(
+        {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private", "first_name": "User"},
+                "from": user,
+                "text": f"/schedule {line}",
+                "entities": [{"type": "bot_command", "offset": 0, "length": 9}],
+            },
+        }
+    )
+
+
+async def run(args: argparse.Namespace, dp: Dispatcher, bot: Bot, lines: list[str]):
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies: list[float] = []
+    outcomes: Counter = Counter()
+
+    async def feed(update_id: int, line: str):
+        chat_id = 1_000_000 + update_id
+        if args.unique:
+            line = f"{line} #{update_id}"
+        async with semaphore:
+            started = time.perf_counter()
+            await dp.feed_update(bot, make_update(update_id, chat_id, line))
+            latencies.append(time.perf_counter() - started)
+
+        state = await dp.fsm.get_context(bot, chat_id, chat_id).get_state()
+        outcomes[
+            (
+                "parsed"
+                if state == ScheduleStates.waiting_confirmation.state
+                else "fallback"
+            )
+        ] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(
+            feed(update_id, line)
+            for update_id, line in zip(
+                range(1, args.updates + 1), itertools.cycle(lines)
+            )
+        )
+    )
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"Updates:          {args.updates} ({len(lines)} distinct lines)")
+    print(
+        f"Outcomes:         {outcomes['parsed']} parsed, "
+        f"{outcomes['fallback']} step-by-step fallbacks"
+    )
+    print(f"Throughput:       {args.updates / elapsed:.1f} upd/s ({elapsed:.2f} s)")
+    print(
+        "Latency:          "
+        f"p50={statistics.median(latencies) * 1000:.0f} ms "
+        f"p95={latencies[int(len(latencies) * 0.95) - 1] * 1000:.0f} ms "
+        f"max={latencies[-1] * 1000:.0f} ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--updates", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS)
+    parser.add_argument(
+        "--all-lines",
+        action="store_true",
+        help="Also send lines the local rules parse without the LLM",
+    )
+    parser.add_argument(
+        "--unique",
+        action="store_true",
+        help="Make every line unique, so identical requests are not coalesced",
+    )
+    parser.add_argument("--cache", action="store_true", help="In-process cache")
+    parser.add_argument("--llm-concurrency", type=int, default=4)
+    parser.add_argument("--llm-queue", type=int, default=50)
+    parser.add_argument("--no-stream", action="store_true")
+    parser.add_argument("--api-port", type=int, default=8081)
+    parser.add_argument("--llm-port", type=int, default=8082)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    lines = [s["text"] for s in corpus if args.all_lines or s["expected"] is None]
+
+    api, stub = FakeBotAPI(), stub_from_arguments(args)
+    api_runner = await api.start("127.0.0.1", args.api_port)
+    stub_runner = await stub.start("127.0.0.1", args.llm_port)
+
+    bot = Bot(
+        "1:benchmark",
+        session=AiohttpSession(
+            api=TelegramAPIServer.from_base(f"http://127.0.0.1:{args.api_port}")
+        ),
+    )
+    llm_service = LLMService(
+        "stub",
+        base_url=f"http://127.0.0.1:{args.llm_port}/v1/",
+        max_concurrency=args.llm_concurrency,
+        max_queue=args.llm_queue,
+        stream=not args.no_stream,
+    )
+    dp = Dispatcher(
+        storage=MemoryStorage(),
+        llm_service=llm_service,
+        prescription_cache=PrescriptionCache(size=1024) if args.cache else None,
+    )
+    dp.update.outer_middleware(I18nMiddleware(i18n))
+    dp.update.middleware(InMemoryUserMiddleware())
+    dp.include_router(schedules.router)
+
+    try:
+        await run(args, dp, bot, lines)
+        snapshot = metrics.snapshot()
+        print(f"LLM stub:         {dict(stub.counts)}")
+        for name in ("llm.queue_wait", "llm.latency"):
+            if name in snapshot:
+                summary = snapshot[name]
+                print(
+                    f"{name + ':':<17} p50={summary['p50'] * 1000:.0f} ms "
+                    f"p95={summary['p95'] * 1000:.0f} ms"
+                )
+        for name in ("llm.coalesced", "llm.rejected", "llm.timeouts"):
+            print(f"{name + ':':<17} {snapshot.get(name, 0)}")
+    finally:
+        await llm_service.close()
+        await bot.session.close()
+        await stub_runner.cleanup()
+        await api_runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
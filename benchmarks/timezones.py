@@ -0,0 +1,112 @@
+"""
+Micro-benchmark of dose time calculations with zoneinfo and with pytz.
+
+Runs `get_next_dose_time` and `_calculate_expected_doses` for users spread over
+several time zones, first with the cached zoneinfo layer and then, for
+comparison, with the previous pytz `localize` path. Users are created anew for
+every round, like the rows of a reminder sweep. No database is needed.
+
+Usage:
+    python benchmarks/timezones.py --users 1000 --days 30
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime
+from datetime import time as dtime
+from datetime import timedelta, timezone
+from pathlib import Path
+from unittest.mock import patch
+
+import pytz
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.models import Schedule, User  # noqa: E402
+from src.services import schedule_service  # noqa: E402
+from src.services.schedule_service import ScheduleService  # noqa: E402
+
+ZONES = [
+    "Europe/Moscow",
+    "Europe/Berlin",
+    "America/New_York",
+    "Asia/Kolkata",
+    "Australia/Sydney",
+    "America/Sao_Paulo",
+]
+
+
+def make_pairs(count: int) -> list[tuple[User, Schedule]]:
+    start = datetime(2024, 3, 1, tzinfo=timezone.utc)
+    pairs = []
+    for i in range(count):
+        user = User(
+            id=i,
+            timezone=ZONES[i % len(ZONES)],
+            day_start=dtime(8, 0),
+            day_end=dtime(22, 0),
+        )
+        schedule = Schedule(
+            id=i,
+            user_id=i,
+            doses_per_day=1 + i % 4,
+            start_datetime=start,
+            doses=[],
+        )
+        pairs.append((user, schedule))
+    return pairs
+
+
+async def run(users: int, days: int, rounds: int) -> tuple[float, float]:
+    service = ScheduleService(session=None)  # type: ignore
+    now = datetime(2024, 3, 31, 12, 0, tzinfo=timezone.utc)  # European DST switch
+    period_start = now - timedelta(days=days)
+
+    next_dose = expected = 0.0
+    for _ in range(rounds):
+        pairs = make_pairs(users)
+        started = time.perf_counter()
+        for user, schedule in pairs:
+            await service.get_next_dose_time(user, schedule, now)
+        next_dose += time.perf_counter() - started
+
+        pairs = make_pairs(users)
+        started = time.perf_counter()
+        for user, schedule in pairs:
+            service._calculate_expected_doses(user, schedule, period_start, now)
+        expected += time.perf_counter() - started
+    return next_dose / rounds, expected / rounds
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    with (
+        patch.object(User, "tz", property(lambda user: pytz.timezone(user.timezone))),
+        patch.object(schedule_service, "localize", lambda dt, tz: tz.localize(dt)),
+    ):
+        await run(args.users, args.days, 1)  # Warm up
+        pytz_next, pytz_expected = await run(args.users, args.days, args.rounds)
+
+    await run(args.users, args.days, 1)
+    next_dose, expected = await run(args.users, args.days, args.rounds)
+
+    print(f"Users: {args.users}, expected doses over {args.days} days")
+    for name, before, after in (
+        ("get_next_dose_time", pytz_next, next_dose),
+        ("_calculate_expected_doses", pytz_expected, expected),
+    ):
+        print(
+            f"{name:<26} pytz {before * 1000:8.1f} ms  "
+            f"zoneinfo {after * 1000:8.1f} ms  ({before / after:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,168 @@
+"""
+Webhook throughput benchmark with a local update generator.
+
+Runs a fake Bot API server, which answers every method and counts replies, and
+posts synthetic `/help` updates to the bot's webhook. Telegram is not involved.
+
+Usage:
+    # 1. Start the fake API and the generator, it waits for the webhook to come up
+    python benchmarks/webhook_updates.py --secret benchmark --updates 5000
+
+    # 2. Start the bot against the fake API (MariaDB and Redis must be running)
+    BOT__MODE=webhook BOT__API_URL=http://127.0.0.1:8081 \\
+    WEBHOOK__SECRET=benchmark WEBHOOK__WORKERS=4 python -m src.bot
+"""
+
+import argparse
+import asyncio
+import itertools
+import statistics
+import time
+
+import aiohttp
+from aiohttp import web
+
+
+class FakeBotAPI:
+    """Minimal Bot API server which acknowledges every request"""
+
+    def __init__(self):
+        self.replies = 0
+        self._message_ids = itertools.count(1)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"].lower()
+        data = await request.post()
+
+        result: object = True
+        if method in ("sendmessage", "editmessagetext"):
+            self.replies += 1
+            result = {
+                "message_id": next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": int(str(data.get("chat_id", 0))), "type": "private"},
+                "text": str(data.get("text", "")),
+            }
+        elif method == "getme":
+            result = {
+                "id": 1,
+                "is_bot": True,
+                "first_name": "Benchmark",
+                "username": "benchmark_bot",
+            }
+
+        return web.json_response({"ok": True, "result": result})
+
+    async def start(self, host: str, port: int) -> web.AppRunner:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        return runner
+
+
+def make_update(update_id: int, chat_id: int) -> dict:
+    user = {"id": chat_id, "is_bot": False, "first_name": "User", "language_code": "en"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private", "first_name": "User"},
+            "from": user,
+            "text": "/help",
+            "entities": [{"type": "bot_command", "offset": 0, "length": 5}],
+        },
+    }
+
+
+async def wait_for_webhook(url: str, timeout: float):
+    deadline = time.perf_counter() + timeout
+    async with aiohttp.ClientSession() as session:
+        while True:
+            try:
+                async with session.get(url):
+                    return
+            except aiohttp.ClientConnectionError:
+                if time.perf_counter() > deadline:
+                    raise
+                await asyncio.sleep(0.5)
+
+
+async def generate(args: argparse.Namespace, api: FakeBotAPI):
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies: list[float] = []
+    errors = 0
+    headers = {"X-Telegram-Bot-Api-Secret-Token": args.secret} if args.secret else {}
+
+    async def post(session: aiohttp.ClientSession, update_id: int):
+        nonlocal errors
+        update = make_update(update_id, 1_000_000 + update_id % args.chats)
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                async with session.post(args.url, json=update, headers=headers) as resp:
+                    await resp.read()
+                    if resp.status != 200:
+                        errors += 1
+            except aiohttp.ClientError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    async with aiohttp.ClientSession() as session:
+        started = time.perf_counter()
+        await asyncio.gather(*(post(session, i) for i in range(1, args.updates + 1)))
+        accepted = time.perf_counter() - started
+
+    deadline = time.perf_counter() + args.timeout
+    while api.replies < args.updates - errors and time.perf_counter() < deadline:
+        await asyncio.sleep(0.1)
+    processed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"Updates sent:         {args.updates} ({errors} errors)")
+    print(
+        f"Accepted in:          {accepted:.2f} s ({args.updates / accepted:.0f} upd/s)"
+    )
+    print(
+        "Webhook latency:      "
+        f"p50={statistics.median(latencies) * 1000:.1f} ms "
+        f"p95={latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f} ms "
+        f"max={latencies[-1] * 1000:.1f} ms"
+    )
+    print(
+        f"Replies received:     {api.replies} in {processed:.2f} s "
+        f"({api.replies / processed:.0f} upd/s)"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8080/webhook")
+    parser.add_argument("--secret", default=None)
+    parser.add_argument("--updates", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--chats", type=int, default=100)
+    parser.add_argument("--api-host", default="127.0.0.1")
+    parser.add_argument("--api-port", type=int, default=8081)
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=60,
+        help="Seconds to wait for the webhook and for replies",
+    )
+    args = parser.parse_args()
+
+    api = FakeBotAPI()
+    runner = await api.start(args.api_host, args.api_port)
+    try:
+        print(f"Fake Bot API is listening on {args.api_host}:{args.api_port}")
+        await wait_for_webhook(args.url, args.timeout)
+        await generate(args, api)
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
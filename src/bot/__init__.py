@@ -1,4 +1,4 @@
-from .bot import create_bot, get_bot
+from .bot import bots, create_bot, get_bot
 
 
-__all__ = ["create_bot", "get_bot"]
+__all__ = ["bots", "create_bot", "get_bot"]
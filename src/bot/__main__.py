@@ -1,20 +1,36 @@
+import asyncio
+import hashlib
+import json
 import logging
+import os
+import signal
+import socket
 import sys
 
 from aiogram import Bot, Dispatcher
 from aiogram.fsm.storage.base import DefaultKeyBuilder
+from aiogram.fsm.storage.memory import DisabledEventIsolation
 from aiogram.fsm.storage.redis import RedisStorage
+from redis.asyncio import Redis
 
-from src.config import settings
+from src.config import BotMode, settings
 from src.database.connector import async_session
 from src.i18n import i18n
+from src.services.geo_service import GeoService
 from src.services.llm_service import LLMService
+from src.utils.metrics import metrics
+from src.utils.parsers import PrescriptionCache
 
-from .bot import get_bot
+from . import webhook
+from .bot import bots
 from .handlers import commands, error, profile, schedules
+from .isolation import ChatEventIsolation
+from .keyboards import preload_keyboards
 from .middleware.database import DatabaseMiddleware
 from .middleware.i18n import I18nMiddleware
 from .middleware.user import UserMiddleware
+from .storage import BufferedStorage
+from .stream import StreamConsumer, UpdateStream, ingest_updates
 
 
 def create_redis_storage() -> RedisStorage:
@@ -28,17 +44,74 @@ def create_redis_storage() -> RedisStorage:
 
 
 def create_llm_service():
-    return LLMService(
+    llm_service = LLMService(
         api_key=settings.llm.api_key.get_secret_value(),
         base_url=settings.llm.url.encoded_string() if settings.llm.url else None,
         default_model=settings.llm.default_model,
         timeout=settings.llm.timeout,
+        max_concurrency=settings.llm.max_concurrency,
+        max_queue=settings.llm.max_queue,
+        stream=settings.llm.stream,
+        fallback_model=settings.llm.fallback_model,
+        hedge_delay=settings.llm.hedge_delay,
+        breaker_options=settings.llm.breaker.model_dump(),
     )
+    metrics.register("llm", llm_service.stats)
+    return llm_service
+
+
+def create_geo_service():
+    geo_service = GeoService(
+        workers=settings.geo.workers,
+        processes=settings.geo.processes,
+        timeout=settings.geo.timeout,
+        cache_size=settings.geo.cache_size,
+    )
+    metrics.register("geo", geo_service.stats)
+    return geo_service
+
+
+def create_events_isolation() -> ChatEventIsolation | None:
+    if not settings.bot.ordered_updates:
+        return None
+
+    isolation = ChatEventIsolation(settings.bot.max_concurrent_updates)
+    metrics.register("updates", isolation.stats)
+    return isolation
+
+
+async def start_metrics_reporting(dispatcher: Dispatcher):
+    dispatcher["metrics_task"] = asyncio.create_task(
+        metrics.report(settings.metrics.interval)
+    )
+
+
+async def stop_metrics_reporting(dispatcher: Dispatcher):
+    dispatcher["metrics_task"].cancel()
+
+
+async def preload_localized_keyboards():
+    preload_keyboards(i18n)
 
 
 def create_dispatcher(**kwargs):
-    redis_storage = create_redis_storage()
-    dp = Dispatcher(storage=redis_storage, **kwargs)
+    storage = BufferedStorage(create_redis_storage())
+    events_isolation = create_events_isolation() or DisabledEventIsolation()
+    dp = Dispatcher(
+        storage=storage,
+        events_isolation=storage.isolation(events_isolation),
+        prescription_cache=PrescriptionCache(
+            storage.redis,
+            size=settings.llm.cache_size,
+            ttl=settings.llm.cache_ttl,
+        ),
+        **kwargs,
+    )
+
+    dp.startup.register(preload_localized_keyboards)
+    if settings.metrics.interval:
+        dp.startup.register(start_metrics_reporting)
+        dp.shutdown.register(stop_metrics_reporting)
 
     # Register middleware
     dp.update.outer_middleware(I18nMiddleware(i18n))
@@ -55,20 +128,36 @@ def create_dispatcher(**kwargs):
 
 
 async def set_bot_commands(bot: Bot):
-    for lang in [None, "en", "ru"]:  # Supported languages
-        with i18n.context(), i18n.use_locale(lang or "en"):
-            commands_list = (
-                commands.get_commands()
-                + schedules.get_commands()
-                + profile.get_commands()
+    """Update command lists whose hash differs from the one stored in Redis"""
+    async with Redis.from_url(settings.redis.url.encoded_string()) as redis:
+        for lang in [None, "en", "ru"]:  # Supported languages
+            with i18n.context(), i18n.use_locale(lang or "en"):
+                commands_list = (
+                    commands.get_commands()
+                    + schedules.get_commands()
+                    + profile.get_commands()
+                )
+
+            payload = json.dumps(
+                [command.model_dump() for command in commands_list], sort_keys=True
             )
+            digest = hashlib.sha256(payload.encode()).hexdigest()
+            key = f"bot_commands:{bot.id}:{lang or 'default'}"
+            if (await redis.get(key)) == digest.encode():
+                continue
+
             await bot.set_my_commands(commands=commands_list, language_code=lang)
+            await redis.set(key, digest)
 
 
 async def main():
     try:
-        async with create_llm_service() as llm_service, get_bot() as bot:
-            dp = create_dispatcher(llm_service=llm_service)
+        async with (
+            create_llm_service() as llm_service,
+            create_geo_service() as geo_service,
+            bots as bot,
+        ):
+            dp = create_dispatcher(llm_service=llm_service, geo_service=geo_service)
 
             await set_bot_commands(bot)
             logging.info("Bot started. Press Ctrl+C to stop")
@@ -78,8 +167,131 @@ async def main():
         sys.exit(1)
 
 
-if __name__ == "__main__":
-    import asyncio
+def get_webhook_secret() -> str | None:
+    if not settings.webhook.secret:
+        return None
+    return settings.webhook.secret.get_secret_value()
+
+
+async def setup_webhook():
+    """Register commands and the webhook once, before workers are started"""
+    async with bots as bot:
+        await set_bot_commands(bot)
+        if settings.webhook.url:
+            await bot.set_webhook(
+                url=settings.webhook.url.encoded_string(),
+                secret_token=get_webhook_secret(),
+            )
+        else:
+            logging.warning("Webhook URL is not set, assuming it is registered")
+
+
+async def serve_webhook():
+    async with (
+        create_llm_service() as llm_service,
+        create_geo_service() as geo_service,
+        bots as bot,
+    ):
+        dp = create_dispatcher(llm_service=llm_service, geo_service=geo_service)
+        app = webhook.create_app(
+            dp,
+            bot,
+            path=settings.webhook.path,
+            secret=get_webhook_secret(),
+        )
+        await webhook.serve(
+            app,
+            settings.webhook.host,
+            settings.webhook.port,
+            reuse_port=settings.webhook.workers > 1,
+        )
 
+
+def run_webhook_worker():
+    logging.basicConfig(level=logging.INFO, stream=sys.stdout)
+    asyncio.run(serve_webhook())
+
+
+def run_webhook():
+    if not settings.webhook.secret:
+        logging.warning("Webhook secret is not set, requests are not authenticated")
+
+    asyncio.run(setup_webhook())
+    logging.info(
+        "Starting %s webhook worker(s). Press Ctrl+C to stop",
+        settings.webhook.workers,
+    )
+    webhook.run_workers(run_webhook_worker, settings.webhook.workers)
+
+
+def create_update_stream() -> UpdateStream:
+    return UpdateStream(
+        Redis.from_url(settings.redis.url.encoded_string()),
+        prefix=settings.stream.prefix,
+        partitions=settings.stream.partitions,
+        group=settings.stream.group,
+        maxlen=settings.stream.maxlen,
+    )
+
+
+async def run_ingest():
+    stream = create_update_stream()
+    try:
+        async with bots as bot:
+            await bot.delete_webhook()
+            await set_bot_commands(bot)
+            logging.info("Ingesting updates into Redis stream. Press Ctrl+C to stop")
+            await ingest_updates(
+                bot,
+                stream,
+                allowed_updates=create_dispatcher().resolve_used_update_types(),
+            )
+    finally:
+        await stream.redis.aclose()
+
+
+async def run_consumer():
+    stream = create_update_stream()
+    try:
+        async with (
+            create_llm_service() as llm_service,
+            create_geo_service() as geo_service,
+            bots as bot,
+        ):
+            dp = create_dispatcher(llm_service=llm_service, geo_service=geo_service)
+            consumer = StreamConsumer(
+                dp,
+                bot,
+                stream,
+                settings.stream.consumer or f"{socket.gethostname()}-{os.getpid()}",
+                lease_ttl=settings.stream.lease_ttl,
+                claim_idle=settings.stream.claim_idle,
+                batch_size=settings.stream.batch_size,
+            )
+            metrics.register("stream", consumer.stats)
+
+            loop = asyncio.get_running_loop()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                loop.add_signal_handler(sig, consumer.stop)
+
+            workflow_data = {"dispatcher": dp, "bots": [bot], **dp.workflow_data}
+            await dp.emit_startup(bot=bot, **workflow_data)
+            logging.info("Consuming updates from Redis stream. Press Ctrl+C to stop")
+            try:
+                await consumer.run()
+            finally:
+                await dp.emit_shutdown(bot=bot, **workflow_data)
+    finally:
+        await stream.redis.aclose()
+
+
+if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO, stream=sys.stdout)
-    asyncio.run(main())
+    if settings.bot.mode == BotMode.WEBHOOK:
+        run_webhook()
+    elif settings.bot.mode == BotMode.INGEST:
+        asyncio.run(run_ingest())
+    elif settings.bot.mode == BotMode.CONSUMER:
+        asyncio.run(run_consumer())
+    else:
+        asyncio.run(main())
@@ -1,23 +1,142 @@
+import asyncio
 import contextlib
+from types import SimpleNamespace
 
-from aiogram import Bot
+from aiogram import Bot, __version__
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.enums import ParseMode
+from aiohttp import ClientSession, TraceConfig
+from aiohttp.hdrs import USER_AGENT
+from aiohttp.http import SERVER_SOFTWARE
 
 from src.config import settings
+from src.utils.metrics import metrics
+
+
+async def _on_request_start(session, context: SimpleNamespace, params):
+    context.started = asyncio.get_running_loop().time()
+
+
+async def _on_request_end(session, context: SimpleNamespace, params):
+    metrics.observe(
+        "telegram.request", asyncio.get_running_loop().time() - context.started
+    )
+
+
+async def _on_request_exception(session, context: SimpleNamespace, params):
+    metrics.inc("telegram.request_errors")
+
+
+async def _on_connection_create(session, context: SimpleNamespace, params):
+    metrics.inc("telegram.connections_created")
+
+
+async def _on_connection_reuse(session, context: SimpleNamespace, params):
+    metrics.inc("telegram.connections_reused")
+
+
+async def _on_dns_cache_miss(session, context: SimpleNamespace, params):
+    metrics.inc("telegram.dns_lookups")
+
+
+def create_trace_config() -> TraceConfig:
+    trace_config = TraceConfig()
+    trace_config.on_request_start.append(_on_request_start)
+    trace_config.on_request_end.append(_on_request_end)
+    trace_config.on_request_exception.append(_on_request_exception)
+    trace_config.on_connection_create_end.append(_on_connection_create)
+    trace_config.on_connection_reuseconn.append(_on_connection_reuse)
+    trace_config.on_dns_cache_miss.append(_on_dns_cache_miss)
+    return trace_config
+
+
+class PooledAiohttpSession(AiohttpSession):
+    """
+    Bot API session which keeps idle connections open for reuse and reports
+    connection reuse and request latency to the metrics registry.
+    """
+
+    def __init__(
+        self,
+        *,
+        keepalive_timeout: float = 60.0,
+        dns_cache_ttl: int = 3600,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self._connector_init.update(
+            keepalive_timeout=keepalive_timeout,
+            ttl_dns_cache=dns_cache_ttl,
+        )
+
+    async def create_session(self) -> ClientSession:
+        if self._should_reset_connector:
+            await self.close()
+
+        if self._session is None or self._session.closed:
+            self._session = ClientSession(
+                connector=self._connector_type(**self._connector_init),
+                headers={USER_AGENT: f"{SERVER_SOFTWARE} aiogram/{__version__}"},
+                trace_configs=[create_trace_config()],
+            )
+            self._should_reset_connector = False
+
+        return self._session
 
 
 def create_bot():
+    session = PooledAiohttpSession(
+        limit=settings.bot.client.limit,
+        keepalive_timeout=settings.bot.client.keepalive_timeout,
+        dns_cache_ttl=settings.bot.client.dns_cache_ttl,
+    )
+    if settings.bot.api_url:
+        session.api = TelegramAPIServer.from_base(settings.bot.api_url.encoded_string())
+
     return Bot(
         token=settings.bot.token.get_secret_value(),
+        session=session,
         default=DefaultBotProperties(parse_mode=ParseMode.HTML),
     )
 
 
+class BotRegistry:
+    """
+    Process-wide bot clients, one per event loop, as aiohttp sessions can't be
+    shared between loops.
+
+    Entering the registry returns the bot of the running loop and closes it on
+    exit, which suits processes that own their loop. Code running on a loop that
+    outlives it, e.g. Celery tasks, uses `get` and closes the bot on shutdown.
+    """
+
+    def __init__(self):
+        self._bots: dict[asyncio.AbstractEventLoop, Bot] = {}
+
+    def get(self) -> Bot:
+        loop = asyncio.get_running_loop()
+        if loop not in self._bots:
+            self._bots[loop] = create_bot()
+        return self._bots[loop]
+
+    async def close(self):
+        bot = self._bots.pop(asyncio.get_running_loop(), None)
+        if bot:
+            await bot.session.close()
+
+    async def __aenter__(self) -> Bot:
+        return self.get()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+
+bots = BotRegistry()
+
+
 @contextlib.asynccontextmanager
 async def get_bot():
-    bot = create_bot()
-    try:
-        yield bot
-    finally:
-        await bot.session.close()
+    """Shared bot of the running loop, left open for the next user"""
+    yield bots.get()
@@ -1,4 +1,3 @@
-import random
 from datetime import datetime, timezone
 
 import pytz
@@ -10,16 +9,16 @@ from aiogram.types import ContentType, KeyboardButton, Message, ReplyKeyboardRem
 from aiogram.utils.i18n import gettext as _
 from aiogram.utils.i18n import lazy_gettext as __
 from aiogram.utils.keyboard import ReplyKeyboardBuilder
-from timezonefinder import TimezoneFinder
 
+from src.bot.keyboards import localized
+from src.bot.reminders import rearm_reminders
 from src.models import User
+from src.services.geo_service import GeoService
 from src.services.user_service import UserService
 
 from .router import router
 from .utils import calculate_timezone_from_time
 
-timezone_finder_singleton = TimezoneFinder()
-
 
 class StartStates(StatesGroup):
     """FSM states for the start command flow."""
@@ -29,6 +28,7 @@ class StartStates(StatesGroup):
     waiting_timezone = State()
 
 
+@localized
 def get_privacy_keyboard():
     """Create a keyboard with privacy policy acceptance options."""
 
@@ -38,6 +38,7 @@ def get_privacy_keyboard():
     return builder.as_markup(resize_keyboard=True, one_time_keyboard=True)
 
 
+@localized
 def get_phone_keyboard():
     builder = ReplyKeyboardBuilder()
     builder.button(text=_("📱 Share Phone"), request_contact=True)
@@ -45,6 +46,7 @@ def get_phone_keyboard():
     return builder.as_markup(resize_keyboard=True, one_time_keyboard=True)
 
 
+@localized
 def get_location_share_keyboard():
     builder = ReplyKeyboardBuilder()
     builder.button(text=_("🌍 Share Location"), request_location=True)
@@ -153,15 +155,19 @@ async def invalid_phone_input(message: Message):
 
 @router.message(StartStates.waiting_timezone)
 async def handle_time_input(
-    message: Message, state: FSMContext, user: User, user_service: UserService
+    message: Message,
+    state: FSMContext,
+    user: User,
+    user_service: UserService,
+    geo_service: GeoService,
 ):
     utc_now = datetime.now(timezone.utc)
     response = None
 
     # Handle location sharing
     if message.location:
-        tz = timezone_finder_singleton.timezone_at(
-            lat=message.location.latitude, lng=message.location.longitude
+        tz = await geo_service.timezone_at(
+            message.location.latitude, message.location.longitude
         )
         if tz:
             await user_service.update(user.id, timezone=tz)
@@ -173,7 +179,9 @@ async def handle_time_input(
             await user_service.update(user.id, timezone=message.text)
             response = _("✅ Timezone detected: {tz}").format(tz=message.text)
         else:
-            timezones, offset = calculate_timezone_from_time(message.text, utc_now)
+            timezones, offset = calculate_timezone_from_time(
+                message.text, utc_now, user.language_code
+            )
             if not timezones:
                 pass
             elif len(timezones) == 1:
@@ -183,8 +191,7 @@ async def handle_time_input(
                 )
             else:
                 builder = ReplyKeyboardBuilder()
-                random.shuffle(timezones)
-                for tz in sorted(timezones[:6]):  # Show top 6 matches
+                for tz in timezones[:6]:  # Show top 6 matches
                     builder.button(text=tz)
                 builder.adjust(2)
                 builder.row(
@@ -199,6 +206,7 @@ async def handle_time_input(
         pass
 
     if response:
+        await rearm_reminders(user.id)
         response += _(
             "\n\n"
             "💊 Now let's create your first medication schedule!\n\n"
@@ -1,17 +1,105 @@
+import functools
 from datetime import datetime, timedelta
 
 import pytz
 
+# Countries where a language is most likely spoken, used to rank matching zones
+LANGUAGE_COUNTRIES: dict[str, list[str]] = {
+    "en": ["US", "GB", "CA", "AU", "IE", "NZ", "IN", "ZA"],
+    "ru": ["RU", "BY", "KZ", "UA", "KG", "UZ", "AM", "GE", "AZ", "MD"],
+}
+
 
 def round_to_nearest_15_minutes(value: float) -> float:
     """Round to nearest 15 minutes (0.25 hours)"""
     return round(value * 4) / 4
 
 
+class TimezoneOffsetIndex:
+    """
+    Timezone names grouped by their current UTC offset in quarter hours.
+
+    Offsets change only on DST transitions. Current offsets are whole quarter
+    hours and transitions happen at whole local hours, so they fall on quarter
+    hour boundaries in UTC (e.g. 15:30 UTC on Lord Howe Island). The index is
+    rebuilt lazily once the quarter hour it was built in is over.
+    """
+
+    def __init__(self):
+        self._zones: dict[int, list[str]] = {}
+        self._expires_at: datetime | None = None
+
+    def get(self, offset_hours: float, utc_now: datetime) -> list[str]:
+        if self._expires_at is None or utc_now >= self._expires_at:
+            self._build(utc_now)
+        return self._zones.get(round(offset_hours * 4), [])
+
+    def _build(self, utc_now: datetime):
+        zones: dict[int, list[str]] = {}
+        for tz_name in pytz.all_timezones:
+            offset = utc_now.astimezone(pytz.timezone(tz_name)).utcoffset()
+            zones.setdefault(round(offset.total_seconds() / 900), []).append(tz_name)
+
+        quarter_start = utc_now.replace(
+            minute=utc_now.minute - utc_now.minute % 15, second=0, microsecond=0
+        )
+        self._zones = zones
+        self._expires_at = quarter_start + timedelta(minutes=15)
+
+
+offset_index = TimezoneOffsetIndex()
+
+
+@functools.cache
+def _country_ranks() -> dict[str, int]:
+    """Position of every zone in the country it belongs to"""
+    ranks: dict[str, int] = {}
+    for country, zones in pytz.country_timezones.items():
+        for position, tz_name in enumerate(zones):
+            ranks.setdefault(tz_name, position)
+    return ranks
+
+
+@functools.cache
+def _zone_countries() -> dict[str, str]:
+    return {
+        tz_name: country
+        for country, zones in pytz.country_timezones.items()
+        for tz_name in zones
+    }
+
+
+def rank_timezones(timezones: list[str], language_code: str | None) -> list[str]:
+    """
+    Order matching zones from the most to the least likely for the user.
+
+    Zones of countries where the user's language is spoken come first, in the
+    order of `LANGUAGE_COUNTRIES` (or the region of a code like `pt-BR`), then
+    the zones of other countries, then legacy aliases like `Etc/GMT-3`.
+    """
+    language, _, region = (language_code or "").lower().partition("-")
+    preferred = ([region.upper()] if region else []) + LANGUAGE_COUNTRIES.get(
+        language, []
+    )
+    countries = _zone_countries()
+    ranks = _country_ranks()
+    common = pytz.common_timezones_set
+
+    def key(tz_name: str) -> tuple:
+        country = countries.get(tz_name)
+        if country in preferred:
+            return (0, preferred.index(country), ranks[tz_name], tz_name)
+        if country:
+            return (1, 0, ranks[tz_name], tz_name)
+        return (2 if tz_name in common else 3, 0, 0, tz_name)
+
+    return sorted(timezones, key=key)
+
+
 def calculate_timezone_from_time(
-    user_time: str, utc_now: datetime
+    user_time: str, utc_now: datetime, language_code: str | None = None
 ) -> tuple[list[str] | None, float | None]:
-    """Convert local time input to possible timezones"""
+    """Convert local time input to possible timezones, most likely first"""
     try:
         # Parse user input with flexible format
         user_time = user_time.replace(".", ":").replace(",", ":")
@@ -33,22 +121,10 @@ def calculate_timezone_from_time(
         # Normalize offset to valid UTC range (-12 to +14 hours)
         offset_hours = (offset_hours + 12) % 24 - 12
 
-        # Find matching timezones (consider DST)
-        matching_zones: list[str] = []
-        for tz_name in pytz.all_timezones:
-            tz = pytz.timezone(tz_name)
-            local_now = utc_now.astimezone(tz)
-            current_offset = local_now.utcoffset().total_seconds() / 3600  # type: ignore
-            if (
-                abs(
-                    round_to_nearest_15_minutes(current_offset)
-                    - round_to_nearest_15_minutes(offset_hours)
-                )
-                < 0.001
-            ):
-                matching_zones.append(tz_name)
-
-        return matching_zones, offset_hours
+        matching_zones = offset_index.get(
+            round_to_nearest_15_minutes(offset_hours), utc_now
+        )
+        return rank_timezones(matching_zones, language_code), offset_hours
 
     except (ValueError, IndexError):
         return None, None
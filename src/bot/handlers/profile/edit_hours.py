@@ -10,6 +10,7 @@ from aiogram.utils.i18n import gettext as _
 
 from src.bot.handlers import utils
 from src.bot.keyboards import get_cancel_button
+from src.bot.reminders import rearm_reminders
 from src.models import User
 from src.services.user_service import UserService
 
@@ -93,6 +94,7 @@ async def set_hours_handler(
             )
             return  # keep state so the user can retry
 
+        await rearm_reminders(user.id)
         await state.clear()
         await message.reply(
             _("✅ Daylight hours updated to {start}:00 – {end}:00").format(
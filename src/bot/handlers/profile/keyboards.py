@@ -2,9 +2,12 @@ from aiogram.types import InlineKeyboardMarkup
 from aiogram.utils.i18n import gettext as _
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
+from src.bot.keyboards import localized
+
 from .callbacks import ProfileCallbackData, ProfileOperation
 
 
+@localized
 def get_profile_keyboard() -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     builder.button(
@@ -2,6 +2,7 @@ from aiogram import Router
 from aiogram.types import CallbackQuery
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.bot.reminders import rearm_reminders
 from src.models import User
 from src.services.schedule_service import ScheduleService
 
@@ -22,6 +23,8 @@ async def handle_dose_callback(
     service = ScheduleService(session)
 
     success, message = await service.log_dose(user.id, schedule_id)
+    if success:
+        await rearm_reminders(user.id, [schedule_id])
     # if success:
     #     with suppress(TelegramBadRequest):
     #         await callback.message.edit_reply_markup(reply_markup=None) # type: ignore
@@ -5,22 +5,27 @@ from aiogram.filters import Command, CommandObject, StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import Message, ReplyKeyboardRemove
+from aiogram.utils.i18n import get_i18n
 from aiogram.utils.i18n import gettext as _
 from aiogram.utils.i18n import lazy_gettext as __
 from aiogram.utils.keyboard import ReplyKeyboardBuilder
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.bot.keyboards import get_cancel_keyboard
+from src.bot.keyboards import get_cancel_keyboard, localized
+from src.bot.reminders import rearm_reminders
 from src.models import User
 from src.services.llm_service import LLMService
 from src.services.schedule_service import ScheduleService
 from src.utils.formatting import format_datetime
-from src.utils.parsers import parse_prescription
+from src.utils.parsers import PrescriptionCache, parse_prescriptions
 
 from .formatters import SPACING
 
 router = Router()
 
+# Seconds a user waits for the LLM before the step-by-step flow starts
+PARSE_DEADLINE = 10
+
 
 class ScheduleStates(StatesGroup):
     waiting_drug_name = State()
@@ -31,12 +36,14 @@ class ScheduleStates(StatesGroup):
     waiting_confirmation = State()
 
 
+@localized
 def get_skip_keyboard():
     builder = ReplyKeyboardBuilder()
     builder.button(text=_("➡️ Skip"))
     return builder.as_markup(resize_keyboard=True, one_time_keyboard=True)
 
 
+@localized
 def get_skip_or_cancel_keyboard():
     builder = ReplyKeyboardBuilder()
     builder.button(text=_("➡️ Skip"))
@@ -44,6 +51,14 @@ def get_skip_or_cancel_keyboard():
     return builder.as_markup(resize_keyboard=True, one_time_keyboard=True)
 
 
+@localized
+def get_confirm_keyboard():
+    builder = ReplyKeyboardBuilder()
+    builder.button(text=_("✅ Confirm"))
+    builder.button(text=_("❌ Cancel"))
+    return builder.as_markup(resize_keyboard=True)
+
+
 def is_skip(message: Message) -> bool:
     if not message.text:
         return False
@@ -51,17 +66,32 @@ def is_skip(message: Message) -> bool:
 
 
 async def process_prescription_line(
-    message: Message, line: str | None, state: FSMContext, llm_service: LLMService
+    message: Message,
+    line: str | None,
+    state: FSMContext,
+    llm_service: LLMService,
+    prescription_cache: PrescriptionCache | None = None,
 ):
     if not line:
         return None
 
-    parsed = await parse_prescription(llm_service, line)
-    if not parsed:
+    prescriptions = await parse_prescriptions(
+        llm_service,
+        line,
+        cache=prescription_cache,
+        language=get_i18n().current_locale,
+        timeout=PARSE_DEADLINE,
+    )
+    if not prescriptions:
         return False
 
-    await state.update_data(**parsed.model_dump())
-    await send_confirmation(message, parsed.model_dump())
+    if len(prescriptions) == 1:
+        await state.update_data(**prescriptions[0].model_dump())
+        await send_confirmation(message, prescriptions[0].model_dump())
+    else:
+        items = [prescription.model_dump() for prescription in prescriptions]
+        await state.update_data(prescriptions=items)
+        await send_batch_confirmation(message, items)
     await state.set_state(ScheduleStates.waiting_confirmation)
 
     return True
@@ -78,7 +108,7 @@ async def cancel(message: Message, state: FSMContext):
     )
 
 
-async def send_confirmation(message: Message, state_data: dict):
+def format_prescription(state_data: dict) -> str:
     duration = (
         _("{duration} day", "{duration} days", int(state_data["duration"])).format(
             duration=int(state_data["duration"])
@@ -90,9 +120,7 @@ async def send_confirmation(message: Message, state_data: dict):
         "{frequency} time/day", "{frequency} times/day", state_data["doses_per_day"]
     ).format(frequency=state_data["doses_per_day"])
 
-    text = _("📝 Please confirm your medication schedule:") + "\n\n"
-
-    text += (
+    text = (
         SPACING
         + _("💊 Drug: {drug_name}").format(drug_name=state_data["drug_name"])
         + "\n"
@@ -103,11 +131,26 @@ async def send_confirmation(message: Message, state_data: dict):
     text += SPACING + _("📝 Note: {comment}").format(
         comment=state_data.get("comment") or _("None")
     )
+    return text
 
-    builder = ReplyKeyboardBuilder()
-    builder.button(text=_("✅ Confirm"))
-    builder.button(text=_("❌ Cancel"))
-    await message.answer(text, reply_markup=builder.as_markup(resize_keyboard=True))
+
+async def send_confirmation(message: Message, state_data: dict):
+    text = _("📝 Please confirm your medication schedule:") + "\n\n"
+    text += format_prescription(state_data)
+
+    await message.answer(text, reply_markup=get_confirm_keyboard())
+
+
+async def send_batch_confirmation(message: Message, items: list[dict]):
+    text = _(
+        "📝 Please confirm {count} medication schedule:",
+        "📝 Please confirm {count} medication schedules:",
+        len(items),
+    ).format(count=len(items))
+    for i, item in enumerate(items, 1):
+        text += f"\n\n{i}.\n" + format_prescription(item)
+
+    await message.answer(text, reply_markup=get_confirm_keyboard())
 
 
 @router.message(Command("schedule"))
@@ -117,6 +160,7 @@ async def start_schedule(
     user: User,
     llm_service: LLMService,
     command: CommandObject,
+    prescription_cache: PrescriptionCache | None = None,
 ):
     if not user.privacy_accepted:
         await message.answer(
@@ -124,8 +168,11 @@ async def start_schedule(
         )
         return
 
+    await state.set_data({})
     args = command.args
-    parsed = await process_prescription_line(message, args, state, llm_service)
+    parsed = await process_prescription_line(
+        message, args, state, llm_service, prescription_cache
+    )
     if parsed:
         return
     if args:
@@ -147,7 +194,10 @@ async def start_schedule(
 
 @router.message(ScheduleStates.waiting_drug_name, F.text)
 async def process_drug_name(
-    message: Message, state: FSMContext, llm_service: LLMService
+    message: Message,
+    state: FSMContext,
+    llm_service: LLMService,
+    prescription_cache: PrescriptionCache | None = None,
 ):
     if not message.text:
         await message.answer(_("Please enter a valid drug name:"))
@@ -156,7 +206,7 @@ async def process_drug_name(
     # Try to parse natural language input
     if len(message.text.split()) > 3:
         parsed = await process_prescription_line(
-            message, message.text, state, llm_service
+            message, message.text, state, llm_service, prescription_cache
         )
         if parsed:
             return
@@ -250,31 +300,60 @@ async def handle_confirmation(
     service = ScheduleService(session)
 
     try:
-        schedule = await service.create_schedule(
-            user_id=user.id,
-            drug_name=state_data["drug_name"],
-            dose=state_data["dose"],
-            doses_per_day=state_data["doses_per_day"],
-            duration=state_data["duration"],
-            comment=state_data.get("comment"),
-            start_datetime=datetime.now(timezone.utc),
-        )
-        next_dose_time = await service.get_next_dose_time(user, schedule)
-        await message.answer(
-            _(
-                "✅ Schedule created successfully!\n"
-                "Next dose: {next_dose}\n"
-                "You'll receive reminders when it's time to take your medication."
-            ).format(
-                next_dose=(
-                    format_datetime(user.in_local_time(next_dose_time))
-                    if next_dose_time
-                    else _("No doses scheduled (schedule may be complete)")
-                )
-            ),
-            reply_markup=ReplyKeyboardRemove(),
-        )
+        if state_data.get("prescriptions"):
+            await create_batch(message, service, user, state_data["prescriptions"])
+        else:
+            schedule = await service.create_schedule(
+                user_id=user.id,
+                drug_name=state_data["drug_name"],
+                dose=state_data["dose"],
+                doses_per_day=state_data["doses_per_day"],
+                duration=state_data["duration"],
+                comment=state_data.get("comment"),
+                start_datetime=datetime.now(timezone.utc),
+            )
+            await rearm_reminders(user.id, [schedule.id])
+            next_dose_time = await service.get_next_dose_time(user, schedule)
+            await message.answer(
+                _(
+                    "✅ Schedule created successfully!\n"
+                    "Next dose: {next_dose}\n"
+                    "You'll receive reminders when it's time to take your medication."
+                ).format(
+                    next_dose=(
+                        format_datetime(user.in_local_time(next_dose_time))
+                        if next_dose_time
+                        else _("No doses scheduled (schedule may be complete)")
+                    )
+                ),
+                reply_markup=ReplyKeyboardRemove(),
+            )
     except ValueError as e:
         await message.answer(_("Error creating schedule: {error}").format(error=str(e)))
 
     await state.clear()
+
+
+async def create_batch(
+    message: Message, service: ScheduleService, user: User, items: list[dict]
+):
+    schedules = await service.create_schedules(
+        user.id, items, start_datetime=datetime.now(timezone.utc)
+    )
+    await rearm_reminders(user.id, [schedule.id for schedule in schedules])
+
+    text = _(
+        "✅ {count} schedule created successfully! Next doses:",
+        "✅ {count} schedules created successfully! Next doses:",
+        len(schedules),
+    ).format(count=len(schedules))
+    for schedule in schedules:
+        next_dose_time = await service.get_next_dose_time(user, schedule)
+        next_dose = (
+            format_datetime(user.in_local_time(next_dose_time))
+            if next_dose_time
+            else _("No doses scheduled (schedule may be complete)")
+        )
+        text += "\n" + SPACING + f"💊 {schedule.drug_name}: {next_dose}"
+
+    await message.answer(text, reply_markup=ReplyKeyboardRemove())
@@ -0,0 +1,61 @@
+import asyncio
+import contextlib
+from typing import AsyncGenerator
+
+from aiogram.fsm.storage.base import BaseEventIsolation, StorageKey
+
+
+class ChatEventIsolation(BaseEventIsolation):
+    """
+    Handles updates of the same chat one after another, in arrival order, while
+    updates of different chats run concurrently.
+
+    This keeps FSM steps ordered and prevents double taps from racing each other.
+    Locks of idle chats are dropped, and `max_concurrency` optionally caps the
+    number of updates handled at the same time.
+    """
+
+    def __init__(self, max_concurrency: int | None = None):
+        self._locks: dict[StorageKey, asyncio.Lock] = {}
+        self._depths: dict[StorageKey, int] = {}
+        self._semaphore = (
+            asyncio.Semaphore(max_concurrency) if max_concurrency else None
+        )
+
+        self.active = 0
+        self.max_depth = 0
+
+    @contextlib.asynccontextmanager
+    async def lock(self, key: StorageKey) -> AsyncGenerator[None, None]:
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        depth = self._depths.get(key, 0) + 1
+        self._depths[key] = depth
+        self.max_depth = max(self.max_depth, depth)
+
+        try:
+            async with lock, self._semaphore or contextlib.nullcontext():
+                self.active += 1
+                try:
+                    yield
+                finally:
+                    self.active -= 1
+        finally:
+            self._depths[key] -= 1
+            if not self._depths[key]:
+                del self._depths[key]
+                del self._locks[key]
+
+    def stats(self) -> dict[str, int]:
+        """Queue depth metrics: updates being handled and updates waiting for a slot"""
+        queued = sum(self._depths.values()) - self.active
+        return {
+            "active": self.active,
+            "queued": queued,
+            "chats": len(self._depths),
+            "max_chat_depth": max(self._depths.values(), default=0),
+            "max_chat_depth_total": self.max_depth,
+        }
+
+    async def close(self) -> None:
+        self._locks.clear()
+        self._depths.clear()
@@ -1,8 +1,45 @@
+import functools
+from typing import Callable, TypeVar
+
 from aiogram.filters.callback_data import CallbackData
 from aiogram.types import InlineKeyboardButton, ReplyKeyboardMarkup
+from aiogram.utils.i18n import I18n, get_i18n
 from aiogram.utils.i18n import gettext as _
 from aiogram.utils.keyboard import ReplyKeyboardBuilder
 
+Markup = TypeVar("Markup")
+
+_localized_keyboards: list[Callable[[], object]] = []
+
+
+def localized(func: Callable[[], Markup]) -> Callable[[], Markup]:
+    """
+    Memoize a keyboard which depends only on the current locale.
+
+    Markups are frozen Telegram objects, so the cached instance is shared by all
+    messages and must not be modified.
+    """
+    cache: dict[str, Markup] = {}
+
+    @functools.wraps(func)
+    def wrapper() -> Markup:
+        locale = get_i18n().current_locale
+        if locale not in cache:
+            cache[locale] = func()
+        return cache[locale]
+
+    _localized_keyboards.append(wrapper)
+    return wrapper
+
+
+def preload_keyboards(i18n: I18n):
+    """Build every localized keyboard for every available locale"""
+    with i18n.context():
+        for locale in i18n.available_locales:
+            with i18n.use_locale(locale):
+                for keyboard in _localized_keyboards:
+                    keyboard()
+
 
 def get_cancel_button(callback_data: CallbackData) -> InlineKeyboardButton:
     return InlineKeyboardButton(
@@ -11,6 +48,7 @@ def get_cancel_button(callback_data: CallbackData) -> InlineKeyboardButton:
     )
 
 
+@localized
 def get_cancel_keyboard() -> ReplyKeyboardMarkup:
     builder = ReplyKeyboardBuilder()
     builder.button(text=_("❌ Cancel"))
@@ -0,0 +1,35 @@
+"""
+Re-arming of ETA reminders from the bot.
+
+Tasks are sent by name, so handlers don't import the task modules, which import
+handlers themselves. The Celery app is imported on first use, in ETA mode only,
+so the bot process does not load it otherwise.
+"""
+
+import asyncio
+import logging
+
+from src.config import ReminderMode, settings
+
+logger = logging.getLogger(__name__)
+
+
+async def rearm_reminders(user_id: int, schedule_ids: list[int] | None = None):
+    """
+    Re-arm reminders of the user's schedules, all active ones by default, when
+    they are scheduled per dose. Errors are logged, the change that led here is
+    already saved.
+    """
+    if settings.reminders.mode != ReminderMode.ETA:
+        return
+
+    from src.tasks.celery import celery
+
+    try:
+        await asyncio.to_thread(
+            celery.send_task,
+            "src.tasks.notifications.arm_reminders",
+            kwargs={"user_id": user_id, "schedule_ids": schedule_ids},
+        )
+    except Exception:
+        logger.exception("Failed to re-arm reminders of user %s", user_id)
@@ -0,0 +1,149 @@
+import contextlib
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, AsyncGenerator, Mapping
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import (
+    BaseEventIsolation,
+    BaseStorage,
+    StateType,
+    StorageKey,
+)
+from aiogram.fsm.storage.redis import RedisStorage
+
+
+@dataclass
+class _Entry:
+    state: str | None
+    data: dict[str, Any]
+    dirty: bool = False
+
+
+@dataclass
+class _Buffer:
+    entries: dict[StorageKey, _Entry] = field(default_factory=dict)
+
+
+_buffer: ContextVar[_Buffer | None] = ContextVar("fsm_buffer", default=None)
+
+
+class BufferedStorage(BaseStorage):
+    """
+    Redis FSM storage which reads a chat's state and data once per update and
+    writes them back once, in a single MULTI, when the update is handled.
+
+    The update scope is opened by the events isolation returned by `isolation`,
+    which the FSM middleware enters before it reads the state. Reads load both
+    the state and the data of a key with one MGET. Outside of a scope, e.g. in
+    background tasks, the storage reads and writes Redis directly.
+    """
+
+    def __init__(self, storage: RedisStorage):
+        self.storage = storage
+        self.redis = storage.redis
+
+    def isolation(self, isolation: BaseEventIsolation) -> BaseEventIsolation:
+        return BufferedEventIsolation(self, isolation)
+
+    @contextlib.asynccontextmanager
+    async def update_scope(self) -> AsyncGenerator[None, None]:
+        """Buffer reads and writes until the end of the block, then flush"""
+        if _buffer.get() is not None:
+            yield
+            return
+
+        buffer = _Buffer()
+        token = _buffer.set(buffer)
+        try:
+            yield
+        finally:
+            _buffer.reset(token)
+            await self._flush(buffer)
+
+    def _keys(self, key: StorageKey) -> tuple[str, str]:
+        return (
+            self.storage.key_builder.build(key, "state"),
+            self.storage.key_builder.build(key, "data"),
+        )
+
+    async def _entry(self, buffer: _Buffer, key: StorageKey) -> _Entry:
+        if key not in buffer.entries:
+            state, data = await self.redis.mget(*self._keys(key))
+            if isinstance(state, bytes):
+                state = state.decode("utf-8")
+            buffer.entries[key] = _Entry(
+                state=state,
+                data=self.storage.json_loads(data) if data is not None else {},
+            )
+        return buffer.entries[key]
+
+    async def _flush(self, buffer: _Buffer):
+        dirty = [(key, entry) for key, entry in buffer.entries.items() if entry.dirty]
+        if not dirty:
+            return
+
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for key, entry in dirty:
+                state_key, data_key = self._keys(key)
+                if entry.state is None:
+                    pipe.delete(state_key)
+                else:
+                    pipe.set(state_key, entry.state, ex=self.storage.state_ttl)
+                if entry.data:
+                    pipe.set(
+                        data_key,
+                        self.storage.json_dumps(entry.data),
+                        ex=self.storage.data_ttl,
+                    )
+                else:
+                    pipe.delete(data_key)
+            await pipe.execute()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        value = state.state if isinstance(state, State) else state
+        if (buffer := _buffer.get()) is None:
+            await self.storage.set_state(key, value)
+            return
+
+        entry = await self._entry(buffer, key)
+        entry.state = value
+        entry.dirty = True
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        if (buffer := _buffer.get()) is None:
+            return await self.storage.get_state(key)
+        return (await self._entry(buffer, key)).state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if (buffer := _buffer.get()) is None:
+            await self.storage.set_data(key, dict(data))
+            return
+
+        entry = await self._entry(buffer, key)
+        entry.data = dict(data)
+        entry.dirty = True
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        if (buffer := _buffer.get()) is None:
+            return await self.storage.get_data(key)
+        return (await self._entry(buffer, key)).data.copy()
+
+    async def close(self) -> None:
+        await self.storage.close()
+
+
+class BufferedEventIsolation(BaseEventIsolation):
+    """Opens a storage update scope inside the lock of another isolation"""
+
+    def __init__(self, storage: BufferedStorage, isolation: BaseEventIsolation):
+        self.storage = storage
+        self.isolation = isolation
+
+    @contextlib.asynccontextmanager
+    async def lock(self, key: StorageKey) -> AsyncGenerator[None, None]:
+        async with self.isolation.lock(key), self.storage.update_scope():
+            yield
+
+    async def close(self) -> None:
+        await self.isolation.close()
@@ -0,0 +1,334 @@
+import asyncio
+import json
+import logging
+import math
+import random
+import time
+import zlib
+
+from aiogram import Bot, Dispatcher
+from aiogram.dispatcher.middlewares.user_context import UserContextMiddleware
+from aiogram.exceptions import TelegramNetworkError, TelegramServerError
+from aiogram.types import Update
+from redis.asyncio import Redis
+from redis.asyncio.lock import Lock
+from redis.exceptions import LockError, ResponseError
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateStream:
+    """
+    Telegram updates stored in Redis Streams.
+
+    Updates are spread over `partitions` streams by a hash of the chat id, so all
+    updates of a chat land in the same stream in arrival order.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        *,
+        prefix: str = "updates",
+        partitions: int = 16,
+        group: str = "bot",
+        maxlen: int = 100_000,
+    ):
+        self.redis = redis
+        self.prefix = prefix
+        self.partitions = partitions
+        self.group = group
+        self.maxlen = maxlen
+
+    def key(self, partition: int) -> str:
+        return f"{self.prefix}:{partition}"
+
+    def partition(self, update: Update) -> int:
+        context = UserContextMiddleware.resolve_event_context(update)
+        if context.chat:
+            shard_key = context.chat.id
+        elif context.user:
+            shard_key = context.user.id
+        else:
+            shard_key = update.update_id
+        # Stable across processes, unlike hash()
+        return zlib.crc32(str(shard_key).encode()) % self.partitions
+
+    async def publish(self, updates: list[Update]):
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for update in updates:
+                pipe.xadd(
+                    self.key(self.partition(update)),
+                    {"update": update.model_dump_json(exclude_unset=True)},
+                    maxlen=self.maxlen,
+                    approximate=True,
+                )
+            await pipe.execute()
+
+    async def create_groups(self):
+        for partition in range(self.partitions):
+            try:
+                await self.redis.xgroup_create(
+                    self.key(partition), self.group, id="0", mkstream=True
+                )
+            except ResponseError as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+
+
+async def ingest_updates(
+    bot: Bot,
+    stream: UpdateStream,
+    *,
+    allowed_updates: list[str] | None = None,
+    polling_timeout: int = 10,
+):
+    """Long-poll Telegram and write updates into the stream"""
+    offset = None
+    request_timeout = int(bot.session.timeout + polling_timeout)
+    failures = 0
+
+    while True:
+        try:
+            updates = await bot.get_updates(
+                offset=offset,
+                timeout=polling_timeout,
+                allowed_updates=allowed_updates,
+                request_timeout=request_timeout,
+            )
+        except (TelegramNetworkError, TelegramServerError) as e:
+            failures += 1
+            delay = min(2**failures, 30) + random.random()
+            logger.error("Failed to fetch updates: %s. Retry in %.1f s", e, delay)
+            await asyncio.sleep(delay)
+            continue
+
+        failures = 0
+        if not updates:
+            continue
+
+        # Advance the offset only after the updates are stored
+        await stream.publish(updates)
+        offset = updates[-1].update_id + 1
+
+
+class StreamConsumer:
+    """
+    Handles updates from the stream as a member of a consumer group.
+
+    Every partition is owned by a single replica at a time through a Redis lease,
+    which keeps the updates of a chat in order. Replicas take a fair share of the
+    partitions and give away the extra ones when new replicas join. When a replica
+    dies, its leases expire and the new owner claims the entries it left unacked.
+    """
+
+    def __init__(
+        self,
+        dp: Dispatcher,
+        bot: Bot,
+        stream: UpdateStream,
+        consumer: str,
+        *,
+        lease_ttl: int = 30,
+        claim_idle: int = 60,
+        batch_size: int = 50,
+    ):
+        self.dp = dp
+        self.bot = bot
+        self.stream = stream
+        self.redis = stream.redis
+        self.consumer = consumer
+        self.lease_ttl = lease_ttl
+        self.claim_idle_ms = claim_idle * 1000
+        self.batch_size = batch_size
+
+        self._leases: dict[int, Lock] = {}
+        # Leases given away, renewed until their workers have stopped
+        self._releasing: dict[int, Lock] = {}
+        self._releases: set[asyncio.Task] = set()
+        self._workers: dict[int, asyncio.Task] = {}
+        self._stopping = asyncio.Event()
+
+        self.handled = 0
+        self.claimed = 0
+        self.failed = 0
+
+    @property
+    def registry_key(self) -> str:
+        return f"{self.stream.prefix}:consumers"
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "partitions": len(self._leases),
+            "handled": self.handled,
+            "claimed": self.claimed,
+            "failed": self.failed,
+        }
+
+    def stop(self):
+        self._stopping.set()
+
+    async def run(self):
+        await self.stream.create_groups()
+        try:
+            while not self._stopping.is_set():
+                await self._rebalance()
+                try:
+                    await asyncio.wait_for(
+                        self._stopping.wait(), timeout=self.lease_ttl / 3
+                    )
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            await asyncio.gather(
+                *(self._release(partition) for partition in list(self._leases)),
+                *self._releases,
+            )
+            await self.redis.zrem(self.registry_key, self.consumer)
+
+    # region Partition ownership
+    async def _rebalance(self):
+        now = time.time()
+        await self.redis.zadd(self.registry_key, {self.consumer: now})
+        await self.redis.zremrangebyscore(
+            self.registry_key, "-inf", now - self.lease_ttl
+        )
+        replicas = max(1, await self.redis.zcard(self.registry_key))
+        fair_share = math.ceil(self.stream.partitions / replicas)
+
+        for partition, lease in [*self._leases.items(), *self._releasing.items()]:
+            try:
+                await lease.reacquire()
+            except LockError:
+                logger.warning("Lost lease of partition %s", partition)
+                self._leases.pop(partition, None)
+                self._releasing.pop(partition, None)
+
+        # Released in the background, so the other leases are renewed meanwhile
+        while len(self._leases) > fair_share:
+            partition = max(self._leases)
+            self._releasing[partition] = self._leases.pop(partition)
+            release = asyncio.create_task(self._release(partition))
+            self._releases.add(release)
+            release.add_done_callback(self._releases.discard)
+
+        # Partitions whose previous worker is still finishing are skipped
+        candidates = [
+            p
+            for p in range(self.stream.partitions)
+            if p not in self._leases
+            and p not in self._releasing
+            and p not in self._workers
+        ]
+        random.shuffle(candidates)
+        for partition in candidates:
+            if len(self._leases) >= fair_share:
+                break
+            lease = self.redis.lock(
+                f"{self.stream.key(partition)}:owner",
+                timeout=self.lease_ttl,
+                blocking=False,
+                thread_local=False,
+            )
+            if await lease.acquire():
+                logger.info("Acquired partition %s", partition)
+                self._leases[partition] = lease
+                self._workers[partition] = asyncio.create_task(self._consume(partition))
+
+    async def _release(self, partition: int):
+        if lease := self._leases.pop(partition, None):
+            self._releasing[partition] = lease
+        # The worker finishes its current batch before the lease is released
+        if worker := self._workers.pop(partition, None):
+            await worker
+        if lease := self._releasing.pop(partition, None):
+            try:
+                await lease.release()
+            except LockError:
+                pass
+            logger.info("Released partition %s", partition)
+
+    def _owns(self, partition: int) -> bool:
+        return partition in self._leases and not self._stopping.is_set()
+
+    # endregion
+
+    # region Consuming
+    async def _consume(self, partition: int):
+        key = self.stream.key(partition)
+        try:
+            await self._recover(partition, key)
+            while self._owns(partition):
+                response = await self.redis.xreadgroup(
+                    self.stream.group,
+                    self.consumer,
+                    {key: ">"},
+                    count=self.batch_size,
+                    block=1000,
+                )
+                for _stream, entries in response:
+                    await self._handle_batch(key, entries)
+        except Exception:
+            logger.exception("Consumer of partition %s failed", partition)
+            if lease := self._leases.pop(partition, None):
+                try:
+                    await lease.release()
+                except LockError:
+                    pass
+        finally:
+            if self._workers.get(partition) is asyncio.current_task():
+                del self._workers[partition]
+
+    async def _recover(self, partition: int, key: str):
+        """Handle entries left unacked by this consumer and by dead consumers"""
+        while self._owns(partition):
+            response = await self.redis.xreadgroup(
+                self.stream.group,
+                self.consumer,
+                {key: "0"},
+                count=self.batch_size,
+            )
+            entries = response[0][1] if response else []
+            if not entries:
+                break
+            await self._handle_batch(key, entries)
+
+        # Entries of other consumers are claimed once they are idle long enough,
+        # so a consumer which has just lost the lease can finish its batch
+        while self._owns(partition):
+            pending = await self.redis.xpending(key, self.stream.group)
+            if not pending["pending"]:
+                return
+
+            _next_id, entries, *_deleted = await self.redis.xautoclaim(
+                key,
+                self.stream.group,
+                self.consumer,
+                min_idle_time=self.claim_idle_ms,
+                count=self.batch_size,
+            )
+            if entries:
+                self.claimed += len(entries)
+                await self._handle_batch(key, entries)
+            else:
+                await asyncio.sleep(1)
+
+    async def _handle_batch(self, key: str, entries: list):
+        # Tasks enter the events isolation in stream order
+        await asyncio.gather(
+            *(self._handle(key, entry_id, fields) for entry_id, fields in entries)
+        )
+
+    async def _handle(self, key: str, entry_id: bytes, fields: dict | None):
+        if fields:
+            try:
+                await self.dp.feed_raw_update(self.bot, json.loads(fields[b"update"]))
+                self.handled += 1
+            except Exception:
+                # Failed updates are acknowledged too, so they are not redelivered forever
+                self.failed += 1
+                logger.exception("Failed to handle update %s from %s", entry_id, key)
+
+        await self.redis.xack(key, self.stream.group, entry_id)
+
+    # endregion
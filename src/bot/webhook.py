@@ -0,0 +1,76 @@
+import asyncio
+import logging
+import multiprocessing
+import signal
+from typing import Callable
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+
+def create_app(
+    dp: Dispatcher, bot: Bot, *, path: str, secret: str | None = None
+) -> web.Application:
+    """Create aiohttp application which feeds webhook updates to the dispatcher"""
+    app = web.Application()
+    SimpleRequestHandler(dispatcher=dp, bot=bot, secret_token=secret).register(
+        app, path=path
+    )
+    setup_application(app, dp, bot=bot)
+    return app
+
+
+async def serve(app: web.Application, host: str, port: int, *, reuse_port: bool):
+    """Serve the application until SIGINT or SIGTERM is received"""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port, reuse_port=reuse_port)
+    await site.start()
+    logger.info("Webhook server is listening on %s:%s", host, port)
+
+    try:
+        await stop.wait()
+    finally:
+        await runner.cleanup()
+
+
+def run_workers(target: Callable[[], None], workers: int):
+    """
+    Run `target` in the given number of processes.
+
+    Workers are spawned rather than forked, so each one builds its own event loop,
+    Bot session and database pool. The kernel balances connections between them
+    when they listen on the same port with SO_REUSEPORT.
+    """
+    if workers == 1:
+        target()
+        return
+
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=target, name=f"webhook-worker-{i}")
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+
+    def terminate(signum, frame):
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    signal.signal(signal.SIGINT, terminate)
+    signal.signal(signal.SIGTERM, terminate)
+
+    for process in processes:
+        process.join()
+        if process.exitcode:
+            logger.error("%s exited with code %s", process.name, process.exitcode)
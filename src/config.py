@@ -1,15 +1,110 @@
+import enum
+
 from pydantic import AnyUrl, BaseModel, Field, RedisDsn, SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
+class BotMode(str, enum.Enum):
+    POLLING = "polling"
+    WEBHOOK = "webhook"
+    INGEST = "ingest"  # Poll Telegram and write updates into the Redis stream
+    CONSUMER = "consumer"  # Handle updates from the Redis stream
+
+
+class TelegramClientSettings(BaseModel):
+    limit: int = Field(
+        default=100,
+        ge=0,
+        description="Maximum number of open connections to the Bot API, 0 for no limit",
+    )
+    keepalive_timeout: float = Field(
+        default=60.0,
+        description="Seconds an idle connection is kept open for reuse",
+    )
+    dns_cache_ttl: int = Field(
+        default=3600,
+        description="Seconds resolved Bot API addresses are cached",
+    )
+
+
 class BotSettings(BaseModel):
     token: SecretStr
     admins: list[int] = Field(default_factory=list)
+    mode: BotMode = Field(
+        default=BotMode.POLLING,
+        description="How updates are received from Telegram",
+    )
+    api_url: AnyUrl | None = Field(
+        default=None,
+        description="Base URL of a self-hosted or local Bot API server",
+    )
+    ordered_updates: bool = Field(
+        default=True,
+        description="Handle updates of a chat one by one, different chats concurrently",
+    )
+    max_concurrent_updates: int | None = Field(
+        default=None,
+        ge=1,
+        description="Maximum number of updates handled at the same time",
+    )
+    client: TelegramClientSettings = Field(default_factory=TelegramClientSettings)
+
+
+class WebhookSettings(BaseModel):
+    url: AnyUrl | None = Field(
+        default=None,
+        description="Public webhook URL registered with Telegram",
+    )
+    secret: SecretStr | None = Field(
+        default=None,
+        description="Expected value of the X-Telegram-Bot-Api-Secret-Token header",
+    )
+    host: str = Field(default="0.0.0.0")
+    port: int = Field(default=8080)
+    path: str = Field(default="/webhook")
+    workers: int = Field(
+        default=1,
+        ge=1,
+        description="Number of worker processes sharing the port via SO_REUSEPORT",
+    )
 
 
 class DatabaseSettings(BaseModel):
     url: AnyUrl
     echo: bool = Field(default=False)
+    slow_query_threshold: float | None = Field(
+        default=None,
+        description="Log statements running longer than this many seconds",
+    )
+    slow_query_sample_rate: float = Field(
+        default=1.0,
+        ge=0,
+        le=1,
+        description="Fraction of slow statements to log",
+    )
+    slow_query_explain: bool = Field(
+        default=True,
+        description="Capture EXPLAIN plans of slow SELECT statements",
+    )
+
+
+class CircuitBreakerSettings(BaseModel):
+    window: int = Field(default=20, ge=1, description="Calls the rates are based on")
+    min_calls: int = Field(default=5, ge=1)
+    failure_rate: float = Field(
+        default=0.5,
+        gt=0,
+        le=1,
+        description="Share of failed or slow calls which opens the circuit",
+    )
+    slow_call: float = Field(
+        default=10.0,
+        description="Calls slower than this many seconds count as failures",
+    )
+    open_for: float = Field(
+        default=30.0,
+        description="Seconds before a probe call is let through an open circuit",
+    )
 
 
 class LLMSettings(BaseModel):
@@ -17,6 +112,48 @@ class LLMSettings(BaseModel):
     default_model: str | None = None
     timeout: int = 30
     api_key: SecretStr
+    fallback_model: str | None = Field(
+        default=None,
+        description="Model used when the default one fails or is slow",
+    )
+    hedge_delay: float | None = Field(
+        default=None,
+        description="Seconds before a request is also sent to the fallback model",
+    )
+    breaker: CircuitBreakerSettings = Field(default_factory=CircuitBreakerSettings)
+    stream: bool = Field(
+        default=False,
+        description="Stream completions and stop reading once the JSON answer is complete",
+    )
+    max_concurrency: int = Field(
+        default=4,
+        ge=1,
+        description="Maximum number of LLM requests sent at the same time",
+    )
+    max_queue: int = Field(
+        default=50,
+        ge=0,
+        description="Requests waiting for a free slot before new ones are rejected",
+    )
+    cache_size: int = Field(
+        default=1024,
+        ge=0,
+        description="Parsed prescriptions kept in process memory",
+    )
+    cache_ttl: int = Field(
+        default=60 * 60 * 24 * 7,  # 1 week
+        description="Parsed prescription time-to-live in Redis, in seconds",
+    )
+
+
+class GeoSettings(BaseModel):
+    workers: int = Field(default=1, ge=1, description="Timezone lookup workers")
+    processes: bool = Field(
+        default=False,
+        description="Run lookups in worker processes instead of threads",
+    )
+    timeout: float = Field(default=2.0, description="Lookup timeout in seconds")
+    cache_size: int = Field(default=4096, ge=0)
 
 
 class RedisSettings(BaseModel):
@@ -30,6 +167,75 @@ class RedisSettings(BaseModel):
     )
 
 
+class StreamSettings(BaseModel):
+    prefix: str = Field(default="updates", description="Key prefix of the streams")
+    partitions: int = Field(
+        default=16,
+        ge=1,
+        description="Number of streams updates are sharded into by chat id",
+    )
+    group: str = Field(default="bot", description="Consumer group name")
+    consumer: str | None = Field(
+        default=None,
+        description="Consumer name, defaults to hostname and process id",
+    )
+    maxlen: int = Field(
+        default=100_000,
+        description="Approximate maximum length of each stream",
+    )
+    lease_ttl: int = Field(
+        default=30,
+        ge=3,
+        description="Seconds a replica owns a partition without renewing the lease",
+    )
+    claim_idle: int = Field(
+        default=60,
+        description="Seconds before unacked entries of another consumer are claimed",
+    )
+    batch_size: int = Field(default=50, ge=1)
+
+
+class ReminderMode(str, enum.Enum):
+    SWEEP = "sweep"  # Periodically look for due doses
+    ETA = "eta"  # Schedule a task for the exact time of each next dose
+
+
+class ReminderSettings(BaseModel):
+    mode: ReminderMode = Field(
+        default=ReminderMode.SWEEP, description="How reminders are scheduled"
+    )
+    chunk_size: int = Field(
+        default=1000,
+        ge=1,
+        description="Schedules the reminder sweep fetches and dispatches at a time",
+    )
+    shards: int = Field(
+        default=1,
+        ge=1,
+        description="Parallel tasks the reminder sweep is split into by user id",
+    )
+    shard_retries: int = Field(
+        default=2, ge=0, description="Times failed shards of a sweep are retried"
+    )
+    shard_retry_delay: float = Field(
+        default=30.0, ge=0, description="Seconds before failed shards are retried"
+    )
+    eta_horizon: int = Field(
+        default=3000,
+        ge=60,
+        description="Seconds ahead reminder tasks are armed at most in ETA mode, "
+        "below the broker visibility timeout. Later doses are reached in hops",
+    )
+
+
+class MetricsSettings(BaseModel):
+    interval: int = Field(
+        default=0,
+        ge=0,
+        description="Seconds between metrics log records, 0 disables reporting",
+    )
+
+
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -41,6 +247,7 @@ class Settings(BaseSettings):
 
     # Telegram
     bot: BotSettings
+    webhook: WebhookSettings = Field(default_factory=WebhookSettings)
 
     # Database
     db: DatabaseSettings
@@ -48,8 +255,20 @@ class Settings(BaseSettings):
     # LLM
     llm: LLMSettings
 
+    # Location to timezone lookup
+    geo: GeoSettings = Field(default_factory=GeoSettings)
+
     # Redis
     redis: RedisSettings = Field(default_factory=RedisSettings)
 
+    # Horizontal scaling through Redis Streams
+    stream: StreamSettings = Field(default_factory=StreamSettings)
+
+    # Reminder sweep
+    reminders: ReminderSettings = Field(default_factory=ReminderSettings)
+
+    # Metrics
+    metrics: MetricsSettings = Field(default_factory=MetricsSettings)
+
 
 settings = Settings()  # type: ignore
@@ -5,6 +5,7 @@ from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
 
 from ..config import settings
+from .slow_query import SlowQueryLog
 
 DATABASE_URL = settings.db.url.encoded_string()
 
@@ -23,6 +24,14 @@ engine = create_async_engine(
         "read_timeout": 30,
     },
 )
+if settings.db.slow_query_threshold is not None:
+    SlowQueryLog(
+        engine,
+        settings.db.slow_query_threshold,
+        sample_rate=settings.db.slow_query_sample_rate,
+        explain=settings.db.slow_query_explain,
+    ).install()
+
 async_session = async_sessionmaker(engine, expire_on_commit=False)
 
 
@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import random
+import re
+import sys
+import time
+
+import greenlet
+from cachetools import TTLCache
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+# Execution option used to exclude a statement from slow query tracking
+SKIP_OPTION = "skip_slow_query_log"
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_PLACEHOLDERS_LIST_RE = re.compile(
+    r"\(\s*(?:%s|\?|%\(\w+\)s|:\w+)(?:\s*,\s*(?:%s|\?|%\(\w+\)s|:\w+))+\s*\)"
+)
+_NUMBER_RE = re.compile(r"(?<![\w`.])\d+(?:\.\d+)?\b")
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+
+_MAX_PARAMS_LENGTH = 500
+
+
+def normalize_sql(statement: str) -> str:
+    """Collapse whitespace and replace literals so similar statements group together"""
+    statement = _WHITESPACE_RE.sub(" ", statement).strip()
+    statement = _STRING_RE.sub("?", statement)
+    statement = _NUMBER_RE.sub("?", statement)
+    return _PLACEHOLDERS_LIST_RE.sub("(...)", statement)
+
+
+def find_caller(prefix: str = "src.services") -> str | None:
+    """
+    Find the application function that issued the statement.
+
+    Statements run inside the SQLAlchemy greenlet, so the search continues into
+    the parent greenlets, where the awaiting coroutines live.
+    """
+    glet = greenlet.getcurrent()
+    frame = sys._getframe(1)
+    while glet is not None:
+        while frame is not None:
+            module = frame.f_globals.get("__name__", "")
+            if module.startswith(prefix):
+                return f"{module}.{frame.f_code.co_qualname}"
+            frame = frame.f_back
+        glet = glet.parent
+        frame = glet.gr_frame if glet is not None else None
+    return None
+
+
+class SlowQueryLog:
+    """
+    Logs statements which take longer than the threshold.
+
+    Slow ``SELECT`` statements additionally get their ``EXPLAIN`` plan captured in
+    the background on a separate connection. Only a sample of slow statements is
+    reported, and every normalized statement is explained at most once per
+    ``explain_interval`` seconds.
+    """
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        threshold: float,
+        *,
+        sample_rate: float = 1.0,
+        explain: bool = True,
+        explain_interval: int = 600,
+        max_pending_explains: int = 4,
+    ):
+        self.engine = engine
+        self.threshold = threshold
+        self.sample_rate = sample_rate
+        self.explain = explain
+        self.max_pending_explains = max_pending_explains
+
+        self._explained = TTLCache(maxsize=1000, ttl=explain_interval)
+        self._pending: set[asyncio.Task] = set()
+
+    def install(self):
+        event.listen(self.engine.sync_engine, "before_cursor_execute", self._before)
+        event.listen(self.engine.sync_engine, "after_cursor_execute", self._after)
+        event.listen(self.engine.sync_engine, "handle_error", self._error)
+
+    def uninstall(self):
+        event.remove(self.engine.sync_engine, "before_cursor_execute", self._before)
+        event.remove(self.engine.sync_engine, "after_cursor_execute", self._after)
+        event.remove(self.engine.sync_engine, "handle_error", self._error)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    def _error(self, exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start_time"):
+            conn.info["query_start_time"].pop()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+        if elapsed < self.threshold:
+            return
+        if context is not None and context.execution_options.get(SKIP_OPTION):
+            return
+        if random.random() >= self.sample_rate:
+            return
+
+        normalized = normalize_sql(statement)
+        params = repr(parameters)
+        if len(params) > _MAX_PARAMS_LENGTH:
+            params = params[:_MAX_PARAMS_LENGTH] + "..."
+
+        logger.warning(
+            "Slow query (%.3f s) from %s: %s; parameters: %s",
+            elapsed,
+            find_caller() or "unknown",
+            normalized,
+            params,
+        )
+
+        if self.explain and not executemany:
+            self._schedule_explain(statement, parameters, normalized)
+
+    def _schedule_explain(self, statement: str, parameters, normalized: str):
+        if statement.lstrip()[:6].upper() != "SELECT":
+            return
+        if normalized in self._explained:
+            return
+        if len(self._pending) >= self.max_pending_explains:
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+
+        self._explained[normalized] = True
+        task = loop.create_task(self._explain(statement, parameters, normalized))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _explain(self, statement: str, parameters, normalized: str):
+        try:
+            async with self.engine.connect() as conn:
+                conn = await conn.execution_options(**{SKIP_OPTION: True})
+                result = await conn.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+                plan = [tuple(row) for row in result.all()]
+        except Exception as e:
+            logger.warning("Failed to explain slow query %s: %s", normalized, e)
+            return
+
+        logger.warning(
+            "Slow query plan for %s:\n%s",
+            normalized,
+            "\n".join(str(row) for row in plan),
+        )
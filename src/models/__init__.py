@@ -1,12 +1,13 @@
 import enum
 from datetime import datetime, time
 from functools import cached_property
+from zoneinfo import ZoneInfo
 
-import pytz
 from sqlalchemy import CheckConstraint, Enum, ForeignKey, String, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from ..database.connector import Base
+from ..utils.timezones import get_timezone
 from .mixins import TimedModelMixin
 from .types import UTCDateTime
 from .utils import default_now
@@ -37,7 +38,7 @@ class User(Base, TimedModelMixin):
     first_name: Mapped[str] = mapped_column(String(64), nullable=False)
     last_name: Mapped[str] = mapped_column(String(64), nullable=True)
     timezone: Mapped[str] = mapped_column(
-        String(32), default="UTC"
+        String(32), default="UTC", index=True
     )  # e.g., "Europe/Berlin"
     language_code: Mapped[str] = mapped_column(
         String(5), server_default="en", nullable=False
@@ -73,8 +74,8 @@ class User(Base, TimedModelMixin):
         return (end_minutes - start_minutes) / 60.0
 
     @cached_property
-    def tz(self) -> pytz.BaseTzInfo:
-        return pytz.timezone(self.timezone)
+    def tz(self) -> ZoneInfo:
+        return get_timezone(self.timezone)
 
     def in_local_time(self, dt: datetime) -> datetime:
         """Convert UTC datetime to user's local time"""
@@ -109,6 +110,10 @@ class Schedule(Base, TimedModelMixin):
         UTCDateTime(timezone=True),
         nullable=True,
     )
+    # Bumped whenever the armed reminder becomes stale, see `REMINDERS__MODE`
+    reminder_version: Mapped[int] = mapped_column(
+        server_default=text("0"), default=0, nullable=False
+    )
 
     # Relationships
     user: Mapped["User"] = relationship(back_populates="schedules", lazy="select")
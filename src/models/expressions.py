@@ -0,0 +1,40 @@
+from sqlalchemy import DateTime
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ColumnElement
+
+
+class DoseWindowStart(ColumnElement):
+    """
+    UTC moment since which a confirmed dose counts towards the current intake.
+
+    For once-a-day schedules it is the start of the UTC day, otherwise it is
+    half of the interval between doses ago. Refers to the `schedules` and `users`
+    tables, so both must be present in the enclosing query.
+    """
+
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(DoseWindowStart)
+def _compile_dose_window_start(element, compiler, **kw):
+    return (
+        "IF("
+        "`schedules`.`doses_per_day` = 1, "
+        "UTC_DATE(), "
+        "UTC_TIMESTAMP() - INTERVAL ((HOUR(`users`.`day_end`) - HOUR(`users`.`day_start`)) / (`schedules`.`doses_per_day` - 1) / 2) HOUR"
+        ")"
+    )
+
+
+@compiles(DoseWindowStart, "sqlite")
+def _compile_dose_window_start_sqlite(element, compiler, **kw):
+    return (
+        "CASE WHEN schedules.doses_per_day = 1 "
+        "THEN date('now') "
+        "ELSE datetime('now', '-' || ("
+        "(CAST(substr(users.day_end, 1, 2) AS INTEGER) - CAST(substr(users.day_start, 1, 2) AS INTEGER)) * 1.0 "
+        "/ (schedules.doses_per_day - 1) / 2"
+        ") || ' hours') "
+        "END"
+    )
@@ -1,5 +1,6 @@
+from .geo_service import GeoService
 from .llm_service import LLMService
 from .schedule_service import ScheduleService
 from .user_service import UserService
 
-__all__ = ["LLMService", "ScheduleService", "UserService"]
+__all__ = ["GeoService", "LLMService", "ScheduleService", "UserService"]
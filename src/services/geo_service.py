@@ -0,0 +1,113 @@
+import asyncio
+import functools
+import logging
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from timezonefinder import TimezoneFinder
+
+logger = logging.getLogger(__name__)
+
+
+@functools.cache
+def get_timezone_finder() -> "TimezoneFinder":
+    """
+    TimezoneFinder of the current process, created on first use.
+
+    Loading its polygon data takes about half a second and tens of megabytes, so
+    the module is imported here rather than at the top.
+    """
+    from timezonefinder import TimezoneFinder
+
+    return TimezoneFinder()
+
+
+def _init_worker():
+    get_timezone_finder()
+
+
+def _timezone_at(lat: float, lng: float) -> str | None:
+    return get_timezone_finder().timezone_at(lat=lat, lng=lng)
+
+
+class GeoService:
+    """
+    Location to timezone lookup which does not block the event loop.
+
+    The polygon math runs in a thread or process pool whose workers load
+    TimezoneFinder when they start. Results are cached by coordinates rounded to
+    `precision` decimal places (2 is about a kilometre).
+    """
+
+    def __init__(
+        self,
+        *,
+        workers: int = 1,
+        processes: bool = False,
+        timeout: float = 2.0,
+        cache_size: int = 4096,
+        precision: int = 2,
+    ):
+        self.executor: Executor
+        if processes:
+            self.executor = ProcessPoolExecutor(workers, initializer=_init_worker)
+        else:
+            self.executor = ThreadPoolExecutor(
+                workers, thread_name_prefix="geo", initializer=_init_worker
+            )
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self.precision = precision
+        self._cache: OrderedDict[tuple[float, float], str | None] = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.timeouts = 0
+
+    async def __aenter__(self):
+        self.warm_up()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def warm_up(self):
+        """Start a worker in the background so the first lookup is fast"""
+        self.executor.submit(_init_worker)
+
+    async def timezone_at(self, lat: float, lng: float) -> str | None:
+        key = (round(lat, self.precision), round(lng, self.precision))
+        if key in self._cache:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        self.misses += 1
+        loop = asyncio.get_running_loop()
+        try:
+            tz = await asyncio.wait_for(
+                loop.run_in_executor(self.executor, _timezone_at, *key),
+                timeout=self.timeout,
+            )
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logger.warning("Timezone lookup for %s timed out", key)
+            return None
+
+        self._cache[key] = tz
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return tz
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "cached": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "timeouts": self.timeouts,
+        }
+
+    async def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -1,10 +1,15 @@
+import asyncio
 import json
 import logging
+from dataclasses import dataclass
 
 import aiohttp
 import aiohttp.client_exceptions
 from pydantic import BaseModel
 
+from src.utils.circuit_breaker import CircuitBreaker
+from src.utils.metrics import metrics
+
 logger = logging.getLogger(__name__)
 
 # Constants for OpenRouter configuration
@@ -19,9 +24,84 @@ class LLMRequest(BaseModel):
     model: str | None = None
     temperature: float = 0.3
     max_tokens: int = 500
+    # Return only the first complete JSON object of the answer, as soon as it
+    # has arrived when streaming
+    json_object: bool = False
+
+
+class JSONObjectDetector:
+    """
+    Finds the first complete JSON object in a growing text. Balanced braces which
+    do not parse as JSON, like a `{placeholder}` in prose, are skipped.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._pos = 0
+        self._start: int | None = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk: str) -> str | None:
+        self.text += chunk
+        while self._pos < len(self.text):
+            i, char = self._pos, self.text[self._pos]
+            self._pos += 1
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"' and self._start is not None:
+                self._in_string = True
+            elif char == "{":
+                if self._start is None:
+                    self._start = i
+                self._depth += 1
+            elif char == "}" and self._start is not None:
+                self._depth -= 1
+                if not self._depth:
+                    found = self.text[self._start : i + 1]
+                    try:
+                        json.loads(found)
+                        return found
+                    except json.JSONDecodeError:
+                        # Look for an object inside or after it
+                        self._pos, self._start = self._start + 1, None
+        return None
+
+
+class LLMOverloadedError(Exception):
+    """Too many requests are already waiting for a free slot"""
+
+
+class LLMCircuitOpenError(Exception):
+    """Circuits of all models are open, the API is not called"""
+
+
+@dataclass
+class _Flight:
+    task: asyncio.Task[str]
+    waiters: int = 0
 
 
 class LLMService:
+    """
+    OpenRouter chat completions client.
+
+    At most `max_concurrency` requests are sent at a time, and up to `max_queue`
+    more wait for a slot; beyond that requests fail fast. Identical concurrent
+    requests share one API call, and each caller may pass its own deadline.
+
+    Every model has a circuit breaker. With a `fallback_model`, requests go to
+    it when the circuit of the primary model is open, and with `hedge_delay` a
+    second request is sent to it when the primary one is still running after
+    that many seconds; the first valid answer wins.
+    """
+
     def __init__(
         self,
         api_key: str,
@@ -29,6 +109,12 @@ class LLMService:
         base_url: str | None = None,
         default_model: str | None = None,
         timeout: int = 30,
+        max_concurrency: int = 4,
+        max_queue: int = 50,
+        stream: bool = False,
+        fallback_model: str | None = None,
+        hedge_delay: float | None = None,
+        breaker_options: dict | None = None,
     ):
         base_url = base_url or DEFAULT_BASE_URL
         default_model = default_model or DEFAULT_MODEL
@@ -44,29 +130,233 @@ class LLMService:
             timeout=aiohttp.ClientTimeout(total=timeout),
         )
 
+        self.stream = stream
+        self.fallback_model = fallback_model
+        self.hedge_delay = hedge_delay
+        self._breaker_options = breaker_options or {}
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._flights: dict[tuple, _Flight] = {}
+        self.active = 0
+        self.queued = 0
+        # Flights between `complete` and `_landed`, counted before their tasks
+        # start, so that a burst arriving in one loop iteration is capped too
+        self.admitted = 0
+
     async def __aenter__(self):
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         await self.close()
 
-    async def complete(self, request: LLMRequest) -> str:
+    def stats(self) -> dict[str, int | str]:
+        return {
+            "active": self.active,
+            "queued": self.queued,
+            "in_flight": len(self._flights),
+            **{
+                f"circuit:{model}": breaker.state.value
+                for model, breaker in self._breakers.items()
+            },
+        }
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        if model not in self._breakers:
+            self._breakers[model] = CircuitBreaker(model, **self._breaker_options)
+        return self._breakers[model]
+
+    async def complete(
+        self, request: LLMRequest, *, timeout: float | None = None
+    ) -> str:
+        """
+        Complete the prompt, waiting at most `timeout` seconds, queueing included.
+
+        Raises `LLMOverloadedError` when the queue is full, `LLMCircuitOpenError`
+        when no model may be called and `TimeoutError` when the deadline passes.
+        """
+        key = (
+            request.model or self.default_model,
+            request.prompt,
+            request.temperature,
+            request.max_tokens,
+            request.json_object,
+        )
+        flight = self._flights.get(key)
+        if flight:
+            metrics.inc("llm.coalesced")
+        else:
+            if self.admitted >= self.max_concurrency + self.max_queue:
+                metrics.inc("llm.rejected")
+                raise LLMOverloadedError("Too many LLM requests are queued")
+            self.admitted += 1
+            flight = _Flight(asyncio.create_task(self._complete_hedged(request)))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda task: self._landed(key, task))
+
+        flight.waiters += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(flight.task), timeout)
+        except asyncio.TimeoutError:
+            metrics.inc("llm.timeouts")
+            raise
+        finally:
+            flight.waiters -= 1
+            # Nobody needs the answer anymore, free the slot for other requests
+            if not flight.waiters and not flight.task.done():
+                flight.task.cancel()
+                # Identical requests from now on start a new flight
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+
+    def _landed(self, key: tuple, task: asyncio.Task[str]):
+        self.admitted -= 1
+        flight = self._flights.get(key)
+        if flight and flight.task is task:
+            del self._flights[key]
+        # Retrieving the exception keeps abandoned failures out of the asyncio log
+        if not task.cancelled() and task.exception():
+            logger.debug("LLM request failed: %s", task.exception())
+
+    async def _complete_hedged(self, request: LLMRequest) -> str:
+        primary = request.model or self.default_model
+        fallback = self.fallback_model if self.fallback_model != primary else None
+
+        if not self.breaker(primary).allow():
+            if fallback and self.breaker(fallback).allow():
+                metrics.inc("llm.fallbacks")
+                return await self._attempt(request, fallback)
+            metrics.inc("llm.circuit_open")
+            raise LLMCircuitOpenError(f"Circuit of {primary} is open")
+
+        first = asyncio.create_task(self._attempt(request, primary))
+        if not fallback or self.hedge_delay is None:
+            return await first
+
+        second: asyncio.Task[str] | None = None
+        try:
+            done, _ = await asyncio.wait({first}, timeout=self.hedge_delay)
+            if done or not self.breaker(fallback).allow():
+                return await first
+
+            metrics.inc("llm.hedged")
+            second = asyncio.create_task(self._attempt(request, fallback))
+            pending = {first, second}
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if not task.exception():
+                        if task is second:
+                            metrics.inc("llm.hedge_won")
+                        return task.result()
+            # Both failed, report the error of the primary model
+            return first.result()
+        finally:
+            for task in (first, second):
+                if task and not task.done():
+                    task.cancel()
+
+    async def _attempt(self, request: LLMRequest, model: str) -> str:
+        breaker = self.breaker(model)
+        loop = asyncio.get_running_loop()
+        queued_at = loop.time()
+        self.queued += 1
+        try:
+            await self._semaphore.acquire()
+        except asyncio.CancelledError:
+            breaker.cancelled()
+            raise
+        finally:
+            self.queued -= 1
+
+        started = loop.time()
+        metrics.observe("llm.queue_wait", started - queued_at)
+        self.active += 1
+        try:
+            result = await self._request(request, model)
+        except asyncio.CancelledError:
+            # Abandoned calls still tell that the model is slow
+            if loop.time() - started >= breaker.slow_call:
+                breaker.record(False, loop.time() - started)
+            else:
+                breaker.cancelled()
+            raise
+        except Exception:
+            breaker.record(False, loop.time() - started)
+            raise
+        else:
+            breaker.record(True, loop.time() - started)
+            return result
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+            metrics.observe("llm.latency", loop.time() - started)
+
+    async def _request(self, request: LLMRequest, model: str) -> str:
         async with self.session.post(
             "chat/completions",
             json={
-                "model": request.model or self.default_model,
+                "model": model,
                 "messages": [{"role": "user", "content": request.prompt}],
                 "temperature": request.temperature,
                 "max_tokens": request.max_tokens,
+                "stream": self.stream,
             },
         ) as response:
             response.raise_for_status()
+            if self.stream:
+                return await self._read_stream(request, response)
+
             try:
                 data = await response.json()
-                return data["choices"][0]["message"]["content"]
+                content = data["choices"][0]["message"]["content"]
             except (KeyError, IndexError, json.JSONDecodeError) as e:
                 # Handle errors in response format
                 raise ValueError(f"Invalid response format from LLM API: {e}") from e
 
+        if request.json_object:
+            if not (found := JSONObjectDetector().feed(content)):
+                raise ValueError("No JSON object in the LLM answer")
+            return found
+        return content
+
+    async def _read_stream(
+        self, request: LLMRequest, response: aiohttp.ClientResponse
+    ) -> str:
+        """
+        Read server-sent completion chunks.
+
+        With `json_object` the answer is returned as soon as the first JSON object
+        is complete, and the rest of the stream is dropped with the connection.
+        """
+        detector = JSONObjectDetector()
+        data_lines: list[str] = []
+
+        async for raw_line in response.content:
+            line = raw_line.decode("utf-8").rstrip("\r\n")
+            if line.startswith("data:"):
+                data_lines.append(line[5:].strip())
+                continue
+            if line or not data_lines:
+                continue  # Comments, other fields or keep-alive blank lines
+
+            data, data_lines = "\n".join(data_lines), []
+            if data == "[DONE]":
+                break
+            try:
+                delta = json.loads(data)["choices"][0]["delta"].get("content") or ""
+            except (KeyError, IndexError, json.JSONDecodeError) as e:
+                raise ValueError(f"Invalid stream chunk from LLM API: {e}") from e
+
+            if (found := detector.feed(delta)) and request.json_object:
+                return found
+
+        if request.json_object:
+            raise ValueError("No JSON object in the LLM answer")
+        return detector.text
+
     async def close(self):
         await self.session.close()
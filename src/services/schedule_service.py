@@ -1,41 +1,67 @@
 import logging
 from datetime import datetime, time, timedelta, timezone
-from typing import Optional
+from typing import AsyncIterator, NamedTuple, Optional
 
-import pytz
 from aiogram.utils.i18n import gettext as _
-from sqlalchemy import BooleanClauseList, asc, select, text
+from sqlalchemy import BooleanClauseList, asc, insert, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from sqlalchemy.sql.base import ExecutableOption
 
 from src.models import Dose, Schedule, User
+from src.models.expressions import DoseWindowStart
+from src.utils.timezones import localize, zones_by_local_time
 
 logger = logging.getLogger(__name__)
 
 
+class ReminderCandidate(NamedTuple):
+    """Columns of an active schedule the reminder sweep reads"""
+
+    schedule_id: int
+    user_id: int
+
+
 class ScheduleService:
     def __init__(self, session: AsyncSession):
         self.session = session
 
     # region Create
     async def create_schedule(self, user_id: int, **data) -> Schedule:
-        self._validate_schedule_data(data)
+        schedules = await self.create_schedules(user_id, [data])
+        return schedules[0]
 
-        fields = {k: v for k, v in data.items() if k in Schedule.__table__.columns}
-        if "start_datetime" not in fields:
-            fields["start_datetime"] = datetime.now(timezone.utc)
+    async def create_schedules(
+        self, user_id: int, items: list[dict], **common
+    ) -> list[Schedule]:
+        """
+        Create several schedules in one transaction.
 
-        schedule = Schedule(user_id=user_id, doses=[], **fields)
-        if "end_datetime" not in fields and fields.get("duration"):
-            schedule.end_datetime = fields["start_datetime"] + timedelta(
-                days=fields["duration"]
-            )
+        Every item is validated before anything is added, so either all schedules
+        are created or none. `common` values, e.g. `start_datetime`, apply to
+        every item.
+        """
+        items = [{**common, **item} for item in items]
+        for data in items:
+            self._validate_schedule_data(data)
 
-        self.session.add(schedule)
+        now = datetime.now(timezone.utc)
+        schedules = []
+        for data in items:
+            fields = {k: v for k, v in data.items() if k in Schedule.__table__.columns}
+            fields.setdefault("start_datetime", now)
+
+            schedule = Schedule(user_id=user_id, doses=[], **fields)
+            if "end_datetime" not in fields and fields.get("duration"):
+                schedule.end_datetime = fields["start_datetime"] + timedelta(
+                    days=fields["duration"]
+                )
+            schedules.append(schedule)
+
+        self.session.add_all(schedules)
         await self.session.commit()
 
-        return schedule
+        return schedules
 
     def _validate_schedule_data(self, data):
         required = ["drug_name", "dose", "doses_per_day"]
@@ -128,6 +154,69 @@ class ScheduleService:
         )
         return schedules[0] if schedules else None
 
+    async def get_reminder_candidates(
+        self, now: datetime | None = None
+    ) -> list[ReminderCandidate]:
+        """
+        Schedules of users within their daylight hours, due today and not taken
+        in the current window, ordered by user.
+
+        Only the columns the sweep needs are selected, and rows become plain
+        records instead of ORM objects.
+        """
+        result = await self.session.execute(self._reminder_candidates_query(now))
+        return [ReminderCandidate._make(row) for row in result]
+
+    async def stream_reminder_candidates(
+        self,
+        now: datetime | None = None,
+        *,
+        chunk_size: int = 1000,
+        shard: tuple[int, int] | None = None,
+        after_user_id: int | None = None,
+    ) -> AsyncIterator[list[ReminderCandidate]]:
+        """
+        Same as `get_reminder_candidates`, but read from a server-side cursor
+        and yielded `chunk_size` rows at a time. Schedules of a user may be
+        split between two chunks.
+
+        `shard` is an `(index, count)` pair limiting the rows to users whose
+        id gives `index` modulo `count`, `after_user_id` to users after it.
+        """
+        stmt = self._reminder_candidates_query(now)
+        if shard:
+            index, count = shard
+            stmt = stmt.where(Schedule.user_id % count == index)
+        if after_user_id is not None:
+            stmt = stmt.where(Schedule.user_id > after_user_id)
+
+        result = await self.session.stream(stmt.execution_options(yield_per=chunk_size))
+        async for partition in result.partitions():
+            yield [ReminderCandidate._make(row) for row in partition]
+
+    async def get_active_user_ids(self) -> list[int]:
+        """Users with at least one active schedule"""
+        now = datetime.now(timezone.utc)
+        result = await self.session.execute(
+            select(Schedule.user_id)
+            .distinct()
+            .where(self._get_active_filter(now, only_today=False))
+            .order_by(Schedule.user_id)
+        )
+        return list(result.scalars().all())
+
+    def _reminder_candidates_query(self, now: datetime | None):
+        now = now or datetime.now(timezone.utc)
+        return (
+            select(Schedule.id, Schedule.user_id)
+            .join(Schedule.user)
+            .where(
+                self._get_awake_filter(now),
+                self._get_active_filter(now, only_today=True, not_taken=True),
+            )
+            .order_by(Schedule.user_id, Schedule.id)
+        )
+
     def _get_loading_options(
         self, with_doses: bool, with_user: bool
     ) -> list[ExecutableOption]:
@@ -155,20 +244,24 @@ class ScheduleService:
                 .where(
                     Dose.schedule_id == Schedule.id,
                     Dose.confirmed,
-                    Dose.taken_datetime
-                    > text(
-                        "IF("
-                        "`schedules`.`doses_per_day` = 1, "
-                        "UTC_DATE(), "
-                        "UTC_TIMESTAMP() - INTERVAL ((HOUR(`users`.`day_end`) - HOUR(`users`.`day_start`)) / (`schedules`.`doses_per_day` - 1) / 2) HOUR"
-                        ")"
-                    ),
+                    Dose.taken_datetime > DoseWindowStart(),
                 )
                 .exists()
             )
 
         return base_filter
 
+    def _get_awake_filter(self, now: datetime) -> BooleanClauseList:
+        """Users within their daylight hours, compared once per local time"""
+        return or_(
+            *(
+                User.timezone.in_(zones)
+                & (User.day_start <= local_time)
+                & (User.day_end >= local_time)
+                for local_time, zones in zones_by_local_time(now).items()
+            )
+        )
+
     # endregion
 
     # region Update
@@ -184,10 +277,38 @@ class ScheduleService:
             raise ValueError(f"Schedule with id {schedule_id} is already stopped.")
 
         schedule.end_datetime = datetime.now(timezone.utc)
+        schedule.reminder_version += 1
         await self.session.commit()
 
         return schedule
 
+    async def bump_reminder_versions(
+        self, user_id: int, schedule_ids: list[int] | None = None
+    ) -> None:
+        """Make reminders armed for the user's schedules, by default all, stale"""
+        stmt = (
+            update(Schedule)
+            .where(Schedule.user_id == user_id)
+            .values(reminder_version=Schedule.reminder_version + 1)
+        )
+        if schedule_ids is not None:
+            stmt = stmt.where(Schedule.id.in_(schedule_ids))
+        await self.session.execute(stmt)
+        await self.session.commit()
+
+    async def claim_reminder(self, schedule_id: int, version: int) -> bool:
+        """
+        Make the reminder armed with `version` stale before it is sent. Returns
+        False if it already was, so a reminder delivered twice is sent once.
+        Not committed: the claim holds the row until the reminder is recorded.
+        """
+        result = await self.session.execute(
+            update(Schedule)
+            .where(Schedule.id == schedule_id, Schedule.reminder_version == version)
+            .values(reminder_version=version + 1)
+        )
+        return result.rowcount == 1  # type: ignore
+
     # endregion
 
     # region Doses
@@ -244,11 +365,12 @@ class ScheduleService:
             return await self.get_next_dose_time(
                 user,
                 schedule,
-                user.tz.localize(
+                localize(
                     datetime.combine(
                         user.in_local_time(schedule.start_datetime).date(),
                         user.day_start,
-                    )
+                    ),
+                    user.tz,
                 ).astimezone(timezone.utc),
             )
 
@@ -259,11 +381,12 @@ class ScheduleService:
             return await self.get_next_dose_time(
                 user,
                 schedule,
-                user.tz.localize(
+                localize(
                     datetime.combine(
                         (local_now + timedelta(days=1)).date(),
                         user.day_start,
-                    )
+                    ),
+                    user.tz,
                 ).astimezone(timezone.utc),
             )
 
@@ -282,11 +405,12 @@ class ScheduleService:
             return await self.get_next_dose_time(
                 user,
                 schedule,
-                user.tz.localize(
+                localize(
                     datetime.combine(
                         (local_now + timedelta(days=1)).date(),
                         user.day_start,
-                    )
+                    ),
+                    user.tz,
                 ).astimezone(timezone.utc),
             )
 
@@ -298,17 +422,18 @@ class ScheduleService:
             return await self.get_next_dose_time(
                 user,
                 schedule,
-                user.tz.localize(
+                localize(
                     datetime.combine(
                         (local_now + timedelta(days=1)).date(),
                         user.day_start,
-                    )
+                    ),
+                    user.tz,
                 ).astimezone(timezone.utc),
             )
 
         # Use user's local date for accurate dose time calculation
-        next_dose_local = user.tz.localize(
-            datetime.combine(local_now.date(), nearest_time)
+        next_dose_local = localize(
+            datetime.combine(local_now.date(), nearest_time), user.tz
         )
         logger.debug(
             "Calculated next dose time: %s (local: %s)",
@@ -319,31 +444,52 @@ class ScheduleService:
         return max(next_dose_local.astimezone(timezone.utc), now_utc)
 
     async def get_current_dose(self, user: User, schedule: Schedule) -> Dose:
+        return (await self.get_current_doses(user, [schedule]))[0]
+
+    async def get_current_doses(
+        self, user: User, schedules: list[Schedule]
+    ) -> list[Dose]:
+        """Get current doses of several schedules of the same user in a single query"""
+        if not schedules:
+            return []
+
         now = datetime.now(timezone.utc)
-        local_now = user.in_local_time(now)
-        local_today = local_now.date()
+        local_today = user.in_local_time(now).date()
 
         # Create proper timezone-aware datetime for the user's local day boundaries
-        day_start_local = user.tz.localize(datetime.combine(local_today, time(0, 0, 0)))
+        day_start_local = localize(
+            datetime.combine(local_today, time(0, 0, 0)), user.tz
+        )
         day_start_utc = day_start_local.astimezone(timezone.utc)
         day_end_utc = day_start_utc + timedelta(days=1)
 
-        today_doses = (
-            (
-                await self.session.execute(
-                    select(Dose)
-                    .where(
-                        (Dose.schedule_id == schedule.id)
-                        & (Dose.taken_datetime >= day_start_utc)
-                        & (Dose.taken_datetime < day_end_utc)
-                    )
-                    .order_by(Dose.taken_datetime.desc())
-                )
+        result = await self.session.execute(
+            select(Dose)
+            .where(
+                (Dose.schedule_id.in_([schedule.id for schedule in schedules]))
+                & (Dose.taken_datetime >= day_start_utc)
+                & (Dose.taken_datetime < day_end_utc)
             )
-            .scalars()
-            .all()
+            .order_by(Dose.taken_datetime.desc())
         )
 
+        doses_by_schedule: dict[int, list[Dose]] = {}
+        for dose in result.scalars().all():
+            doses_by_schedule.setdefault(dose.schedule_id, []).append(dose)
+
+        return [
+            self._select_current_dose(
+                user, schedule, doses_by_schedule.get(schedule.id, []), now
+            )
+            for schedule in schedules
+        ]
+
+    def _select_current_dose(
+        self, user: User, schedule: Schedule, today_doses: list[Dose], now: datetime
+    ) -> Dose:
+        local_now = user.in_local_time(now)
+        local_today = local_now.date()
+
         confirmed_doses = [d for d in today_doses if d.confirmed]
 
         if len(confirmed_doses) >= schedule.doses_per_day:
@@ -383,10 +529,9 @@ class ScheduleService:
             ),
         )
         # Localize with user's timezone, then convert to UTC for comparison
-        local_nearest = user.tz.localize(
-            datetime.combine(local_today, nearest_time)
-        ) - timedelta(minutes=interval_minutes / 2)
-        nearest_date = local_nearest.astimezone(timezone.utc)
+        nearest_date = localize(
+            datetime.combine(local_today, nearest_time), user.tz
+        ).astimezone(timezone.utc) - timedelta(minutes=interval_minutes / 2)
 
         nearest_dose = next(
             (d for d in today_doses if d.taken_datetime > nearest_date), None
@@ -445,6 +590,25 @@ class ScheduleService:
             drug_name=schedule.drug_name,
         )
 
+    async def record_reminders(self, doses: list[Dose]) -> None:
+        """Store unconfirmed doses for sent reminders in a single statement"""
+        if not doses:
+            return
+
+        now = datetime.now(timezone.utc)
+        await self.session.execute(
+            insert(Dose),
+            [
+                {
+                    "user_id": dose.user_id,
+                    "schedule_id": dose.schedule_id,
+                    "taken_datetime": now,
+                    "confirmed": False,
+                }
+                for dose in doses
+            ],
+        )
+
     # endregion
 
     # region Reports
@@ -493,7 +657,6 @@ class ScheduleService:
         for schedule in schedules:
             logger.debug("Process schedule %s", str(schedule))
 
-            tz = pytz.timezone(schedule.user.timezone)
             expected_doses = self._calculate_expected_doses(
                 schedule.user, schedule, start_date, end_date
             )
@@ -501,7 +664,7 @@ class ScheduleService:
             actual_doses = doses_by_schedule.get(schedule.id, [])
             logger.debug("Actual doses: %s", str(actual_doses))
 
-            on_time, late = self._categorize_doses(expected_doses, actual_doses, tz)
+            on_time, late = self._categorize_doses(expected_doses, actual_doses)
             taken = len(on_time) + len(late)
             missed = max(0, len(expected_doses) - taken)
 
@@ -539,7 +702,7 @@ class ScheduleService:
         times = self.get_doses_times(user, schedule)
 
         return [
-            user.tz.localize(datetime.combine(local_start + timedelta(days=day), t))
+            localize(datetime.combine(local_start + timedelta(days=day), t), user.tz)
             for day in range(days)
             for t in times
         ]
@@ -548,7 +711,6 @@ class ScheduleService:
         self,
         expected: list[datetime],
         actual: list[Dose],
-        tz: pytz.BaseTzInfo,
     ):
         """Categorize doses as on-time or late"""
         on_time = []
@@ -560,9 +722,11 @@ class ScheduleService:
         if not actual:
             return on_time, late
 
+        # Compared in UTC, aware datetimes of the same zone are compared by wall time
+        expected = [e.astimezone(timezone.utc) for e in expected]
         idx = 0
         for dose in actual:
-            dose_time = dose.taken_datetime.astimezone(tz)
+            dose_time = dose.taken_datetime.astimezone(timezone.utc)
             while True:
                 if idx >= len(expected):
                     late.append(dose)
@@ -1,16 +1,29 @@
 from celery.schedules import crontab
 
+from src.config import ReminderMode, settings
+
 
 def get_beat_schedule():
     """
     Returns the Celery beat schedule configuration.
 
     Defines a periodic task that sends medication reminders every 15 minutes
-    with a 5-minute expiration time.
+    with a 5-minute expiration time. With `REMINDERS__MODE=eta` reminders are
+    scheduled per dose instead, and all of them are re-armed daily in case a
+    chain of reminders was broken, e.g. by a broker outage.
 
     Returns:
         dict: The beat schedule configuration dictionary
     """
+    if settings.reminders.mode == ReminderMode.ETA:
+        return {
+            "arm-all-reminders": {
+                "task": "src.tasks.notifications.arm_all_reminders",
+                "schedule": crontab(minute=30, hour=3),  # Daily at 03:30 UTC
+                "options": {"expires": 3600},
+            },
+        }
+
     return {
         "send-medication-reminders": {
             "task": "src.tasks.notifications.send_medication_reminders",
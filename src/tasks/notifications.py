@@ -1,17 +1,26 @@
 import asyncio
 import functools
+import itertools
 import logging
-from datetime import datetime, timezone
+import time
+from datetime import datetime, timedelta, timezone
+from operator import attrgetter
+from typing import Any, Iterator
 
+from aiogram import Bot
 from aiogram.utils.i18n import gettext as _
-from celery import shared_task
+from celery import Task, chord, shared_task
+from celery.signals import worker_process_shutdown
 
-from src.bot import get_bot
+from src.bot import bots, get_bot
 from src.bot.handlers.schedules.keyboards import get_taken_keyboard
+from src.config import settings
 from src.database.connector import get_db
 from src.i18n import use_locale
 from src.models import Schedule
 from src.services import ScheduleService
+from src.services.schedule_service import ReminderCandidate
+from src.utils.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -24,33 +33,157 @@ def sync(f):
     return wrapper
 
 
+@worker_process_shutdown.connect
+def close_bot(**kwargs):
+    """Close the Bot API connections the tasks of this process shared"""
+    snapshot = metrics.snapshot()
+    logger.info(
+        "Telegram client: %s",
+        {
+            name: value
+            for name, value in snapshot.items()
+            if name.startswith("telegram.")
+        },
+    )
+    asyncio.get_event_loop().run_until_complete(bots.close())
+
+
+def _dispatch_reminders(candidates: list[ReminderCandidate]) -> Iterator[int]:
+    """
+    Queue a notification for each user, `candidates` are ordered by user.
+    Yields the id of each user once queued.
+    """
+    for user_id, rows in itertools.groupby(candidates, key=attrgetter("user_id")):
+        send_notification.delay(
+            user_id=user_id, schedule_ids=[s.schedule_id for s in rows]
+        )
+        yield user_id
+
+
+@shared_task
+def send_medication_reminders():
+    """Periodic task to check for due reminders, split into parallel shards"""
+    shards = settings.reminders.shards
+    _dispatch_sweep(
+        datetime.now(timezone.utc).isoformat(),
+        {shard: None for shard in range(shards)},
+        shards,
+    )
+
+
+def _dispatch_sweep(
+    now: str,
+    shards: dict[int, int | None],
+    count: int,
+    attempt: int = 1,
+    countdown: float = 0,
+):
+    """
+    Run `shards` of the sweep at `now` and pass the results to the coordinator.
+    `shards` maps each shard to the user it resumes after, if any.
+    """
+    chord(
+        sweep_reminder_shard.s(now, shard, count, after_user_id).set(
+            countdown=countdown
+        )
+        for shard, after_user_id in shards.items()
+    )(finish_reminder_sweep.s(now, count, attempt=attempt))
+
+
 @shared_task
 @sync
-async def send_medication_reminders():
-    """Periodic task to check for due reminders"""
-    async with get_db() as session:
-        now = datetime.now(timezone.utc)
+async def sweep_reminder_shard(
+    now: str, shard: int, shards: int, after_user_id: int | None = None
+) -> dict[str, Any]:
+    """
+    Queue reminders for the users of one shard of the sweep at `now`, starting
+    after `after_user_id`.
+
+    Failures are reported in the result instead of raised, so the coordinator
+    hears from every shard. `last_user_id` in the result is the last user queued,
+    for a retry to resume after without notifying anyone twice.
+    """
+    sweep_time = datetime.fromisoformat(now)
+    started = time.monotonic()
+    notified = 0
+    last_user_id = after_user_id
+    try:
+        async with get_db() as session:
+            # Schedules of the last user in a chunk may continue in the next one
+            pending: list[ReminderCandidate] = []
+            async for chunk in ScheduleService(session).stream_reminder_candidates(
+                sweep_time,
+                chunk_size=settings.reminders.chunk_size,
+                shard=(shard, shards),
+                after_user_id=after_user_id,
+            ):
+                pending.extend(chunk)
+                complete = len(pending)
+                while complete and pending[complete - 1].user_id == pending[-1].user_id:
+                    complete -= 1
+                for last_user_id in _dispatch_reminders(pending[:complete]):
+                    notified += 1
+                del pending[:complete]
 
-        schedules_svc = ScheduleService(session)
-        schedules = await schedules_svc.get_active_schedules(
-            None, only_today=True, not_taken=True, with_user=True
+            for last_user_id in _dispatch_reminders(pending):
+                notified += 1
+    except Exception as e:
+        logger.exception("Reminder sweep %s shard %s/%s failed", now, shard, shards)
+        return {
+            "shard": shard,
+            "ok": False,
+            "notified": notified,
+            "last_user_id": last_user_id,
+            "error": repr(e),
+        }
+
+    return {
+        "shard": shard,
+        "ok": True,
+        "notified": notified,
+        "last_user_id": last_user_id,
+        "duration": time.monotonic() - started,
+        "lag": (datetime.now(timezone.utc) - sweep_time).total_seconds(),
+    }
+
+
+@shared_task
+def finish_reminder_sweep(
+    results: list[dict[str, Any]], now: str, shards: int, attempt: int = 1
+) -> dict[str, Any]:
+    """
+    Log completion, lag and failures of the shards of a sweep and retry the
+    failed shards from where they stopped, up to `REMINDERS__SHARD_RETRIES` times.
+    """
+    completed = [result for result in results if result["ok"]]
+    failed = {
+        result["shard"]: result["last_user_id"]
+        for result in results
+        if not result["ok"]
+    }
+    summary = {
+        "sweep": now,
+        "attempt": attempt,
+        "completed": [result["shard"] for result in completed],
+        "failed": list(failed),
+        "notified": sum(result["notified"] for result in results),
+        "max_lag": max((result["lag"] for result in completed), default=None),
+        "lag": {result["shard"]: result["lag"] for result in completed},
+        "duration": {result["shard"]: result["duration"] for result in completed},
+    }
+    logger.info("Reminder sweep: %s", summary)
+
+    if failed and attempt <= settings.reminders.shard_retries:
+        _dispatch_sweep(
+            now,
+            failed,
+            shards,
+            attempt=attempt + 1,
+            countdown=settings.reminders.shard_retry_delay,
         )
-        schedules_by_user: dict[int, list[Schedule]] = {}
-        for schedule in schedules:
-            user_id = schedule.user_id
-            if user_id not in schedules_by_user:
-                schedules_by_user[user_id] = []
-            schedules_by_user[user_id].append(schedule)
-
-        for user_id, schedules in schedules_by_user.items():
-            user = schedules[0].user
-            local_time = user.in_local_time(now).time()
-            if local_time < user.day_start or local_time > user.day_end:
-                continue
-
-            send_notification.delay(
-                user_id=user_id, schedule_ids=[s.id for s in schedules]
-            )
+    elif failed:
+        logger.error("Reminder sweep %s gave up on shards %s", now, list(failed))
+    return summary
 
 
 @shared_task(
@@ -60,37 +193,171 @@ async def send_medication_reminders():
 async def send_notification(user_id: int, schedule_ids: list[int]):
     """Send reminder to user about multiple schedules"""
     async with get_db() as session, get_bot() as bot:
-        schedule_svc = ScheduleService(session)
-        schedules = await schedule_svc.select_schedules(
-            user_id, schedule_ids, not_taken=True, with_doses=True, with_user=True
-        )
-        doses = [await schedule_svc.get_current_dose(s.user, s) for s in schedules]
+        await _remind(ScheduleService(session), bot, user_id, schedule_ids)
 
-        new_doses = [(s, d) for s, d in zip(schedules, doses) if not d.id]
-        if not new_doses:
-            return
 
-        user = new_doses[0][0].user
-
-        with use_locale(user.language_code):
-            header = _("⏰ Reminder: Time to take your medications:") + "\n"
-            message = header
-            for schedule, _unused in new_doses:
-                message += (
-                    "    "
-                    + _("- {drug}: {dose}").format(
-                        drug=schedule.drug_name, dose=schedule.dose
-                    )
-                    + "\n"
+async def _remind(
+    schedule_svc: ScheduleService, bot: Bot, user_id: int, schedule_ids: list[int]
+):
+    """Send a reminder about the schedules whose current dose is not taken yet"""
+    schedules = await schedule_svc.select_schedules(
+        user_id, schedule_ids, not_taken=True, with_doses=True, with_user=True
+    )
+    if not schedules:
+        return
+
+    doses = await schedule_svc.get_current_doses(schedules[0].user, schedules)
+
+    new_doses = [(s, d) for s, d in zip(schedules, doses) if not d.id]
+    if not new_doses:
+        return
+
+    user = new_doses[0][0].user
+
+    with use_locale(user.language_code):
+        header = _("⏰ Reminder: Time to take your medications:") + "\n"
+        message = header
+        for schedule, _unused in new_doses:
+            message += (
+                "    "
+                + _("- {drug}: {dose}").format(
+                    drug=schedule.drug_name, dose=schedule.dose
                 )
+                + "\n"
+            )
+
+        await bot.send_message(
+            chat_id=user.telegram_id,
+            text=message,
+            reply_markup=get_taken_keyboard([s for s, _unused in new_doses]),
+        )
 
-            await bot.send_message(
-                chat_id=user.telegram_id,
-                text=message,
-                reply_markup=get_taken_keyboard([s for s, _unused in new_doses]),
+    # Mark as "taken" but unconfirmed until user interacts with the notification
+    await schedule_svc.record_reminders([dose for _unused, dose in new_doses])
+
+
+async def _arm(
+    schedule_svc: ScheduleService,
+    schedules: list[Schedule],
+    after: datetime | None = None,
+):
+    """Schedule a reminder task at the next dose of each schedule"""
+    for schedule in schedules:
+        due = await schedule_svc.get_next_dose_time(schedule.user, schedule, after)
+        if due is None:
+            continue
+
+        _queue_dose_reminder(
+            (schedule.user_id, schedule.id, schedule.reminder_version, due.isoformat())
+        )
+
+
+def _queue_dose_reminder(args: tuple[int, int, int, str]):
+    """
+    Queue `send_dose_reminder` at the due time in `args`, or at most
+    `REMINDERS__ETA_HORIZON` ahead. Redis hands tasks waiting for their ETA to
+    another worker after the visibility timeout, so farther doses are reached
+    in hops.
+    """
+    due = datetime.fromisoformat(args[-1])
+    horizon = datetime.now(timezone.utc) + timedelta(
+        seconds=settings.reminders.eta_horizon
+    )
+    send_dose_reminder.apply_async(args, eta=min(due, horizon))
+
+
+@shared_task
+@sync
+async def arm_reminders(user_id: int, schedule_ids: list[int] | None = None):
+    """
+    Re-arm reminders of the user's schedules, all active ones by default, after
+    a dose is logged, a schedule is created or stopped or the hours change.
+    Reminders armed before become stale.
+    """
+    async with get_db() as session:
+        schedule_svc = ScheduleService(session)
+        await schedule_svc.bump_reminder_versions(user_id, schedule_ids)
+        if schedule_ids is None:
+            schedules = await schedule_svc.get_active_schedules(
+                user_id, with_doses=True, with_user=True
             )
+        else:
+            schedules = await schedule_svc.select_schedules(
+                user_id, schedule_ids, with_doses=True, with_user=True
+            )
+        await _arm(schedule_svc, schedules)
+
+
+@shared_task
+@sync
+async def arm_all_reminders():
+    """Arm reminders of all active schedules, e.g. after switching to ETA mode"""
+    async with get_db() as session:
+        user_ids = await ScheduleService(session).get_active_user_ids()
+
+    for user_id in user_ids:
+        arm_reminders.delay(user_id)
+    logger.info("Armed reminders of %s users", len(user_ids))
+
+
+async def _arm_next(
+    schedule_svc: ScheduleService,
+    user_id: int,
+    schedule_id: int,
+    due: str,
+):
+    """Arm the reminder of the dose after the one due at `due`"""
+    schedules = await schedule_svc.select_schedules(
+        user_id, [schedule_id], with_doses=True, with_user=True
+    )
+    after = max(datetime.now(timezone.utc), datetime.fromisoformat(due))
+    await _arm(schedule_svc, schedules, after + timedelta(minutes=1))
+
+
+async def _skip_dose_reminder(user_id: int, schedule_id: int, version: int, due: str):
+    """
+    Give up on the reminder of a dose, but keep the chain going with the next
+    dose, unless the schedule was re-armed meanwhile
+    """
+    async with get_db() as session:
+        schedule_svc = ScheduleService(session)
+        if await schedule_svc.claim_reminder(schedule_id, version):
+            await _arm_next(schedule_svc, user_id, schedule_id, due)
+
+
+class DoseReminderTask(Task):
+    def on_failure(self, exc, task_id, args, kwargs, einfo):
+        """Out of retries, arm the next dose, as nothing else would"""
+        logger.error("Reminder %s failed for good: %s", args, exc)
+        try:
+            sync(_skip_dose_reminder)(*args, **kwargs)
+        except Exception:
+            logger.exception("Failed to arm the next reminder after %s", args)
+
+
+@shared_task(
+    base=DoseReminderTask,
+    autoretry_for=(Exception,),
+    retry_backoff=3,
+    retry_kwargs={"max_retries": 3},
+)
+@sync
+async def send_dose_reminder(user_id: int, schedule_id: int, version: int, due: str):
+    """
+    Remind of the dose of a schedule due at `due` and arm the reminder of the
+    next one. Nothing happens if the schedule was re-armed since `version`.
+    """
+    if datetime.fromisoformat(due) > datetime.now(timezone.utc):
+        # A hop towards a dose beyond the horizon, stale ones end at the dose
+        _queue_dose_reminder((user_id, schedule_id, version, due))
+        return
+
+    async with get_db() as session, get_bot() as bot:
+        schedule_svc = ScheduleService(session)
+        # The claim is committed together with the reminder, or rolled back
+        if not await schedule_svc.claim_reminder(schedule_id, version):
+            logger.debug("Stale reminder %s of schedule %s", version, schedule_id)
+            return
 
-        for _unused, dose in new_doses:
-            dose.taken_datetime = datetime.now(timezone.utc)
-            # Mark as "taken" but unconfirmed until user interacts with the notification
-            session.add(dose)
+        await _remind(schedule_svc, bot, user_id, [schedule_id])
+        await _arm_next(schedule_svc, user_id, schedule_id, due)
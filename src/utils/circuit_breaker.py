@@ -0,0 +1,90 @@
+import enum
+import logging
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitState(str, enum.Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Stops calls to a dependency which keeps failing or answering slowly.
+
+    The last `window` calls are tracked, and calls slower than `slow_call`
+    seconds count as failures. Once at least `min_calls` were made and the
+    failure rate reaches `failure_rate`, the circuit opens and `allow` refuses
+    calls for `open_for` seconds. After that a single probe call is let
+    through, and its outcome closes or reopens the circuit.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        window: int = 20,
+        min_calls: int = 5,
+        failure_rate: float = 0.5,
+        slow_call: float = 10.0,
+        open_for: float = 30.0,
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call = slow_call
+        self.open_for = open_for
+
+        self.state = CircuitState.CLOSED
+        self._outcomes: deque[bool] = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        if self.state == CircuitState.OPEN:
+            if time.monotonic() - self._opened_at < self.open_for:
+                return False
+            self.state = CircuitState.HALF_OPEN
+            self._probing = False
+
+        if self.state == CircuitState.HALF_OPEN:
+            if self._probing:
+                return False
+            self._probing = True
+        return True
+
+    def record(self, success: bool, duration: float):
+        failed = not success or duration >= self.slow_call
+
+        if self.state == CircuitState.HALF_OPEN:
+            self._probing = False
+            if failed:
+                self._open()
+            else:
+                logger.info("Circuit %s is closed again", self.name)
+                self.state = CircuitState.CLOSED
+                self._outcomes.clear()
+            return
+
+        self._outcomes.append(failed)
+        if (
+            self.state == CircuitState.CLOSED
+            and len(self._outcomes) >= self.min_calls
+            and sum(self._outcomes) / len(self._outcomes) >= self.failure_rate
+        ):
+            self._open()
+
+    def cancelled(self):
+        """The call was abandoned before it had an outcome"""
+        if self.state == CircuitState.HALF_OPEN:
+            self._probing = False
+
+    def _open(self):
+        logger.warning("Circuit %s is open for %s s", self.name, self.open_for)
+        self.state = CircuitState.OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
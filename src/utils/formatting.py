@@ -1,39 +1,92 @@
+import functools
 from datetime import date, datetime, time
 from typing import Literal, Optional
 
 from aiogram.utils.i18n import get_i18n
-from babel.dates import format_date as fd
-from babel.dates import format_datetime as fdt
-from babel.dates import format_time as ft
+from babel import Locale
+from babel.dates import (
+    UTC,
+    DateTimePattern,
+    get_date_format,
+    get_datetime_format,
+    get_time_format,
+    parse_pattern,
+)
 
 Format = Literal["full", "long", "medium", "short"]
+PREDEFINED_FORMATS = ("full", "long", "medium", "short")
+
+
+# region Cached Babel objects
+@functools.cache
+def get_locale(locale: str) -> Locale:
+    """Parsed Babel locale, shared between calls"""
+    return Locale.parse(locale)
+
+
+@functools.cache
+def _date_pattern(format: str, locale: str) -> DateTimePattern:
+    if format in PREDEFINED_FORMATS:
+        return get_date_format(format, locale=get_locale(locale))  # type: ignore
+    return parse_pattern(format)
+
+
+@functools.cache
+def _time_pattern(format: str, locale: str) -> DateTimePattern:
+    if format in PREDEFINED_FORMATS:
+        return get_time_format(format, locale=get_locale(locale))  # type: ignore
+    return parse_pattern(format)
+
+
+@functools.cache
+def _datetime_template(format: str, locale: str) -> str:
+    return get_datetime_format(format, locale=get_locale(locale)).replace("'", "")  # type: ignore
+
+
+def _current_locale() -> str:
+    return get_i18n().current_locale or "en"
+
+
+# endregion
 
 
 def format_date(
     dt: date | datetime, format: Format = "long", locale: Optional[str] = None
 ):
     """Format date using locale-aware formatting"""
-    if not locale:
-        i18n = get_i18n()
-        locale = i18n.current_locale or "en"
-    return fd(dt, format=format, locale=locale)
+    locale = locale or _current_locale()
+    if isinstance(dt, datetime):
+        dt = dt.date()
+    return _date_pattern(format, locale).apply(dt, get_locale(locale))
 
 
 def format_time(
     dt: time | datetime, format: Format = "short", locale: Optional[str] = None
 ):
     """Format date using locale-aware formatting"""
-    if not locale:
-        i18n = get_i18n()
-        locale = i18n.current_locale or "en"
-    return ft(dt, format=format, locale=locale)
+    locale = locale or _current_locale()
+    reference_date = None
+    if isinstance(dt, datetime):
+        reference_date = dt.date()
+        dt = dt.timetz()
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=UTC)
+    return _time_pattern(format, locale).apply(
+        dt, get_locale(locale), reference_date=reference_date
+    )
 
 
 def format_datetime(
     dt: datetime, format: Format = "short", locale: Optional[str] = None
 ):
     """Format date using locale-aware formatting"""
-    if not locale:
-        i18n = get_i18n()
-        locale = i18n.current_locale or "en"
-    return fdt(dt, format=format, locale=locale)
+    locale = locale or _current_locale()
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=UTC)
+    if format not in PREDEFINED_FORMATS:
+        return _date_pattern(format, locale).apply(dt, get_locale(locale))
+    return (
+        _datetime_template(format, locale)
+        .replace("{0}", format_time(dt, format, locale))
+        .replace("{1}", format_date(dt, format, locale))
+    )
@@ -0,0 +1,83 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class Histogram:
+    """Keeps count, sum and a window of recent observations for percentiles"""
+
+    def __init__(self, window: int = 1000):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._recent: deque[float] = deque(maxlen=window)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self._recent.append(value)
+
+    def percentile(self, q: float) -> float:
+        if not self._recent:
+            return 0.0
+        values = sorted(self._recent)
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    def summary(self) -> dict[str, float]:
+        return {
+            "count": self.count,
+            "avg": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "max": self.max,
+        }
+
+
+class Metrics:
+    """
+    Process-local metrics registry.
+
+    Components either register a collector returning their current values or
+    record observations into named counters and histograms. Snapshots are written
+    to the log periodically, see `report`.
+    """
+
+    def __init__(self):
+        self._collectors: dict[str, Callable[[], dict[str, Any]]] = {}
+        self._counters: dict[str, int] = {}
+        self._histograms: dict[str, Histogram] = {}
+
+    def register(self, name: str, collector: Callable[[], dict[str, Any]]):
+        self._collectors[name] = collector
+
+    def unregister(self, name: str):
+        self._collectors.pop(name, None)
+
+    def inc(self, name: str, value: int = 1):
+        self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float):
+        if name not in self._histograms:
+            self._histograms[name] = Histogram()
+        self._histograms[name].observe(value)
+
+    def snapshot(self) -> dict[str, Any]:
+        snapshot: dict[str, Any] = dict(self._counters)
+        for name, histogram in self._histograms.items():
+            snapshot[name] = histogram.summary()
+        for name, collector in self._collectors.items():
+            snapshot[name] = collector()
+        return snapshot
+
+    async def report(self, interval: float):
+        """Log a snapshot every `interval` seconds until cancelled"""
+        while True:
+            await asyncio.sleep(interval)
+            logger.info("Metrics: %s", self.snapshot())
+
+
+metrics = Metrics()
@@ -1,12 +1,57 @@
+import asyncio
+import hashlib
 import json
 import logging
+import re
+from collections import OrderedDict
 
 from pydantic import BaseModel, ValidationError
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
 
-from src.services.llm_service import LLMRequest, LLMService
+from src.services.llm_service import (
+    LLMCircuitOpenError,
+    LLMOverloadedError,
+    LLMRequest,
+    LLMService,
+)
 
 logger = logging.getLogger(__name__)
 
+# Spelled-out numbers which users mix with digits, e.g. "three times a day"
+NUMERALS = {
+    "one": "1",
+    "two": "2",
+    "three": "3",
+    "four": "4",
+    "five": "5",
+    "six": "6",
+    "seven": "7",
+    "eight": "8",
+    "nine": "9",
+    "ten": "10",
+    "twelve": "12",
+    "fourteen": "14",
+    "thirty": "30",
+    "один": "1",
+    "одна": "1",
+    "одну": "1",
+    "два": "2",
+    "две": "2",
+    "три": "3",
+    "четыре": "4",
+    "пять": "5",
+    "шесть": "6",
+    "семь": "7",
+    "восемь": "8",
+    "девять": "9",
+    "десять": "10",
+    "двенадцать": "12",
+    "четырнадцать": "14",
+    "тридцать": "30",
+}
+NUMERALS_RE = re.compile(r"\b(" + "|".join(NUMERALS) + r")\b")
+
 
 class PrescriptionData(BaseModel):
     drug_name: str
@@ -16,8 +61,328 @@ class PrescriptionData(BaseModel):
     comment: str | None = None
 
 
+# Bullets and numbering in front of pasted list items, e.g. "1)", "2.", "-", "•"
+LIST_ITEM_RE = re.compile(r"^\s*(?:[-*•–]|\d{1,2}[.)])\s+")
+
+
+def split_prescription_lines(text: str) -> list[str]:
+    lines = (LIST_ITEM_RE.sub("", line).strip() for line in text.splitlines())
+    return [line for line in lines if line]
+
+
+def normalize_prescription(text: str) -> str:
+    """Cache key text: lower case, digits for numerals, single spaces"""
+    text = NUMERALS_RE.sub(lambda m: NUMERALS[m.group(1)], text.lower())
+    text = re.sub(r"(\d),(\d)", r"\1.\2", text)
+    return " ".join(text.split()).strip(" .!;")
+
+
+# region Rule-based parser
+# Lines at or above this confidence are not sent to the LLM
+RULES_CONFIDENCE_THRESHOLD = 0.8
+
+# Numerals are whole words, so "Prednisone" does not end in "one"
+_NUMBER = r"(?:\d+(?:[.,]\d+)?|\d+/\d+|½|(?<!\w)(?:" + "|".join(NUMERALS) + r")\b)"
+_DOSE_UNITS = (
+    r"mg|mcg|µg|g|ml|iu|units?|tablets?|tabs?|pills?|capsules?|caps?|drops?|"
+    r"puffs?|sachets?|мг|мкг|г|мл|ме|ед|таблет\w*|капсул\w*|капл\w*|пакетик\w*|"
+    r"впрыск\w*|доз\w*"
+)
+_DAY = r"(?:day|daily|d|день|сутки|дн[её]м)"
+_VERBS_RE = re.compile(r"^\s*(?:take|принимать|принять|пить|выпивать)\s+", re.I)
+_DOSE_RE = re.compile(
+    rf"(?:\bпо\s+)?(?P<dose>{_NUMBER}\s*(?:{_DOSE_UNITS}))(?!\w)", re.I
+)
+_TIMES_RE = re.compile(
+    rf"(?P<count>{_NUMBER})\s*(?:x|×|times?|раза?)\s*(?:a|per|в|за)?\s*{_DAY}(?!\w)",
+    re.I,
+)
+_WORD_TIMES_RE = re.compile(
+    rf"\b(?P<word>once|twice|thrice|однократно|дважды|трижды)"
+    rf"(?:\s*(?:a|per|в)?\s*{_DAY})?(?!\w)",
+    re.I,
+)
+_EVERY_RE = re.compile(
+    rf"\b(?:every|каждые)\s+(?P<hours>{_NUMBER})\s*(?:hours?|h|час\w*|ч)(?!\w)", re.I
+)
+_DAILY_RE = re.compile(r"\b(?:daily|every day|ежедневно|каждый день)(?!\w)", re.I)
+_DURATION_RE = re.compile(
+    rf"(?:\b(?:for|during|в течение|на|курсом)\s+)?(?P<count>{_NUMBER})\s*"
+    r"(?P<unit>days?|d|weeks?|months?|дн\w*|день|недел\w*|месяц\w*)(?!\w)",
+    re.I,
+)
+_BARE_DURATION_RE = re.compile(
+    r"(?:\b(?:for|в течение|на)\s+)?(?:\ba\s+)?"
+    r"\b(?P<unit>week|month|недел[юя]|месяц)(?!\w)",
+    re.I,
+)
+_WORD_COUNTS = {
+    "once": 1,
+    "twice": 2,
+    "thrice": 3,
+    "однократно": 1,
+    "дважды": 2,
+    "трижды": 3,
+}
+_FILLER = re.compile(r"^[\s,.;:()\-–—]+|[\s,.;:()\-–—]+$")
+# Values outside these bounds are left to the LLM
+MAX_DOSES_PER_DAY = 24
+MAX_DURATION_DAYS = 3650
+
+
+def _to_number(value: str) -> float | None:
+    value = NUMERALS.get(value.lower(), value)
+    if value == "½":
+        return 0.5
+    if "/" in value:
+        numerator, denominator = value.split("/")
+        if not int(denominator):
+            return None
+        return int(numerator) / int(denominator)
+    return float(value.replace(",", "."))
+
+
+def _to_count(value: float | None, maximum: int | None = None) -> int | None:
+    """Whole positive number up to `maximum`, otherwise None"""
+    if value is None or value < 1 or value != int(value):
+        return None
+    if maximum is not None and value > maximum:
+        return None
+    return int(value)
+
+
+def _cut(text: str, match: re.Match) -> str:
+    """Replace a matched span with a separator, keeping the rest in place"""
+    return text[: match.start()] + " | " + text[match.end() :]
+
+
+def _parse_frequency(text: str) -> tuple[int | None, float, str]:
+    """Doses per day, confidence of the match and the text without it"""
+    if match := _TIMES_RE.search(text):
+        count = _to_count(_to_number(match["count"]), MAX_DOSES_PER_DAY)
+        if count is None:
+            return None, 0.0, text
+        return count, 1.0, _cut(text, match)
+    if match := _WORD_TIMES_RE.search(text):
+        return _WORD_COUNTS[match["word"].lower()], 1.0, _cut(text, match)
+    if match := _EVERY_RE.search(text):
+        hours = _to_number(match["hours"])
+        if hours and 24 % hours == 0:
+            count = _to_count(24 // hours, MAX_DOSES_PER_DAY)
+            if count is not None:
+                return count, 1.0, _cut(text, match)
+    if match := _DAILY_RE.search(text):
+        return 1, 0.6, _cut(text, match)
+    return None, 0.0, text
+
+
+def _parse_duration(text: str) -> tuple[int | None, str]:
+    if match := _DURATION_RE.search(text):
+        days = _to_number(match["count"])
+    elif match := _BARE_DURATION_RE.search(text):
+        days = 1
+    else:
+        return None, text
+
+    unit = match["unit"].lower()
+    if days is not None and unit.startswith(("week", "недел")):
+        days *= 7
+    elif days is not None and unit.startswith(("month", "месяц")):
+        days *= 30
+    # An invalid duration stays in the comment, lowering the confidence
+    if (count := _to_count(days, MAX_DURATION_DAYS)) is None:
+        return None, text
+    return count, _cut(text, match)
+
+
+def parse_prescription_rules(text: str) -> tuple[PrescriptionData | None, float]:
+    """
+    Parse common English and Russian prescription lines without the LLM.
+
+    Understands lines like "Aspirin 1 tablet 3 times a day for 7 days" or
+    "Аспирин 500 мг 2 раза в день 5 дней". Returns the data, if the drug, dose
+    and frequency were found, and a confidence between 0 and 1.
+    """
+    text = _VERBS_RE.sub("", text.strip())
+
+    dose_match = _DOSE_RE.search(text)
+    dose = " ".join(dose_match["dose"].split()) if dose_match else None
+    drug_name = _FILLER.sub("", text[: dose_match.start()]) if dose_match else ""
+    rest = text[dose_match.end() :] if dose_match else text
+
+    doses_per_day, frequency_confidence, rest = _parse_frequency(rest)
+    duration, rest = _parse_duration(rest)
+    comment = " ".join(
+        part for part in (_FILLER.sub("", p) for p in rest.split("|")) if part
+    )
+
+    confidence = (
+        0.35 * bool(drug_name)
+        + 0.25 * bool(dose)
+        + 0.3 * frequency_confidence
+        + 0.1 * (duration is not None or not comment)
+    )
+    # Numbers left unparsed or long remainders usually mean an unusual line
+    if re.search(r"\d", comment) or len(comment.split()) > 6:
+        confidence *= 0.6
+    if len(drug_name.split()) > 4 or not re.search(r"[^\W\d]", drug_name):
+        confidence *= 0.5
+
+    if not (drug_name and dose and doses_per_day):
+        return None, confidence
+    return (
+        PrescriptionData(
+            drug_name=drug_name,
+            dose=dose,
+            doses_per_day=doses_per_day,
+            duration=duration,
+            comment=comment or None,
+        ),
+        round(confidence, 2),
+    )
+
+
+# endregion
+
+
+class PrescriptionCache:
+    """
+    Parsed prescriptions by normalized text and language.
+
+    Lookups go to an in-process LRU first, then to Redis, which is shared by all
+    processes. Redis failures are logged and treated as misses.
+    """
+
+    def __init__(
+        self,
+        redis: Redis | None = None,
+        *,
+        size: int = 1024,
+        ttl: int = 60 * 60 * 24 * 7,
+        prefix: str = "prescription",
+    ):
+        self.redis = redis
+        self.size = size
+        self.ttl = ttl
+        self.prefix = prefix
+        self._local: OrderedDict[str, PrescriptionData] = OrderedDict()
+
+    def key(self, text: str, language: str) -> str:
+        digest = hashlib.sha256(normalize_prescription(text).encode()).hexdigest()
+        return f"{self.prefix}:{language}:{digest}"
+
+    def _remember(self, key: str, data: PrescriptionData):
+        self._local[key] = data
+        self._local.move_to_end(key)
+        if len(self._local) > self.size:
+            self._local.popitem(last=False)
+
+    async def get(self, text: str, language: str) -> PrescriptionData | None:
+        key = self.key(text, language)
+        if key in self._local:
+            self._local.move_to_end(key)
+            return self._local[key].model_copy()
+        if not self.redis:
+            return None
+
+        try:
+            value = await self.redis.get(key)
+        except RedisError as e:
+            logger.warning("Failed to read prescription cache: %s", e)
+            return None
+        if value is None:
+            return None
+
+        try:
+            data = PrescriptionData.model_validate_json(value)
+        except ValidationError:
+            return None
+        self._remember(key, data)
+        return data.model_copy()
+
+    async def set(self, text: str, language: str, data: PrescriptionData):
+        key = self.key(text, language)
+        self._remember(key, data.model_copy())
+        if not self.redis:
+            return
+
+        try:
+            await self.redis.set(key, data.model_dump_json(), ex=self.ttl)
+        except RedisError as e:
+            logger.warning("Failed to write prescription cache: %s", e)
+
+
 async def parse_prescription(
-    llm_service: LLMService, text: str
+    llm_service: LLMService,
+    text: str,
+    *,
+    cache: PrescriptionCache | None = None,
+    language: str = "en",
+    timeout: float | None = None,
+) -> PrescriptionData | None:
+    if cache and (cached := await cache.get(text, language)):
+        return cached
+
+    parsed, confidence = parse_prescription_rules(text)
+    if parsed and confidence >= RULES_CONFIDENCE_THRESHOLD:
+        return parsed
+
+    parsed = await _parse_with_llm(llm_service, text, timeout)
+    if cache and parsed:
+        await cache.set(text, language, parsed)
+    return parsed
+
+
+async def parse_prescriptions(
+    llm_service: LLMService,
+    text: str,
+    *,
+    cache: PrescriptionCache | None = None,
+    language: str = "en",
+    timeout: float | None = None,
+) -> list[PrescriptionData]:
+    """
+    Parse all prescriptions of a text with one medication per line, e.g. a pasted
+    discharge note.
+
+    A single line is parsed with `parse_prescription`. Otherwise each line is
+    looked up in the cache and parsed with the local rules, and the lines left
+    over are sent to the LLM together, in one request.
+    """
+    lines = split_prescription_lines(text)
+    if len(lines) <= 1:
+        parsed = await parse_prescription(
+            llm_service, text, cache=cache, language=language, timeout=timeout
+        )
+        return [parsed] if parsed else []
+
+    found: list[PrescriptionData | None] = []
+    for line in lines:
+        parsed = await cache.get(line, language) if cache else None
+        if not parsed:
+            parsed, confidence = parse_prescription_rules(line)
+            if confidence < RULES_CONFIDENCE_THRESHOLD:
+                parsed = None
+        found.append(parsed)
+
+    remaining = [line for line, parsed in zip(lines, found) if not parsed]
+    if not remaining:
+        return [parsed for parsed in found if parsed]
+
+    # LLM results take the place of the first line left to it
+    from_llm = await _parse_list_with_llm(llm_service, remaining, timeout)
+    first = found.index(None)
+    result: list[PrescriptionData] = []
+    for i, parsed in enumerate(found):
+        if parsed:
+            result.append(parsed)
+        elif i == first:
+            result.extend(from_llm)
+    return result
+
+
+async def _parse_with_llm(
+    llm_service: LLMService, text: str, timeout: float | None = None
 ) -> PrescriptionData | None:
     try:
         prompt = f"""Extract medication details as JSON with keys: drug_name, dose, doses_per_day, duration, comment. For values use the same language as in the input. If some values absent - skip it in JSON.
@@ -26,9 +391,13 @@ async def parse_prescription(
         Input: "{text}" """
 
         response = await llm_service.complete(
-            LLMRequest(prompt=prompt, temperature=0.1)
+            LLMRequest(prompt=prompt, temperature=0.1, json_object=True),
+            timeout=timeout,
         )
         return PrescriptionData.model_validate_json(response)
+    except (asyncio.TimeoutError, LLMOverloadedError, LLMCircuitOpenError) as e:
+        logger.warning("LLM is unavailable: %r", e)
+        return None
     except json.JSONDecodeError as e:
         logger.warning("Failed to parse LLM response as JSON: %s", e)
         return None
@@ -41,3 +410,43 @@ async def parse_prescription(
     except Exception as e:
         logger.warning("Failed to parse prescription: %s", e)
         return None
+
+
+async def _parse_list_with_llm(
+    llm_service: LLMService, lines: list[str], timeout: float | None = None
+) -> list[PrescriptionData]:
+    text = "\n".join(lines)
+    prompt = f"""Extract every medication from the input as JSON: {{"prescriptions": [...]}}, one item per medication with keys: drug_name, dose, doses_per_day, duration, comment. For values use the same language as in the input. If some values absent - skip them. Skip lines which are not medications.
+    Example: {{"prescriptions": [{{"drug_name": "Aspirin", "dose": "1 tablet", "doses_per_day": 3, "duration": 7, "comment": "Take with food"}}]}}
+    DO NOT PROVIDE ANY EXPLANATION, JUST VALID JSON
+    Input: "{text}" """
+
+    try:
+        response = await llm_service.complete(
+            LLMRequest(
+                prompt=prompt,
+                temperature=0.1,
+                max_tokens=100 + 100 * len(lines),
+                json_object=True,
+            ),
+            timeout=timeout,
+        )
+        items = json.loads(response)["prescriptions"]
+    except (asyncio.TimeoutError, LLMOverloadedError, LLMCircuitOpenError) as e:
+        logger.warning("LLM is unavailable: %r", e)
+        return []
+    except (json.JSONDecodeError, KeyError, TypeError) as e:
+        logger.warning("Failed to parse LLM response as a prescription list: %s", e)
+        return []
+    except Exception as e:
+        logger.warning("Failed to parse prescriptions: %s", e)
+        return []
+
+    prescriptions = []
+    for item in items if isinstance(items, list) else []:
+        try:
+            prescriptions.append(PrescriptionData.model_validate(item))
+        except ValidationError as e:
+            # One bad item should not cost the user the rest of the list
+            logger.warning("Skipping invalid prescription %r: %s", item, e)
+    return prescriptions
@@ -0,0 +1,49 @@
+import functools
+from datetime import datetime, time
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError, available_timezones
+
+__all__ = ["ZoneInfoNotFoundError", "get_timezone", "localize", "zones_by_local_time"]
+
+
+@functools.cache
+def get_timezone(name: str) -> ZoneInfo:
+    """Time zone by IANA name, raises `ZoneInfoNotFoundError` for unknown ones"""
+    return ZoneInfo(name)
+
+
+def localize(dt: datetime, tz: ZoneInfo) -> datetime:
+    """
+    Attach `tz` to a naive local time with the semantics of pytz `localize`.
+
+    A time repeated when clocks go back resolves to standard time, and a time
+    skipped when clocks go forward gets the offset from before the transition.
+    The result should be converted to UTC before adding time deltas, as aware
+    arithmetic with `ZoneInfo` works on wall time.
+    """
+    first = dt.replace(tzinfo=tz, fold=0)
+    second = dt.replace(tzinfo=tz, fold=1)
+    first_offset, second_offset = first.utcoffset(), second.utcoffset()
+    if first_offset == second_offset or first_offset < second_offset:  # type: ignore
+        return first  # An unambiguous or a skipped time
+
+    # A repeated time, prefer the standard one
+    if not second.dst() and first.dst():
+        return second
+    return first
+
+
+@functools.cache
+def _zone_names() -> list[str]:
+    return sorted(available_timezones())
+
+
+def zones_by_local_time(now: datetime) -> dict[time, list[str]]:
+    """
+    Known time zones grouped by their local time at the aware `now`, so that
+    a condition on users' local time needs a comparison per UTC offset in use
+    rather than per zone.
+    """
+    buckets: dict[time, list[str]] = {}
+    for name in _zone_names():
+        buckets.setdefault(now.astimezone(get_timezone(name)).time(), []).append(name)
+    return buckets
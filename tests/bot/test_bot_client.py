@@ -0,0 +1,42 @@
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from pydantic import AnyUrl
+
+from src.bot.bot import BotRegistry
+from src.config import settings
+from src.utils.metrics import metrics
+
+
+async def get_me(request: web.Request) -> web.Response:
+    return web.json_response(
+        {"ok": True, "result": {"id": 1, "is_bot": True, "first_name": "Test"}}
+    )
+
+
+@pytest.mark.asyncio
+async def test_shared_bot_reuses_connections(monkeypatch):
+    app = web.Application()
+    app.router.add_post("/bot{token}/{method}", get_me)
+
+    async with TestServer(app) as server:
+        monkeypatch.setattr(settings.bot, "api_url", AnyUrl(str(server.make_url("/"))))
+        registry = BotRegistry()
+        before = metrics.snapshot()
+
+        for _ in range(3):
+            bot = registry.get()
+            await bot.get_me()
+
+        after = metrics.snapshot()
+        assert registry.get() is bot
+        await registry.close()
+        assert registry.get() is not bot
+        await registry.close()
+
+    def delta(name):
+        return after.get(name, 0) - before.get(name, 0)
+
+    assert delta("telegram.connections_created") == 1
+    assert delta("telegram.connections_reused") == 2
+    assert after["telegram.request"]["count"] >= 3
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+from aiogram.fsm.storage.base import StorageKey
+
+from src.bot.isolation import ChatEventIsolation
+
+
+def key(chat_id: int) -> StorageKey:
+    return StorageKey(bot_id=1, chat_id=chat_id, user_id=chat_id)
+
+
+async def handle(isolation, chat_id, delay, log):
+    async with isolation.lock(key(chat_id)):
+        log.append(("start", chat_id, delay))
+        await asyncio.sleep(delay)
+        log.append(("end", chat_id, delay))
+
+
+@pytest.mark.asyncio
+async def test_same_chat_updates_are_serial_and_ordered():
+    isolation = ChatEventIsolation()
+    log = []
+
+    await asyncio.gather(
+        handle(isolation, 1, 0.03, log),
+        handle(isolation, 1, 0.01, log),
+        handle(isolation, 1, 0.0, log),
+    )
+
+    assert log == [
+        ("start", 1, 0.03),
+        ("end", 1, 0.03),
+        ("start", 1, 0.01),
+        ("end", 1, 0.01),
+        ("start", 1, 0.0),
+        ("end", 1, 0.0),
+    ]
+    assert isolation.stats()["chats"] == 0
+    assert isolation.max_depth == 3
+
+
+@pytest.mark.asyncio
+async def test_different_chats_run_concurrently():
+    isolation = ChatEventIsolation()
+    log = []
+
+    await asyncio.gather(
+        handle(isolation, 1, 0.03, log),
+        handle(isolation, 2, 0.0, log),
+    )
+
+    assert log.index(("end", 2, 0.0)) < log.index(("end", 1, 0.03))
+
+
+@pytest.mark.asyncio
+async def test_max_concurrency_caps_active_updates():
+    isolation = ChatEventIsolation(max_concurrency=2)
+    peak = 0
+
+    async def track(chat_id):
+        nonlocal peak
+        async with isolation.lock(key(chat_id)):
+            peak = max(peak, isolation.active)
+            await asyncio.sleep(0.01)
+
+    tasks = [asyncio.create_task(track(chat_id)) for chat_id in range(5)]
+    await asyncio.sleep(0)
+    assert isolation.stats()["queued"] == 3
+
+    await asyncio.gather(*tasks)
+    assert peak == 2
+    assert isolation.stats() == {
+        "active": 0,
+        "queued": 0,
+        "chats": 0,
+        "max_chat_depth": 0,
+        "max_chat_depth_total": 1,
+    }
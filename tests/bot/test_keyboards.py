@@ -0,0 +1,18 @@
+from src.bot.handlers.schedules.create import get_confirm_keyboard
+from src.bot.keyboards import preload_keyboards
+from src.i18n import i18n
+
+
+def test_keyboards_are_cached_per_locale():
+    preload_keyboards(i18n)
+
+    with i18n.context():
+        with i18n.use_locale("en"):
+            english = get_confirm_keyboard()
+            assert get_confirm_keyboard() is english
+            assert english.keyboard[0][0].text == "✅ Confirm"
+
+        with i18n.use_locale("ru"):
+            russian = get_confirm_keyboard()
+            assert russian is not english
+            assert russian.keyboard[0][0].text != "✅ Confirm"
@@ -0,0 +1,102 @@
+import pytest
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import DefaultKeyBuilder, StorageKey
+from aiogram.fsm.storage.memory import DisabledEventIsolation
+from aiogram.fsm.storage.redis import RedisStorage
+
+from src.bot.storage import BufferedStorage
+
+KEY = StorageKey(bot_id=1, chat_id=2, user_id=2)
+
+
+class FakeRedis:
+    """Dict-backed subset of the Redis client, counting round trips"""
+
+    def __init__(self):
+        self.values: dict[str, bytes] = {}
+        self.round_trips = 0
+
+    async def get(self, key):
+        self.round_trips += 1
+        return self.values.get(key)
+
+    async def mget(self, *keys):
+        self.round_trips += 1
+        return [self.values.get(key) for key in keys]
+
+    async def set(self, key, value, ex=None):
+        self.round_trips += 1
+        self._set(key, value)
+
+    async def delete(self, key):
+        self.round_trips += 1
+        self.values.pop(key, None)
+
+    def _set(self, key, value):
+        self.values[key] = value.encode() if isinstance(value, str) else value
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis: FakeRedis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    def set(self, key, value, ex=None):
+        self.commands.append(lambda: self.redis._set(key, value))
+
+    def delete(self, key):
+        self.commands.append(lambda: self.redis.values.pop(key, None))
+
+    async def execute(self):
+        self.redis.round_trips += 1
+        for command in self.commands:
+            command()
+
+
+@pytest.fixture
+def redis():
+    return FakeRedis()
+
+
+@pytest.fixture
+def storage(redis):
+    return BufferedStorage(RedisStorage(redis, key_builder=DefaultKeyBuilder()))
+
+
+@pytest.mark.asyncio
+async def test_wizard_step_takes_one_read_and_one_write(storage, redis):
+    await storage.set_data(KEY, {"drug_name": "Aspirin"})
+    redis.round_trips = 0
+
+    isolation = storage.isolation(DisabledEventIsolation())
+    async with isolation.lock(KEY):
+        state = FSMContext(storage, KEY)
+        await state.get_state()
+        await state.update_data(dose="500mg")
+        await state.set_state("ScheduleStates:waiting_frequency")
+        assert await state.get_data() == {"drug_name": "Aspirin", "dose": "500mg"}
+        assert redis.round_trips == 1
+
+    assert redis.round_trips == 2
+    assert await storage.get_state(KEY) == "ScheduleStates:waiting_frequency"
+    assert await storage.get_data(KEY) == {"drug_name": "Aspirin", "dose": "500mg"}
+
+
+@pytest.mark.asyncio
+async def test_clearing_deletes_keys(storage, redis):
+    await storage.set_state(KEY, "ScheduleStates:waiting_dose")
+    await storage.set_data(KEY, {"drug_name": "Aspirin"})
+
+    async with storage.update_scope():
+        await FSMContext(storage, KEY).clear()
+
+    assert redis.values == {}
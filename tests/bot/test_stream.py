@@ -0,0 +1,71 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from aiogram.types import Update
+
+from src.bot.stream import StreamConsumer, UpdateStream
+
+
+def make_update(update_id: int, chat_id: int) -> Update:
+    return Update.model_validate(
+        {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": 0,
+                "chat": {"id": chat_id, "type": "private"},
+                "from": {"id": chat_id, "is_bot": False, "first_name": "User"},
+                "text": "/help",
+            },
+        }
+    )
+
+
+def test_updates_of_a_chat_share_a_partition():
+    stream = UpdateStream(MagicMock(), partitions=8)
+
+    partitions = {stream.partition(make_update(i, 42)) for i in range(20)}
+
+    assert len(partitions) == 1
+    assert partitions.pop() in range(8)
+
+
+def test_chats_are_spread_over_partitions():
+    stream = UpdateStream(MagicMock(), partitions=8)
+
+    partitions = {stream.partition(make_update(1, chat_id)) for chat_id in range(100)}
+
+    assert len(partitions) == 8
+
+
+@pytest.mark.asyncio
+async def test_extra_partition_is_released_without_blocking_renewal():
+    redis = AsyncMock()
+    redis.zcard.return_value = 2
+    consumer = StreamConsumer(
+        MagicMock(), MagicMock(), UpdateStream(redis, partitions=2), "a"
+    )
+    # The worker of partition 1 is busy with a batch
+    batch_done = asyncio.Event()
+    kept, given_away = AsyncMock(), AsyncMock()
+    consumer._leases = {0: kept, 1: given_away}
+    consumer._workers = {
+        0: asyncio.create_task(asyncio.Event().wait()),
+        1: asyncio.create_task(batch_done.wait()),
+    }
+
+    await asyncio.wait_for(consumer._rebalance(), timeout=1)
+    await asyncio.wait_for(consumer._rebalance(), timeout=1)
+
+    assert list(consumer._leases) == [0] and kept.reacquire.await_count == 2
+    # Renewed until the worker has stopped
+    assert given_away.reacquire.await_count == 2
+    given_away.release.assert_not_awaited()
+
+    batch_done.set()
+    await asyncio.gather(*consumer._releases)
+
+    given_away.release.assert_awaited_once()
+    assert not consumer._releasing
+    consumer._workers[0].cancel()
@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+from src.bot.webhook import create_app
+
+UPDATE = {
+    "update_id": 1,
+    "message": {
+        "message_id": 1,
+        "date": 0,
+        "chat": {"id": 1, "type": "private"},
+        "text": "hello",
+    },
+}
+
+
+@pytest.mark.asyncio
+async def test_webhook_validates_secret(bot, dp):
+    received = asyncio.Event()
+
+    async def handler(message):
+        received.set()
+
+    dp.message.register(handler)
+    app = create_app(dp, bot, path="/webhook", secret="s3cr3t")
+
+    async with TestClient(TestServer(app)) as client:
+        response = await client.post("/webhook", json=UPDATE)
+        assert response.status == 401
+
+        response = await client.post(
+            "/webhook",
+            json=UPDATE,
+            headers={"X-Telegram-Bot-Api-Secret-Token": "wrong"},
+        )
+        assert response.status == 401
+
+        response = await client.post(
+            "/webhook",
+            json=UPDATE,
+            headers={"X-Telegram-Bot-Api-Secret-Token": "s3cr3t"},
+        )
+        assert response.status == 200
+
+        await asyncio.wait_for(received.wait(), timeout=1)
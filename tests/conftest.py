@@ -1,13 +1,21 @@
+import contextlib
 import os
 import sys
 
 import pytest
+import pytest_asyncio
 from aiogram import Bot, Dispatcher
 from aiogram.fsm.storage.memory import MemoryStorage
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
 
 # Adjust sys.path to include the parent directory of 'src'
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
 
+# Throwaway database for tests which need real queries, e.g. a local MariaDB
+TEST_DB_URL = os.environ.get("TEST_DB_URL", "sqlite+aiosqlite://")
+
 
 @pytest.fixture
 def bot():
@@ -31,3 +39,50 @@ def user_data():
         "timezone": "UTC",
         "privacy_accepted": True,
     }
+
+
+@pytest_asyncio.fixture
+async def db_engine():
+    from src.models import Base
+
+    engine = create_async_engine(TEST_DB_URL, poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    yield engine
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def db_session(db_engine):
+    async with async_sessionmaker(db_engine, expire_on_commit=False)() as session:
+        yield session
+
+
+class QueryCounter:
+    """Records statements sent to the database"""
+
+    def __init__(self):
+        self.statements: list[str] = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @contextlib.contextmanager
+    def assert_max_queries(self, limit: int):
+        start = len(self.statements)
+        yield
+        executed = self.statements[start:]
+        message = f"Expected at most {limit} queries, got {len(executed)}:\n"
+        assert len(executed) <= limit, message + "\n".join(executed)
+
+
+@pytest.fixture
+def query_counter(db_engine):
+    counter = QueryCounter()
+    event.listen(db_engine.sync_engine, "before_cursor_execute", counter)
+    yield counter
+    event.remove(db_engine.sync_engine, "before_cursor_execute", counter)
@@ -0,0 +1,33 @@
+from src.database.slow_query import find_caller, normalize_sql
+
+
+def test_normalize_sql_collapses_whitespace_and_literals():
+    statement = """SELECT schedules.id
+        FROM schedules
+        WHERE schedules.user_id = 42 AND schedules.drug_name = 'Aspirin'"""
+
+    assert normalize_sql(statement) == (
+        "SELECT schedules.id FROM schedules "
+        "WHERE schedules.user_id = ? AND schedules.drug_name = ?"
+    )
+
+
+def test_normalize_sql_collapses_in_lists():
+    short = "SELECT * FROM doses WHERE doses.schedule_id IN (%s, %s)"
+    long = "SELECT * FROM doses WHERE doses.schedule_id IN (%s, %s, %s, %s, %s)"
+
+    assert normalize_sql(short) == normalize_sql(long)
+    assert normalize_sql(short).endswith("IN (...)")
+
+
+def test_normalize_sql_keeps_identifiers():
+    statement = "SELECT `users`.`day_end`, t1.id FROM users AS t1"
+
+    assert normalize_sql(statement) == statement
+
+
+def test_find_caller_matches_module_prefix():
+    assert find_caller(prefix=__name__) == (
+        f"{__name__}.test_find_caller_matches_module_prefix"
+    )
+    assert find_caller(prefix="src.services") is None
@@ -0,0 +1,13 @@
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[3]
+
+
+def test_timezone_finder_is_not_loaded_on_import():
+    code = (
+        "import sys, src.bot.handlers.commands; "
+        "assert 'timezonefinder' not in sys.modules"
+    )
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True)
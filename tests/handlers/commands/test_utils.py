@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta, timezone
+
+import pytz
+
+from src.bot.handlers.commands.utils import (
+    TimezoneOffsetIndex,
+    calculate_timezone_from_time,
+)
+
+UTC_NOW = datetime(2025, 3, 30, 0, 30, tzinfo=timezone.utc)
+
+
+def test_offset_index_matches_zone_offsets():
+    index = TimezoneOffsetIndex()
+
+    zones = index.get(2, UTC_NOW)
+
+    assert "Europe/Kaliningrad" in zones
+    assert "Europe/Berlin" not in zones
+    assert all(
+        UTC_NOW.astimezone(pytz.timezone(tz)).utcoffset() == timedelta(hours=2)
+        for tz in zones
+    )
+
+
+def test_offset_index_is_rebuilt_after_dst_transition():
+    index = TimezoneOffsetIndex()
+    assert "Europe/Berlin" in index.get(1, UTC_NOW)
+
+    # Central Europe switches to summer time at 01:00 UTC
+    after_transition = UTC_NOW + timedelta(hours=1)
+
+    assert "Europe/Berlin" not in index.get(1, after_transition)
+    assert "Europe/Berlin" in index.get(2, after_transition)
+
+
+def test_offset_index_is_rebuilt_after_half_hour_transition():
+    index = TimezoneOffsetIndex()
+    # Lord Howe Island switches to summer time at 15:30 UTC
+    before_transition = datetime(2025, 10, 4, 15, 20, tzinfo=timezone.utc)
+    assert "Australia/Lord_Howe" in index.get(10.5, before_transition)
+
+    after_transition = before_transition + timedelta(minutes=10)
+
+    assert "Australia/Lord_Howe" not in index.get(10.5, after_transition)
+    assert "Australia/Lord_Howe" in index.get(11, after_transition)
+
+
+def test_timezones_are_ranked_by_language():
+    timezones, offset = calculate_timezone_from_time("3:30", UTC_NOW, "ru")
+
+    assert offset == 3
+    assert timezones[0] == "Europe/Moscow"
+
+    timezones, _ = calculate_timezone_from_time("20:30", UTC_NOW, "en")
+    assert timezones[0] == "America/New_York"
@@ -0,0 +1,28 @@
+import time
+from unittest.mock import patch
+
+import pytest
+
+from src.services import geo_service
+from src.services.geo_service import GeoService
+
+
+@pytest.mark.asyncio
+async def test_lookups_are_cached_by_rounded_coordinates():
+    async with GeoService() as service:
+        assert await service.timezone_at(55.7558, 37.6173) == "Europe/Moscow"
+        assert await service.timezone_at(55.7561, 37.6169) == "Europe/Moscow"
+
+        assert service.stats() == {"cached": 1, "hits": 1, "misses": 1, "timeouts": 0}
+
+
+@pytest.mark.asyncio
+async def test_slow_lookup_times_out():
+    def slow_lookup(lat, lng):
+        time.sleep(0.2)
+        return "UTC"
+
+    with patch.object(geo_service, "_timezone_at", slow_lookup):
+        async with GeoService(timeout=0.05) as service:
+            assert await service.timezone_at(0, 0) is None
+            assert service.stats()["timeouts"] == 1
@@ -0,0 +1,218 @@
+import asyncio
+import json
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+from src.services.llm_service import (
+    JSONObjectDetector,
+    LLMCircuitOpenError,
+    LLMOverloadedError,
+    LLMRequest,
+    LLMService,
+)
+
+
+@pytest_asyncio.fixture
+async def service():
+    service = LLMService("key", max_concurrency=2, max_queue=1)
+    service.calls = []
+
+    async def request(request: LLMRequest, model: str) -> str:
+        service.calls.append(request.prompt)
+        await asyncio.sleep(0.05)
+        return f"answer to {request.prompt}"
+
+    service._request = request
+    yield service
+    await service.close()
+
+
+def fake_models(service: LLMService, delays: dict[str, float], failing=()):
+    service.models = []
+
+    async def request(request: LLMRequest, model: str) -> str:
+        service.models.append(model)
+        await asyncio.sleep(delays[model])
+        if model in failing:
+            raise ValueError("Invalid response")
+        return model
+
+    service._request = request
+
+
+@pytest.mark.asyncio
+async def test_identical_requests_are_coalesced(service):
+    answers = await asyncio.gather(
+        *(service.complete(LLMRequest(prompt="same")) for _ in range(3))
+    )
+
+    assert answers == ["answer to same"] * 3
+    assert service.calls == ["same"]
+
+
+@pytest.mark.asyncio
+async def test_requests_beyond_queue_are_rejected(service):
+    tasks = [
+        asyncio.create_task(service.complete(LLMRequest(prompt=str(i))))
+        for i in range(3)
+    ]
+    await asyncio.sleep(0.01)
+    stats = service.stats()
+    assert (stats["active"], stats["queued"], stats["in_flight"]) == (2, 1, 3)
+
+    with pytest.raises(LLMOverloadedError):
+        await service.complete(LLMRequest(prompt="one too many"))
+    await asyncio.gather(*tasks)
+
+
+@pytest.mark.asyncio
+async def test_simultaneous_burst_is_capped(service):
+    # Requests arriving in the same loop iteration, before any of them started
+    results = await asyncio.gather(
+        *(service.complete(LLMRequest(prompt=str(i))) for i in range(20)),
+        return_exceptions=True,
+    )
+
+    rejected = [r for r in results if isinstance(r, LLMOverloadedError)]
+    assert len(rejected) == 17
+    assert len(service.calls) == 3
+    assert service.admitted == 0
+
+
+@pytest.mark.asyncio
+async def test_no_queue_still_uses_free_slots(service):
+    service.max_queue = 0
+
+    answers = await asyncio.gather(
+        *(service.complete(LLMRequest(prompt=str(i))) for i in range(2))
+    )
+    assert answers == ["answer to 0", "answer to 1"]
+
+    busy = [
+        asyncio.create_task(service.complete(LLMRequest(prompt=str(i))))
+        for i in range(2)
+    ]
+    await asyncio.sleep(0.01)
+    with pytest.raises(LLMOverloadedError):
+        await service.complete(LLMRequest(prompt="queued"))
+    await asyncio.gather(*busy)
+
+
+@pytest.mark.asyncio
+async def test_deadline_includes_queue_wait(service):
+    busy = [
+        asyncio.create_task(service.complete(LLMRequest(prompt=str(i))))
+        for i in range(2)
+    ]
+    await asyncio.sleep(0.01)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await service.complete(LLMRequest(prompt="late"), timeout=0.02)
+    await asyncio.gather(*busy)
+
+    # The abandoned request never reached the API
+    assert "late" not in service.calls
+
+
+@pytest.mark.asyncio
+async def test_request_after_abandoned_flight_starts_a_new_one(service):
+    with pytest.raises(asyncio.TimeoutError):
+        await service.complete(LLMRequest(prompt="same"), timeout=0.01)
+
+    # Sent before the cancelled flight has landed
+    answer = await service.complete(LLMRequest(prompt="same"))
+
+    assert answer == "answer to same"
+    assert service.calls == ["same", "same"]
+
+
+def test_json_object_detector_handles_strings_and_nesting():
+    detector = JSONObjectDetector()
+
+    assert detector.feed('Sure!\n```json\n{"a": "}\\"') is None
+    assert detector.feed('", "b": {"c": 1}') is None
+    assert detector.feed("}\n``` Anything else?") == '{"a": "}\\"", "b": {"c": 1}}'
+
+
+def test_json_object_detector_skips_braces_which_are_not_json():
+    detector = JSONObjectDetector()
+
+    assert detector.feed("Replace {drug} with the name: {drug: x}") is None
+    assert detector.feed(' {"drug": "{x}"}') == '{"drug": "{x}"}'
+    assert JSONObjectDetector().feed('{not json {"a": 1}}') == '{"a": 1}'
+
+
+@pytest.mark.asyncio
+async def test_stream_returns_once_json_object_is_complete():
+    tokens = ['{"drug_name": ', '"Aspirin"}', " Explanation", " follows"]
+    sent = []
+
+    async def completions(request: web.Request) -> web.StreamResponse:
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for token in tokens:
+            chunk = {"choices": [{"delta": {"content": token}}]}
+            await response.write(
+                f": keep-alive\n\ndata: {json.dumps(chunk)}\n\n".encode()
+            )
+            sent.append(token)
+            await asyncio.sleep(0.05)
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+    app = web.Application()
+    app.router.add_post("/chat/completions", completions)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+
+    try:
+        async with LLMService(
+            "key", base_url=f"http://127.0.0.1:{port}/", stream=True
+        ) as service:
+            answer = await service.complete(LLMRequest(prompt="p", json_object=True))
+            assert answer == '{"drug_name": "Aspirin"}'
+            assert len(sent) == 2
+
+            assert await service.complete(LLMRequest(prompt="p")) == "".join(tokens)
+    finally:
+        await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_slow_primary_is_hedged_with_fallback():
+    async with LLMService(
+        "key", default_model="primary", fallback_model="fallback", hedge_delay=0.02
+    ) as service:
+        fake_models(service, {"primary": 0.2, "fallback": 0.01})
+
+        assert await service.complete(LLMRequest(prompt="p")) == "fallback"
+        assert service.models == ["primary", "fallback"]
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_uses_fallback_then_fails_fast():
+    async with LLMService(
+        "key",
+        default_model="primary",
+        fallback_model="fallback",
+        breaker_options={"min_calls": 2, "window": 2},
+    ) as service:
+        fake_models(service, {"primary": 0, "fallback": 0}, failing={"primary"})
+        for prompt in ("a", "b"):
+            with pytest.raises(ValueError):
+                await service.complete(LLMRequest(prompt=prompt))
+
+        assert await service.complete(LLMRequest(prompt="c")) == "fallback"
+
+        # One failure in two calls opens the fallback circuit too
+        fake_models(service, {"primary": 0, "fallback": 0}, failing={"fallback"})
+        with pytest.raises(ValueError):
+            await service.complete(LLMRequest(prompt="d"))
+        with pytest.raises(LLMCircuitOpenError):
+            await service.complete(LLMRequest(prompt="e"))
+        assert service.models == ["fallback"]
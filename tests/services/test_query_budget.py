@@ -0,0 +1,280 @@
+import contextlib
+import inspect
+from datetime import datetime, time, timedelta, timezone
+from unittest.mock import AsyncMock, call, patch
+
+import pytest
+
+from src.i18n import i18n
+from src.models import Dose, Schedule, User
+from src.services.schedule_service import ScheduleService
+from src.services.user_service import UserService
+from src.tasks.notifications import send_notification, sweep_reminder_shard
+
+SIZES = [1, 10]
+
+
+async def seed(session, schedules_count: int, days: int = 5, tz: str = "UTC") -> User:
+    """Create a user with schedules, each having confirmed doses for past days"""
+    now = datetime.now(timezone.utc)
+    user = User(
+        telegram_id=1000 + schedules_count,
+        first_name="John",
+        timezone=tz,
+        language_code="en",
+        privacy_accepted=True,
+        day_start=time(8, 0),
+        day_end=time(22, 0),
+    )
+    session.add(user)
+    await session.flush()
+
+    for i in range(schedules_count):
+        schedule = Schedule(
+            user_id=user.id,
+            drug_name=f"Drug {i}",
+            dose="1 tablet",
+            doses_per_day=3,
+            start_datetime=now - timedelta(days=days + 1),
+        )
+        session.add(schedule)
+        await session.flush()
+        session.add_all(
+            Dose(
+                user_id=user.id,
+                schedule_id=schedule.id,
+                taken_datetime=now - timedelta(days=day),
+                confirmed=True,
+            )
+            for day in range(1, days + 1)
+        )
+
+    await session.commit()
+    session.expunge_all()
+
+    return user
+
+
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.asyncio
+async def test_get_active_schedules_query_budget(db_session, query_counter, size):
+    user = await seed(db_session, size)
+    service = ScheduleService(db_session)
+
+    with query_counter.assert_max_queries(3):
+        schedules = await service.get_active_schedules(
+            user.id, with_doses=True, with_user=True, not_taken=True
+        )
+        for schedule in schedules:
+            assert schedule.user.id == user.id
+            assert len(schedule.doses) == 5
+
+    assert len(schedules) == size
+
+
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.asyncio
+async def test_reminders_sweep_query_budget(db_session, query_counter, size):
+    await seed(db_session, size)
+    service = ScheduleService(db_session)
+
+    with query_counter.assert_max_queries(2):
+        schedules = await service.get_active_schedules(
+            None, only_today=True, not_taken=True, with_user=True
+        )
+        assert all(schedule.user for schedule in schedules)
+
+    assert len(schedules) == size
+
+
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.asyncio
+async def test_reminders_sweep_projection(db_session, query_counter, size):
+    user = await seed(db_session, size)
+    schedules = await ScheduleService(db_session).get_active_schedules(user.id)
+    db_session.expunge_all()
+
+    @contextlib.asynccontextmanager
+    async def get_db():
+        yield db_session
+
+    # The user is in UTC and awake from 8:00 to 22:00
+    for hour, notified in ((12, True), (23, False)):
+        now = datetime.now(timezone.utc).replace(hour=hour)
+        with (
+            patch("src.tasks.notifications.get_db", get_db),
+            patch.object(send_notification, "delay") as delay,
+            query_counter.assert_max_queries(1),
+        ):
+            result = await inspect.unwrap(sweep_reminder_shard.run)(
+                now.isoformat(), 0, 1
+            )
+
+        assert result["ok"] and result["notified"] == int(notified)
+
+        if notified:
+            delay.assert_called_once_with(
+                user_id=user.id, schedule_ids=[s.id for s in schedules]
+            )
+        else:
+            delay.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_reminders_sweep_streams_in_chunks(db_session, query_counter):
+    users = [await seed(db_session, size) for size in (3, 1, 2)]
+    expected = [
+        call(
+            user_id=user.id,
+            schedule_ids=[
+                s.id
+                for s in await ScheduleService(db_session).get_active_schedules(user.id)
+            ],
+        )
+        for user in users
+    ]
+    db_session.expunge_all()
+
+    @contextlib.asynccontextmanager
+    async def get_db():
+        yield db_session
+
+    # Chunks of two rows split the schedules of the first and the last user
+    now = datetime.now(timezone.utc).replace(hour=12).isoformat()
+    with (
+        patch("src.tasks.notifications.get_db", get_db),
+        patch("src.tasks.notifications.settings.reminders.chunk_size", 2),
+        patch.object(send_notification, "delay") as delay,
+        query_counter.assert_max_queries(1),
+    ):
+        await inspect.unwrap(sweep_reminder_shard.run)(now, 0, 1)
+
+    assert delay.call_args_list == expected
+
+    # Shards split the users between them
+    calls = []
+    for shard in range(2):
+        with (
+            patch("src.tasks.notifications.get_db", get_db),
+            patch.object(send_notification, "delay") as delay,
+        ):
+            await inspect.unwrap(sweep_reminder_shard.run)(now, shard, 2)
+        assert all(c.kwargs["user_id"] % 2 == shard for c in delay.call_args_list)
+        calls += delay.call_args_list
+
+    assert sorted(calls, key=lambda c: c.kwargs["user_id"]) == expected
+
+
+@pytest.mark.asyncio
+async def test_retried_shard_resumes_after_last_queued_user(db_session):
+    users = [await seed(db_session, size) for size in (1, 2, 3)]
+    db_session.expunge_all()
+
+    @contextlib.asynccontextmanager
+    async def get_db():
+        yield db_session
+
+    now = datetime.now(timezone.utc).replace(hour=12).isoformat()
+    sweep = inspect.unwrap(sweep_reminder_shard.run)
+    with (
+        patch("src.tasks.notifications.get_db", get_db),
+        patch.object(send_notification, "delay") as delay,
+    ):
+        delay.side_effect = [None, ConnectionError("Broker is down")]
+        result = await sweep(now, 0, 1)
+        assert not result["ok"] and result["notified"] == 1
+        assert result["last_user_id"] == users[0].id
+
+        delay.reset_mock(side_effect=True)
+        result = await sweep(now, 0, 1, result["last_user_id"])
+
+    assert result["ok"] and result["notified"] == 2
+    assert [c.kwargs["user_id"] for c in delay.call_args_list] == [
+        user.id for user in users[1:]
+    ]
+
+
+@pytest.mark.asyncio
+async def test_reminder_candidates_skip_users_outside_daylight(db_session):
+    zones = ["Pacific/Honolulu", "America/New_York", "UTC", "Asia/Kolkata"]
+    users = [await seed(db_session, i + 1, tz=zone) for i, zone in enumerate(zones)]
+
+    for hour in range(0, 24, 3):
+        now = datetime.now(timezone.utc).replace(hour=hour, minute=30)
+        candidates = await ScheduleService(db_session).get_reminder_candidates(now)
+
+        awake = {
+            user.id
+            for user in users
+            if user.day_start <= user.in_local_time(now).time() <= user.day_end
+        }
+        assert {c.user_id for c in candidates} == awake
+
+
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.asyncio
+async def test_log_dose_query_budget(db_session, query_counter, size):
+    user = await seed(db_session, size)
+    service = ScheduleService(db_session)
+    schedule_id = (await service.get_active_schedules(user.id))[-1].id
+
+    with i18n.context(), query_counter.assert_max_queries(4):
+        success, _message = await service.log_dose(user.id, schedule_id)
+
+    assert success
+
+
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.asyncio
+async def test_send_notification_query_budget(db_session, query_counter, size):
+    user = await seed(db_session, size)
+    schedules = await ScheduleService(db_session).get_active_schedules(user.id)
+    db_session.expunge_all()
+    bot = AsyncMock()
+
+    @contextlib.asynccontextmanager
+    async def get_db():
+        yield db_session
+        await db_session.commit()
+
+    @contextlib.asynccontextmanager
+    async def get_bot():
+        yield bot
+
+    with (
+        patch("src.tasks.notifications.get_db", get_db),
+        patch("src.tasks.notifications.get_bot", get_bot),
+        query_counter.assert_max_queries(5),
+    ):
+        await inspect.unwrap(send_notification.run)(
+            user_id=user.id, schedule_ids=[s.id for s in schedules]
+        )
+
+    bot.send_message.assert_awaited_once()
+
+
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.asyncio
+async def test_get_adherence_stats_query_budget(db_session, query_counter, size):
+    user = await seed(db_session, size)
+    service = ScheduleService(db_session)
+
+    with query_counter.assert_max_queries(3):
+        stats = await service.get_adherence_stats(user.id, 7)
+
+    assert len(stats) == size
+    assert all(data["taken"] == 5 for data in stats.values())
+
+
+@pytest.mark.asyncio
+async def test_get_or_create_user_query_budget(db_session, query_counter):
+    service = UserService(db_session)
+
+    with query_counter.assert_max_queries(3):
+        user = await service.get_or_create_user(42, "John", language_code="en")
+
+    with query_counter.assert_max_queries(1):
+        assert (await UserService(db_session).get_or_create_user(42, "John")) == user
+
+    with query_counter.assert_max_queries(0):
+        assert (await service.get_or_create_user(42, "John")) == user
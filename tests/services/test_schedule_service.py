@@ -1,5 +1,6 @@
 from datetime import datetime, time, timezone
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, Mock, patch
+from zoneinfo import ZoneInfoNotFoundError
 
 import pytest
 import pytz
@@ -150,11 +151,11 @@ async def test_get_next_dose_time_before_schedule_start(service, user):
 
 @pytest.mark.asyncio
 async def test_get_next_dose_time_handles_unknown_timezone(service, schedule):
-    # invalid timezone string → pytz.UnknownTimeZoneError
+    # invalid timezone string → ZoneInfoNotFoundError
     bad_user = User(id=99, timezone="Invalid/Zone")
     with patch("src.services.schedule_service.datetime", wraps=datetime) as mock_dt:
         mock_dt.now.return_value = datetime(2024, 1, 1, 7, tzinfo=timezone.utc)
-        with pytest.raises(pytz.UnknownTimeZoneError):
+        with pytest.raises(ZoneInfoNotFoundError):
             await service.get_next_dose_time(bad_user, schedule)
 
 
@@ -165,6 +166,41 @@ async def test_create_schedule_error(service, schedule):
         await service.create_schedule(schedule)
 
 
+@pytest.mark.asyncio
+async def test_create_schedules_in_one_transaction(service):
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    service.session.add_all = Mock()
+
+    schedules = await service.create_schedules(
+        1,
+        [
+            {"drug_name": "Aspirin", "dose": "1 tablet", "doses_per_day": 3},
+            {
+                "drug_name": "Enalapril",
+                "dose": "10 mg",
+                "doses_per_day": 2,
+                "duration": 7,
+            },
+        ],
+        start_datetime=start,
+    )
+
+    assert [s.drug_name for s in schedules] == ["Aspirin", "Enalapril"]
+    assert schedules[1].end_datetime == datetime(2024, 1, 8, tzinfo=timezone.utc)
+    service.session.add_all.assert_called_once_with(schedules)
+    service.session.commit.assert_awaited_once()
+
+    with pytest.raises(ValueError):
+        await service.create_schedules(
+            1,
+            [
+                {"drug_name": "Aspirin", "dose": "1 tablet", "doses_per_day": 3},
+                {"drug_name": "Broken", "dose": "1 tablet", "doses_per_day": 0},
+            ],
+        )
+    assert service.session.add_all.call_count == 1
+
+
 def test_get_doses_times_one_dose_per_day(service, user, schedule):
     """Test that get_doses_times returns the correct time for one dose per day."""
     schedule.doses_per_day = 1
@@ -0,0 +1,184 @@
+import contextlib
+import inspect
+import subprocess
+import sys
+from datetime import datetime, time, timedelta, timezone
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+import pytest
+import pytest_asyncio
+
+from src.bot import reminders
+from src.config import ReminderMode
+from src.models import Schedule, User
+from src.services.schedule_service import ScheduleService
+from src.tasks import notifications
+from src.tasks.celery import celery
+from src.tasks.notifications import arm_reminders, send_dose_reminder
+
+
+@pytest_asyncio.fixture
+async def schedule(db_session) -> Schedule:
+    user = User(
+        telegram_id=1000,
+        first_name="John",
+        timezone="UTC",
+        language_code="en",
+        privacy_accepted=True,
+        day_start=time(8, 0),
+        day_end=time(22, 0),
+    )
+    db_session.add(user)
+    await db_session.flush()
+    schedule = Schedule(
+        user_id=user.id,
+        drug_name="Aspirin",
+        dose="1 tablet",
+        doses_per_day=3,
+        start_datetime=datetime.now(timezone.utc) - timedelta(days=1),
+    )
+    db_session.add(schedule)
+    await db_session.commit()
+    return schedule
+
+
+@pytest.fixture
+def bot():
+    return AsyncMock()
+
+
+@pytest.fixture
+def tasks_db(db_session, bot):
+    @contextlib.asynccontextmanager
+    async def get_db():
+        try:
+            yield db_session
+            await db_session.commit()
+        except Exception:
+            await db_session.rollback()
+            raise
+
+    @contextlib.asynccontextmanager
+    async def get_bot():
+        yield bot
+
+    with (
+        patch("src.tasks.notifications.get_db", get_db),
+        patch("src.tasks.notifications.get_bot", get_bot),
+    ):
+        yield
+
+
+@pytest.mark.asyncio
+async def test_arm_reminders(schedule, tasks_db):
+    with patch.object(send_dose_reminder, "apply_async") as apply_async:
+        await inspect.unwrap(arm_reminders.run)(schedule.user_id)
+
+    assert schedule.reminder_version == 1
+    ((user_id, schedule_id, version, due),), kwargs = apply_async.call_args
+    assert (user_id, schedule_id, version) == (schedule.user_id, schedule.id, 1)
+    assert kwargs["eta"] <= datetime.fromisoformat(due)
+    assert kwargs["eta"] >= datetime.now(timezone.utc) - timedelta(seconds=1)
+
+
+@pytest.mark.asyncio
+async def test_distant_dose_is_reached_in_hops(schedule, tasks_db, bot):
+    due = (datetime.now(timezone.utc) + timedelta(hours=5)).isoformat()
+    args = (schedule.user_id, schedule.id, 0, due)
+
+    with (
+        patch.object(notifications.settings.reminders, "eta_horizon", 3600),
+        patch.object(send_dose_reminder, "apply_async") as apply_async,
+    ):
+        await inspect.unwrap(send_dose_reminder.run)(*args)
+
+    bot.send_message.assert_not_awaited()
+    assert schedule.reminder_version == 0
+    (hop_args,), kwargs = apply_async.call_args
+    assert hop_args == args
+    assert kwargs["eta"] <= datetime.now(timezone.utc) + timedelta(hours=1)
+    assert kwargs["eta"] >= datetime.now(timezone.utc) + timedelta(minutes=59)
+
+
+@pytest.mark.asyncio
+async def test_send_dose_reminder(schedule, tasks_db, bot):
+    schedule.reminder_version = 1
+    due = datetime.now(timezone.utc)
+    send = inspect.unwrap(send_dose_reminder.run)
+
+    with patch.object(send_dose_reminder, "apply_async") as apply_async:
+        # Re-armed since
+        await send(schedule.user_id, schedule.id, 0, due.isoformat())
+        bot.send_message.assert_not_awaited()
+        apply_async.assert_not_called()
+
+        await send(schedule.user_id, schedule.id, 1, due.isoformat())
+        bot.send_message.assert_awaited_once()
+        ((*_ids, version, next_due),), kwargs = apply_async.call_args
+        assert version == 2
+        assert kwargs["eta"] <= datetime.fromisoformat(next_due)
+        assert kwargs["eta"] > due + timedelta(minutes=1)
+
+        # Delivered twice
+        await send(schedule.user_id, schedule.id, 1, due.isoformat())
+        bot.send_message.assert_awaited_once()
+        apply_async.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_failed_reminder_still_arms_next_dose(schedule, tasks_db, bot):
+    bot.send_message.side_effect = RuntimeError("Telegram is down")
+    due = datetime.now(timezone.utc)
+    args = (schedule.user_id, schedule.id, 0, due.isoformat())
+
+    with patch.object(send_dose_reminder, "apply_async") as apply_async:
+        with pytest.raises(RuntimeError):
+            await inspect.unwrap(send_dose_reminder.run)(*args)
+        apply_async.assert_not_called()
+
+        # Out of retries
+        await notifications._skip_dose_reminder(*args)
+
+    ((*_ids, version, next_due),), kwargs = apply_async.call_args
+    assert version == 1
+    assert kwargs["eta"] > due + timedelta(minutes=1)
+
+
+def test_final_failure_skips_to_next_dose():
+    args = (1, 2, 3, "2024-01-01T08:00:00+00:00")
+    with patch.object(notifications, "_skip_dose_reminder", AsyncMock()) as skip:
+        send_dose_reminder.on_failure(RuntimeError(), "task", args, {}, None)
+
+    skip.assert_awaited_once_with(*args)
+
+
+@pytest.mark.asyncio
+async def test_stopping_invalidates_reminder(schedule, db_session):
+    await ScheduleService(db_session).stop_schedule(schedule.user_id, schedule.id)
+
+    assert schedule.reminder_version == 1
+
+
+@pytest.mark.asyncio
+async def test_rearm_reminders_only_in_eta_mode():
+    with patch.object(celery, "send_task") as send_task:
+        await reminders.rearm_reminders(1, [2])
+        send_task.assert_not_called()
+
+        with patch.object(reminders.settings.reminders, "mode", ReminderMode.ETA):
+            await reminders.rearm_reminders(1, [2])
+
+    send_task.assert_called_once_with(
+        "src.tasks.notifications.arm_reminders",
+        kwargs={"user_id": 1, "schedule_ids": [2]},
+    )
+
+
+def test_bot_does_not_load_celery():
+    code = (
+        "import sys, src.bot.__main__; "
+        "assert not [m for m in sys.modules if m.startswith(('src.tasks', 'celery'))]"
+    )
+    root = Path(__file__).resolve().parents[2]
+    subprocess.run([sys.executable, "-c", code], cwd=root, check=True)
@@ -0,0 +1,71 @@
+import contextlib
+import inspect
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import pytest
+
+from src.tasks import notifications
+from src.tasks.notifications import (
+    finish_reminder_sweep,
+    send_medication_reminders,
+    sweep_reminder_shard,
+)
+
+NOW = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc).isoformat()
+
+
+def test_sweep_dispatches_every_shard():
+    with (
+        patch("src.tasks.notifications.settings.reminders.shards", 3),
+        patch.object(notifications, "_dispatch_sweep") as dispatch,
+    ):
+        send_medication_reminders.run()
+
+    now, shards, count = dispatch.call_args.args
+    assert datetime.fromisoformat(now).tzinfo
+    assert shards == {0: None, 1: None, 2: None} and count == 3
+
+
+@pytest.mark.asyncio
+async def test_failed_shard_is_reported():
+    @contextlib.asynccontextmanager
+    async def get_db():
+        raise ConnectionError("Database is down")
+        yield
+
+    with patch.object(notifications, "get_db", get_db):
+        result = await inspect.unwrap(sweep_reminder_shard.run)(NOW, 1, 4)
+
+    assert result["shard"] == 1
+    assert not result["ok"] and result["last_user_id"] is None
+    assert "Database is down" in result["error"]
+
+
+def test_only_failed_shards_are_retried():
+    results = [
+        {"shard": 0, "ok": True, "notified": 3, "duration": 0.5, "lag": 1.0},
+        {
+            "shard": 1,
+            "ok": False,
+            "notified": 1,
+            "last_user_id": 42,
+            "error": "ConnectionError()",
+        },
+        {"shard": 2, "ok": True, "notified": 2, "duration": 0.7, "lag": 2.0},
+    ]
+    with (
+        patch("src.tasks.notifications.settings.reminders.shard_retries", 1),
+        patch.object(notifications, "_dispatch_sweep") as dispatch,
+    ):
+        summary = finish_reminder_sweep.run(results, NOW, 3)
+        assert summary["completed"] == [0, 2] and summary["failed"] == [1]
+        assert summary["notified"] == 6 and summary["max_lag"] == 2.0
+        dispatch.assert_called_once()
+        assert dispatch.call_args.args == (NOW, {1: 42}, 3)
+        assert dispatch.call_args.kwargs["attempt"] == 2
+
+        # Out of retries
+        dispatch.reset_mock()
+        finish_reminder_sweep.run(results, NOW, 3, attempt=2)
+        dispatch.assert_not_called()
@@ -0,0 +1,33 @@
+from datetime import date, datetime, time, timezone
+
+import babel.dates
+import pytest
+import pytz
+
+from src.utils.formatting import format_date, format_datetime, format_time
+
+MOSCOW_NOON = datetime(2025, 3, 30, 9, 5, tzinfo=timezone.utc).astimezone(
+    pytz.timezone("Europe/Moscow")
+)
+
+
+@pytest.mark.parametrize("locale", ["en", "ru"])
+@pytest.mark.parametrize("format", ["full", "long", "medium", "short"])
+def test_matches_babel(locale, format):
+    for value in (MOSCOW_NOON, MOSCOW_NOON.replace(tzinfo=None)):
+        assert format_date(value, format, locale) == babel.dates.format_date(
+            value, format, locale
+        )
+        assert format_time(value, format, locale) == babel.dates.format_time(
+            value, format, locale=locale
+        )
+        assert format_datetime(value, format, locale) == babel.dates.format_datetime(
+            value, format, locale=locale
+        )
+
+    assert format_date(date(2025, 1, 2), format, locale) == babel.dates.format_date(
+        date(2025, 1, 2), format, locale
+    )
+    assert format_time(time(8, 30), format, locale) == babel.dates.format_time(
+        time(8, 30), format, locale=locale
+    )
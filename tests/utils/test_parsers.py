@@ -0,0 +1,166 @@
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.utils.parsers import (
+    RULES_CONFIDENCE_THRESHOLD,
+    PrescriptionCache,
+    PrescriptionData,
+    normalize_prescription,
+    parse_prescription,
+    parse_prescription_rules,
+    parse_prescriptions,
+)
+
+RESPONSE = (
+    '{"drug_name": "Aspirin", "dose": "1 tablet", "doses_per_day": 3, "duration": 7}'
+)
+
+
+def test_normalize_prescription():
+    assert (
+        normalize_prescription("  Aspirin ONE tablet three times a day for 7 days. ")
+        == "aspirin 1 tablet 3 times a day for 7 days"
+    )
+    assert normalize_prescription("Аспирин две таблетки 0,5 г") == (
+        "аспирин 2 таблетки 0.5 г"
+    )
+
+
+@pytest.mark.asyncio
+async def test_cache_hit_skips_llm():
+    llm_service = AsyncMock()
+    llm_service.complete.return_value = RESPONSE
+    cache = PrescriptionCache()
+
+    first = await parse_prescription(
+        llm_service, "Aspirin 1 tablet in the morning and 2 at night", cache=cache
+    )
+    second = await parse_prescription(
+        llm_service, "aspirin one tablet in the morning  and two at night", cache=cache
+    )
+
+    assert second == first
+    assert second.doses_per_day == 3
+    llm_service.complete.assert_awaited_once()
+
+    await parse_prescription(
+        llm_service,
+        "Aspirin 1 tablet in the morning and 2 at night",
+        cache=cache,
+        language="ru",
+    )
+    assert llm_service.complete.await_count == 2
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        (
+            "Ibuprofen 400 mg twice a day for 5 days after meals",
+            PrescriptionData(
+                drug_name="Ibuprofen",
+                dose="400 mg",
+                doses_per_day=2,
+                duration=5,
+                comment="after meals",
+            ),
+        ),
+        (
+            "Принимать Амоксициллин по 500 мг каждые 8 часов 2 недели",
+            PrescriptionData(
+                drug_name="Амоксициллин", dose="500 мг", doses_per_day=3, duration=14
+            ),
+        ),
+    ],
+)
+def test_rules_parse_common_lines(text, expected):
+    parsed, confidence = parse_prescription_rules(text)
+
+    assert parsed == expected
+    assert confidence >= RULES_CONFIDENCE_THRESHOLD
+
+
+def test_rules_defer_unusual_lines():
+    parsed, confidence = parse_prescription_rules("Эналаприл 10 мг утром и вечером")
+
+    assert parsed is None
+    assert confidence < RULES_CONFIDENCE_THRESHOLD
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "Aspirin 1 tablet 1/0 times a day",
+        "Aspirin 1 tablet every 1/0 hours",
+        "Aspirin 1 tablet 2.5 times a day",
+        "Aspirin 1 tablet 30 times a day",
+        "Aspirin 1 tablet every 0.5 hours",
+        "Aspirin 1 tablet 3 times a day for 0 days",
+        "Aspirin 1 tablet 3 times a day for 1/0 days",
+        "Aspirin 1 tablet 3 times a day for 99999999999 days",
+        "Aspirin 1 tablet 3 times a day for 999 months",
+    ],
+)
+def test_rules_defer_implausible_numbers(text):
+    parsed, confidence = parse_prescription_rules(text)
+
+    assert confidence < RULES_CONFIDENCE_THRESHOLD
+    if parsed:
+        assert 1 <= parsed.doses_per_day <= 24
+        assert parsed.duration is None or 1 <= parsed.duration <= 3650
+
+
+@pytest.mark.parametrize(
+    "drug_name",
+    ["Prednisone", "Dexamethasone", "Spironolactone", "Oxycodone", "Hydrocortisone"],
+)
+def test_rules_keep_drug_names_ending_in_numerals(drug_name):
+    parsed, confidence = parse_prescription_rules(
+        f"{drug_name} tablet twice a day for 5 days"
+    )
+
+    assert parsed is None
+    assert confidence < RULES_CONFIDENCE_THRESHOLD
+
+    parsed, _ = parse_prescription_rules(f"{drug_name} 5 mg twice a day")
+
+    assert parsed.drug_name == drug_name and parsed.dose == "5 mg"
+
+
+@pytest.mark.asyncio
+async def test_confident_rules_skip_llm():
+    llm_service = AsyncMock()
+
+    parsed = await parse_prescription(llm_service, "Aspirin 1 tablet 3 times a day")
+
+    assert parsed.doses_per_day == 3
+    llm_service.complete.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_prescription_list_in_one_llm_call():
+    llm_service = AsyncMock()
+    llm_service.complete.return_value = (
+        '{"prescriptions": ['
+        '{"drug_name": "Эналаприл", "dose": "10 мг", "doses_per_day": 2},'
+        '{"drug_name": "Broken"},'
+        '{"drug_name": "Lisinopril", "dose": "10 mg", "doses_per_day": 1}]}'
+    )
+
+    parsed = await parse_prescriptions(
+        llm_service,
+        "Discharge recommendations:\n"
+        "1. Aspirin 1 tablet 3 times a day for 7 days\n"
+        "2) Эналаприл 10 мг утром и вечером\n"
+        "- Lisinopril 10 mg in the morning\n",
+    )
+
+    assert [p.drug_name for p in parsed] == [
+        "Эналаприл",
+        "Lisinopril",
+        "Aspirin",
+    ]
+    llm_service.complete.assert_awaited_once()
+    text = llm_service.complete.await_args.args[0].prompt.split("Input:")[1]
+    assert "Aspirin" not in text and "Discharge" in text
@@ -0,0 +1,85 @@
+from datetime import datetime, time, timedelta, timezone
+
+import pytest
+import pytz
+
+from src.models import Schedule, User
+from src.services.schedule_service import ScheduleService
+from src.utils.timezones import get_timezone, localize, zones_by_local_time
+
+# Zones with DST going forward, backward, in the southern hemisphere, by 30 minutes
+# and at midnight
+ZONES = [
+    "Europe/Berlin",
+    "America/New_York",
+    "Australia/Sydney",
+    "Australia/Lord_Howe",
+    "America/Havana",
+    "Europe/Moscow",
+]
+
+
+def transition_days(tz: pytz.BaseTzInfo, year: int) -> list[datetime]:
+    """Days at the end of which the UTC offset differs from the one at the start"""
+    days = [datetime(year, 1, 1) + timedelta(days=i) for i in range(366)]
+    offsets = [tz.utcoffset(day, is_dst=False) for day in days]
+    return [day for day, a, b in zip(days, offsets, offsets[1:]) if a != b]
+
+
+@pytest.mark.parametrize("zone", ZONES)
+def test_localize_matches_pytz(zone):
+    tz, pytz_tz = get_timezone(zone), pytz.timezone(zone)
+    days = transition_days(pytz_tz, 2024)
+    assert len(days) == (0 if zone == "Europe/Moscow" else 2)
+
+    # Every 15 minutes of the days around transitions and of an ordinary day
+    for day in [datetime(2024, 7, 15), *days]:
+        for step in range(0, 3 * 24 * 4):
+            dt = day - timedelta(days=1) + timedelta(minutes=15 * step)
+            # Times with a fold never compare equal across zones, compare in UTC
+            expected = pytz_tz.localize(dt).astimezone(timezone.utc)
+            assert localize(dt, tz).astimezone(timezone.utc) == expected, dt
+
+
+def test_get_timezone_is_cached():
+    assert get_timezone("Europe/Berlin") is get_timezone("Europe/Berlin")
+
+
+def test_expected_doses_across_dst_match_pytz():
+    user = User(
+        id=1, timezone="Europe/Berlin", day_start=time(2, 30), day_end=time(22, 0)
+    )
+    schedule = Schedule(
+        id=1,
+        user_id=1,
+        doses_per_day=3,
+        start_datetime=datetime(2024, 3, 25, tzinfo=timezone.utc),
+        doses=[],
+    )
+    service = ScheduleService(session=None)  # type: ignore
+
+    # Both the day clocks go forward and the day they go back
+    for start in (datetime(2024, 3, 29), datetime(2024, 10, 25)):
+        start = start.replace(tzinfo=timezone.utc)
+        doses = service._calculate_expected_doses(
+            user, schedule, start, start + timedelta(days=4)
+        )
+        expected = [
+            pytz.timezone(user.timezone).localize(d.replace(tzinfo=None)) for d in doses
+        ]
+        assert [d.astimezone(timezone.utc) for d in doses] == [
+            d.astimezone(timezone.utc) for d in expected
+        ]
+
+
+def test_zones_by_local_time():
+    now = datetime(2024, 7, 1, 12, 0, tzinfo=timezone.utc)
+    buckets = zones_by_local_time(now)
+
+    assert "UTC" in buckets[time(12, 0)]
+    assert {"Europe/London", "Europe/Berlin"}.isdisjoint(buckets[time(12, 0)])
+    assert "Europe/London" in buckets[time(13, 0)]
+    assert "Asia/Kolkata" in buckets[time(17, 30)]
+    for local_time, zones in buckets.items():
+        for zone in zones:
+            assert now.astimezone(get_timezone(zone)).time() == local_time